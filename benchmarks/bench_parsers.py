@@ -0,0 +1,72 @@
+""" Compares the HTML parsers, with and without strainers, on saved pages.
+
+Usage
+-----
+python benchmarks/bench_parsers.py PAGE [PAGE ...] [--repeat N]
+
+Save pages with e.g. `curl -o fbref_match.html <url>`. The strainers that are tried are the ones
+the scrapers use: script tags, tables, and table cells.
+"""
+import argparse
+import sys
+import time
+sys.path.append('./src/')
+
+from bs4 import SoupStrainer
+import pandas as pd
+from ScraperFC.shared_functions import make_soup, valid_parsers
+
+strainers = {
+    'none': None,
+    'script': SoupStrainer('script'),
+    'table': SoupStrainer('table'),
+    'td': SoupStrainer('td'),
+}
+
+
+# ==================================================================================================
+def installed_parsers() -> list:
+    parsers = list()
+    for parser in valid_parsers:
+        try:
+            make_soup('<p></p>', parser=parser)
+            parsers.append(parser)
+        except Exception:
+            pass
+    return parsers
+
+
+# ==================================================================================================
+def bench_page(content: bytes, repeat: int) -> pd.DataFrame:
+    """ Returns the best time of `repeat` parses of the page for every parser and strainer.
+    """
+    rows = list()
+    for parser in installed_parsers():
+        for name, strainer in strainers.items():
+            if parser == 'html5lib' and strainer is not None:
+                continue  # html5lib doesn't support strainers
+            times = list()
+            for _ in range(repeat):
+                start = time.perf_counter()
+                make_soup(content, strainer, parser)
+                times.append(time.perf_counter() - start)
+            rows.append({'parser': parser, 'strainer': name, 'best (ms)': min(times) * 1000})
+    df = pd.DataFrame(rows)
+    baseline = df.loc[(df['parser'] == 'html.parser') & (df['strainer'] == 'none'), 'best (ms)']
+    df['speedup'] = baseline.iloc[0] / df['best (ms)']
+    return df
+
+
+# ==================================================================================================
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('pages', nargs='+', help='Saved HTML pages')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    for page in args.pages:
+        with open(page, 'rb') as f:
+            content = f.read()
+        print(f'{page} ({len(content) / 1024:.0f} kB)')
+        print(bench_page(content, args.repeat).to_string(index=False, float_format='%.2f'))
+        print()
@@ -0,0 +1,219 @@
+""" Measures the parse time and memory of the scrapers' hot paths on stored pages.
+
+Usage
+-----
+python benchmarks/bench_scrapers.py [--cassette PATH ...] [--repeat N] [--only NAME ...]
+                                    [--save results.json] [--compare baseline.json]
+
+Pages come from cassettes recorded with ScraperFC.replay (e.g. `SCRAPERFC_CASSETTES=record pytest`
+records them to test/cassettes/), or synthetic pages if no cassette is given, see fixtures.py.
+Network requests are replayed from the pages, so only parsing is measured.
+
+To check a library upgrade, save the results before it and compare after it:
+
+    python benchmarks/bench_scrapers.py --save before.json
+    pip install -U beautifulsoup4 pandas
+    python benchmarks/bench_scrapers.py --compare before.json
+
+--compare exits with status 1 if any benchmark got slower than --threshold times the baseline.
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from importlib.metadata import PackageNotFoundError, version
+from typing import Callable
+sys.path.append('./src/')
+sys.path.append(os.path.dirname(__file__))
+
+from bs4 import SoupStrainer
+import pandas as pd
+from ScraperFC import Capology, FBref, Transfermarkt, Understat
+from ScraperFC.capology import _salary_dfs_from_records, _salary_records_from_html
+from ScraperFC.fbref import _stats_dfs
+from ScraperFC.replay import Cassette, use_cassette
+from ScraperFC.shared_functions import make_soup
+from ScraperFC.sofascore import _player_stats_df
+from ScraperFC.understat import _json_from_script
+from fixtures import load_pages
+
+
+# ==================================================================================================
+def fbref_stats_tags(url: str, content: bytes) -> tuple:
+    soup = make_soup(content, SoupStrainer('table'))
+    return (soup.find('table', {'id': re.compile('for')}),
+            soup.find('table', {'id': re.compile('against')}),
+            soup.find('table', {'id': re.compile('^stats_(?!squads)')}))
+
+
+# ==================================================================================================
+def understat_script(url: str, content: bytes) -> str:
+    scripts = make_soup(content, SoupStrainer('script')).find_all('script')
+    return [x for x in scripts if 'shotsData' in x.text][0].text.split('match_info')[0]
+
+
+# ==================================================================================================
+def capology_tbody(url: str, content: bytes) -> str:
+    """ Renders the 13 column salary table body from the embedded dataset, like the browser does.
+    """
+    df = _salary_dfs_from_records(_salary_records_from_html(content), ['eur'], False)['eur']
+    columns = ['Player', None, 'Weekly Gross', 'Annual Gross', 'Expiration', 'Length',
+               'Total Gross', 'Status', 'Pos. group', 'Pos.', 'Age', 'Country', 'Club']
+    rows = ''.join([
+        '<tr>' + ''.join([f'<td>{row.get(c, "")}</td>' for c in columns]) + '</tr>'
+        for _, row in df.iterrows()
+    ])
+    return f'<tbody>{rows}</tbody>'
+
+
+# {name: (pages, setup(url, content) -> argument, benchmark(argument))}. Setup isn't measured.
+benchmarks = {
+    'FBref.scrape_match': (
+        'fbref_match', lambda url, content: url, lambda url: FBref(wait_time=0).scrape_match(url)
+    ),
+    'FBref.scrape_match(tidy=True)': (
+        'fbref_match', lambda url, content: url,
+        lambda url: FBref(wait_time=0).scrape_match(url, tidy=True)
+    ),
+    'FBref.scrape_stats tables': (
+        'fbref_stats', lambda url, content: content,
+        lambda content: _stats_dfs(*fbref_stats_tags('', content))
+    ),
+    'Understat._json_from_script': ('understat_match', understat_script, _json_from_script),
+    'Understat.scrape_match': (
+        'understat_match', lambda url, content: url,
+        lambda url: Understat().scrape_match(url, as_df=True)
+    ),
+    'Sofascore.scrape_player_league_stats df': (
+        'sofascore_stats', lambda url, content: json.loads(content)['results'], _player_stats_df
+    ),
+    'Transfermarkt.scrape_player': (
+        'transfermarkt_player', lambda url, content: url,
+        lambda url: Transfermarkt().scrape_player(url)
+    ),
+    'Capology salary dataset': (
+        'capology_salaries', lambda url, content: content,
+        lambda content: _salary_dfs_from_records(
+            _salary_records_from_html(content), ['eur', 'gbp', 'usd'], False
+        )
+    ),
+    'Capology._read_salary_table': (
+        'capology_salaries', capology_tbody, lambda tbody: Capology()._read_salary_table(tbody)
+    ),
+}
+
+
+# ==================================================================================================
+def library_versions() -> dict:
+    versions = {'python': platform.python_version()}
+    for package in ['beautifulsoup4', 'lxml', 'html5lib', 'pandas', 'numpy', 'pyarrow']:
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            pass
+    return versions
+
+
+# ==================================================================================================
+def run_benchmark(function: Callable, arguments: list, repeat: int) -> dict:
+    """ Returns the best and median time per page of `repeat` passes over the pages, and the peak
+    memory allocated while processing a page.
+    """
+    function(arguments[0])  # warm up imports and caches
+    times = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for argument in arguments:
+            function(argument)
+        times.append((time.perf_counter() - start) / len(arguments))
+
+    peaks = list()
+    for argument in arguments:
+        tracemalloc.start()
+        function(argument)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {'pages': len(arguments), 'best (ms)': min(times) * 1000,
+            'median (ms)': statistics.median(times) * 1000, 'peak (MiB)': max(peaks) / 2**20}
+
+
+# ==================================================================================================
+def run_all(pages: dict, repeat: int, only: list) -> pd.DataFrame:
+    # Replay every page, so the benchmarks that request pages never reach the network
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'pages.json')
+    cassette = Cassette(path, 'once')
+    cassette.responses = dict([
+        (url, {'status_code': 200, 'headers': {}, 'encoding': 'utf-8',
+               'body': base64.b64encode(content).decode('ascii')})
+        for page_list in pages.values() for url, content in page_list
+    ])
+    cassette.save()
+
+    rows = list()
+    try:
+        with use_cassette(path, 'replay'):
+            for name, (page_set, setup, function) in benchmarks.items():
+                if len(only) > 0 and not any([x.lower() in name.lower() for x in only]):
+                    continue
+                if len(pages[page_set]) == 0:
+                    print(f'Skipping {name}, no {page_set} pages.', file=sys.stderr)
+                    continue
+                arguments = [setup(url, content) for url, content in pages[page_set]]
+                rows.append({'benchmark': name, **run_benchmark(function, arguments, repeat)})
+    finally:
+        shutil.rmtree(directory)
+    return pd.DataFrame(rows)
+
+
+# ==================================================================================================
+def compare(results: pd.DataFrame, baseline_path: str, threshold: float) -> pd.DataFrame:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    baseline_df = pd.DataFrame(baseline['results']).set_index('benchmark')
+    results = results.copy()
+    results['baseline (ms)'] = results['benchmark'].map(baseline_df['best (ms)'])
+    results['ratio'] = results['best (ms)'] / results['baseline (ms)']
+    results['regression'] = results['ratio'] > threshold
+    changed = dict([
+        (k, f'{baseline["versions"].get(k)} -> {v}') for k, v in library_versions().items()
+        if baseline['versions'].get(k) != v
+    ])
+    if len(changed) > 0:
+        print('Changed versions:', ', '.join([f'{k} {v}' for k, v in changed.items()]))
+    return results
+
+
+# ==================================================================================================
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    arg_parser.add_argument('--cassette', nargs='*', default=[],
+                            help='Cassettes with the pages, synthetic pages if not given')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--only', nargs='*', default=[],
+                            help='Only run the benchmarks whose names contain these strings')
+    arg_parser.add_argument('--save', help='Save the results to this JSON file')
+    arg_parser.add_argument('--compare', help='Compare with results saved with --save')
+    arg_parser.add_argument('--threshold', type=float, default=1.25,
+                            help='Slowdown ratio that counts as a regression')
+    args = arg_parser.parse_args()
+
+    results = run_all(load_pages(args.cassette), args.repeat, args.only)
+    if args.compare is not None:
+        results = compare(results, args.compare, args.threshold)
+    print(results.to_string(index=False, float_format='%.2f'))
+
+    if args.save is not None:
+        with open(args.save, 'w') as f:
+            json.dump({'versions': library_versions(), 'results': results.to_dict('records')},
+                      f, indent=2)
+    if args.compare is not None and results['regression'].any():
+        sys.exit(1)
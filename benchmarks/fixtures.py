@@ -0,0 +1,285 @@
+""" Pages the benchmarks are fed with.
+
+Real pages come from cassettes recorded with ScraperFC.replay, e.g. the ones the test suite records
+with `SCRAPERFC_CASSETTES=record`. When no cassette is given, synthetic pages with the structure
+and roughly the size of the real ones are generated, so the benchmarks also run on machines that
+have never had network access. Absolute times from synthetic pages aren't comparable to real
+ones, but they're deterministic, which is what comparing library versions needs.
+"""
+import base64
+import json
+import random
+import re
+import sys
+sys.path.append('./src/')
+
+from ScraperFC.replay import Cassette
+
+# Page URLs of each benchmark
+patterns = {
+    'fbref_match': re.compile(r'fbref\.com/en/matches/[0-9a-f]+/'),
+    'fbref_stats': re.compile(r'fbref\.com/en/comps/.*/stats/'),
+    'understat_match': re.compile(r'understat\.com/match/\d+$'),
+    'sofascore_stats': re.compile(r'api\.sofascore\.com/.*/statistics\?'),
+    'transfermarkt_player': re.compile(r'transfermarkt\..*/profil/spieler/'),
+    'capology_salaries': re.compile(r'capology\.com/.*/salaries/'),
+}
+
+
+class SyntheticResponse:
+    status_code = 200
+    encoding = 'utf-8'
+
+    def __init__(self, content: str, content_type: str='text/html') -> None:
+        self.content = content.encode('utf-8')
+        self.headers = {'Content-Type': content_type}
+
+
+# ==================================================================================================
+def load_pages(cassette_paths: list) -> dict:
+    """ Returns {benchmark name: [(url, content), ...]} from the cassettes, or from synthetic pages
+    if no cassettes are given.
+    """
+    responses: dict = dict()
+    if len(cassette_paths) == 0:
+        cassette = Cassette('synthetic.json', 'once')  # in memory only, never saved
+        for url, response in synthetic_pages().items():
+            cassette.record(url, response)
+        responses = cassette.responses
+    for path in cassette_paths:
+        responses.update(Cassette(path, 'replay').responses)
+
+    pages: dict = dict([(name, list()) for name in patterns])
+    for url in sorted(responses):
+        if responses[url]['status_code'] != 200:
+            continue
+        for name, pattern in patterns.items():
+            if pattern.search(url):
+                pages[name].append((url, base64.b64decode(responses[url]['body'])))
+    return pages
+
+
+# ==================================================================================================
+def _filler(n: int, rng: random.Random) -> str:
+    """ Navigation, ads and footer markup the real pages are padded with.
+    """
+    return ''.join([
+        f'<div class="nav-item"><a href="/en/x/{rng.randrange(10**6)}/">Link {i}</a>'
+        f'<span class="note">{"lorem ipsum " * rng.randrange(1, 6)}</span></div>'
+        for i in range(n)
+    ])
+
+
+# ==================================================================================================
+def _fbref_table(
+        table_id: str, groups: list, n_rows: int, rng: random.Random, first: str='player',
+        link_team: bool=False, footer: bool=False
+) -> str:
+    """ FBref stats table with an over header row, `groups` of [(group, [(data-stat, label), ...])]
+    and a repeated header every 25 rows like the real tables.
+    """
+    columns = [(group, stat, label) for group, stats in groups for stat, label in stats]
+    over = ''.join([
+        f'<th colspan="{len(stats)}" data-stat="header_{i}">{group}</th>'
+        for i, (group, stats) in enumerate(groups)
+    ])
+    header = ''.join([f'<th data-stat="{stat}">{label}</th>' for _, stat, label in columns])
+    rows = list()
+    for i in range(n_rows):
+        if i > 0 and i % 25 == 0:
+            rows.append(f'<tr class="over_header thead">{over}</tr><tr class="thead">{header}</tr>')
+        cells = list()
+        for j, (_, stat, _) in enumerate(columns):
+            tag = 'th' if j == 0 else 'td'
+            if stat == 'player':
+                value = f'<a href="/en/players/{i:08x}/Player-{i}">Player {i}</a>'
+            elif stat == 'team' and link_team:
+                value = f'<a href="/en/squads/{i % 20:08x}/Team-{i % 20}">Team {i % 20}</a>'
+            elif stat == 'team':
+                value = f'Team {i % 20}'
+            elif stat == 'nationality':
+                value = '<a href="/en/country/ENG/">eng ENG</a>'
+            elif stat == 'minutes':
+                value = f'{rng.randrange(3500):,}'
+            else:
+                value = f'{rng.random() * 10:.2f}'
+            cells.append(f'<{tag} data-stat="{stat}">{value}</{tag}>')
+        rows.append(f'<tr>{"".join(cells)}</tr>')
+    foot = ''
+    if footer:
+        foot = '<tfoot><tr>' + ''.join([
+            f'<td data-stat="{stat}">{n_rows if stat == first else ""}</td>'
+            for _, stat, _ in columns
+        ]) + '</tr></tfoot>'
+    return (f'<table id="{table_id}"><thead><tr class="over_header">{over}</tr><tr>{header}</tr>'
+            f'</thead><tbody>{"".join(rows)}</tbody>{foot}</table>')
+
+
+# ==================================================================================================
+def _stats_groups(first: str, n_stats: int) -> list:
+    return [
+        ('', [(first, 'Player' if first == 'player' else 'Squad'), ('team', 'Squad'),
+              ('minutes', 'Min')]),
+        ('Performance', [(f'perf_{i}', f'P{i}') for i in range(n_stats // 2)]),
+        ('Expected', [(f'exp_{i}', f'E{i}') for i in range(n_stats - n_stats // 2)]),
+    ]
+
+
+# ==================================================================================================
+def fbref_match_page(match_id: str, rng: random.Random) -> str:
+    teams = [('0000000a', 'Home FC', 2), ('0000000b', 'Away FC', 1)]
+    scorebox = ''.join([
+        f'<div><div><strong><a href="/en/squads/{team_id}/{name}">{name}</a></strong></div>'
+        f'<div class="score">{goals}</div></div>' for team_id, name, goals in teams
+    ])
+    categories = ['summary', 'passing', 'passing_types', 'defense', 'possession', 'misc']
+    player_stats = ''
+    for team_id, _, _ in teams:
+        tables = ''.join([
+            _fbref_table(f'stats_{team_id}_{category}', _stats_groups('player', 24), 16, rng,
+                         footer=True)
+            for category in categories
+        ])
+        player_stats += f'<div id="all_player_stats_{team_id}">{tables}</div>'
+    keepers = ''.join([
+        _fbref_table(f'keeper_stats_{team_id}', _stats_groups('player', 20), 1, rng)
+        for team_id, _, _ in teams
+    ])
+    shots = _fbref_table('shots_all', [('', [('minute', 'Minute'), ('player', 'Player'),
+                                             ('team', 'Squad'), ('xg_shot', 'xG')])],
+                         25, rng, link_team=True)
+    return (f'<html><body>{_filler(800, rng)}<div role="main">'
+            f'<div>Premier League (Matchweek 1)</div><div class="scorebox">{scorebox}'
+            '<div class="scorebox_meta"><div><strong>Saturday August 12, 2023</strong></div>'
+            f'</div></div>{player_stats}{keepers}{shots}</div>{_filler(400, rng)}</body></html>')
+
+
+# ==================================================================================================
+def fbref_stats_page(rng: random.Random) -> str:
+    squads = ''.join([
+        _fbref_table(f'stats_squads_standard_{side}', _stats_groups('team', 28), 20, rng,
+                     first='team', link_team=True)
+        for side in ['for', 'against']
+    ])
+    players = _fbref_table('stats_standard', _stats_groups('player', 28), 550, rng,
+                           link_team=True)
+    return f'<html><body>{_filler(800, rng)}{squads}{players}{_filler(400, rng)}</body></html>'
+
+
+# ==================================================================================================
+def understat_match_page(match_id: int, rng: random.Random) -> str:
+    shots = dict([(side, [
+        {'id': str(rng.randrange(10**6)), 'minute': str(rng.randrange(95)), 'result': 'MissedShots',
+         'X': f'{rng.random():.3f}', 'Y': f'{rng.random():.3f}', 'xG': f'{rng.random() / 3:.5f}',
+         'player': f'Player {i}', 'h_a': side, 'player_id': str(i), 'situation': 'OpenPlay',
+         'season': '2023', 'shotType': 'RightFoot', 'match_id': str(match_id),
+         'h_team': 'Home FC', 'a_team': 'Away FC', 'h_goals': '2', 'a_goals': '1',
+         'date': '2023-08-12 15:00:00', 'player_assisted': None, 'lastAction': 'Pass'}
+        for i in range(13)
+    ]) for side in ['h', 'a']])
+    info = {'id': str(match_id), 'fid': '1', 'h': '1', 'a': '2', 'date': '2023-08-12 15:00:00',
+            'team_h': 'Home FC', 'team_a': 'Away FC', 'h_goals': '2', 'a_goals': '1',
+            'h_xg': '1.5', 'a_xg': '0.9', 'league': 'EPL', 'season': '2023'}
+    rosters = dict([(side, dict([(str(i), {
+        'id': str(rng.randrange(10**6)), 'goals': '0', 'own_goals': '0', 'shots': '1',
+        'xG': '0.1', 'time': '90', 'player_id': str(i), 'team_id': '1', 'position': 'FW',
+        'player': f'Player {i}', 'h_a': side, 'yellow_card': '0', 'red_card': '0',
+        'roster_in': '0', 'roster_out': '0', 'key_passes': '1', 'assists': '0',
+        'xA': '0.05', 'xGChain': '0.2', 'xGBuildup': '0.1', 'positionOrder': '1'
+    }) for i in range(16)])) for side in ['h', 'a']])
+
+    def js(data: dict) -> str:
+        return json.dumps(data).encode('unicode_escape').decode('ascii').replace("'", "\\'")
+
+    return (f'<html><head><script>var x = 1;</script></head><body>{_filler(300, rng)}<script>'
+            f"var shotsData = JSON.parse('{js(shots)}'), match_info = JSON.parse('{js(info)}');"
+            f"</script><script>var rostersData = JSON.parse('{js(rosters)}');</script>"
+            f'{_filler(200, rng)}</body></html>')
+
+
+# ==================================================================================================
+def sofascore_stats_page(rng: random.Random) -> str:
+    fields = ['goals', 'yellowCards', 'redCards', 'groundDuelsWon', 'successfulDribbles',
+              'tackles', 'assists', 'accuratePassesPercentage', 'totalDuelsWon', 'minutesPlayed',
+              'wasFouled', 'fouls', 'dispossessed', 'appearances', 'saves', 'cleanSheet',
+              'penaltyFaced', 'penaltySave', 'savedShotsFromInsideTheBox', 'rating']
+    results = [dict(
+        [('player', {'name': f'Player {i}', 'slug': f'player-{i}', 'id': i}),
+         ('team', {'name': f'Team {i % 20}', 'slug': f'team-{i % 20}', 'id': i % 20})]
+        + [(field, round(rng.random() * 30, 2)) for field in fields]
+    ) for i in range(550)]
+    return json.dumps({'results': results, 'page': 1, 'pages': 1})
+
+
+# ==================================================================================================
+def transfermarkt_player_page(player_id: int, rng: random.Random) -> str:
+    history = ''.join([
+        f'<div class="grid tm-player-transfer-history-grid">\n\n{23 - i}/{24 - i}\n\n'
+        f'Jul 1, {2023 - i}\n\nClub {i}\n\nClub {i + 1}\n\n€{rng.randrange(1, 90)}.00m\n\n'
+        f'€{rng.randrange(1, 90)}.00m\n\nView\n\n</div>'
+        for i in range(8)
+    ])
+    values = ','.join([
+        f"{{'y':{rng.randrange(10**8)},'verein':'Club','age':20,'mw':'€1m',"
+        f"'datum_mw':'Jan\\x201,\\x20{2015 + i}','x':{i}}}"
+        for i in range(20)
+    ])
+    return (f'<html><body>{_filler(1500, rng)}'
+            f'<h1 class="data-header__headline-wrapper">\n#10\nPlayer {player_id}</h1>'
+            '<a class="data-header__market-value-wrapper">€50.00m Last update: Oct 1, 2024</a>'
+            '<span itemprop="birthDate">Jan 1, 2000 (24)</span>'
+            '<span itemprop="height">1,85 m</span><span itemprop="nationality">\n England</span>'
+            '<span class="info-table__content info-table__content--bold">'
+            '<img class="flaggenrahmen" title="England"/></span>'
+            '<dd class="detail-position__position">Centre-Forward</dd>'
+            '<dd class="detail-position__position">Right Winger</dd>'
+            '<span class="data-header__club">Test FC</span>'
+            '<span class="data-header__label">Joined: Jul 1, 2020</span>'
+            '<span class="data-header__label">Contract expires: Jun 30, 2028</span>'
+            '<script type="text/javascript">var chart = new Highcharts.Chart({series:[{data:['
+            f"{{'y':0}},{values},{{'y':0}}]}}]}});</script>"
+            f'{history}{_filler(800, rng)}</body></html>')
+
+
+# ==================================================================================================
+def capology_salaries_page(rng: random.Random) -> str:
+    records = ''.join([
+        '{\n'
+        f"'name': \"<a class='firstcol' href='/player/player-{i}/'>Player {i}</a>\",\n"
+        + ''.join([
+            f"'{field}_{currency}': accounting.formatMoney(\"{rng.randrange(10**7)}.0\", "
+            f"\"{symbol} \", 0),\n"
+            for field in ['weekly_gross', 'annual_gross', 'total_gross']
+            for currency, symbol in [('eur', '€'), ('gbp', '£'), ('usd', '$')]
+        ])
+        + f"'position': 'AM', 'position_group': \"M\", 'age': \"{18 + i % 20}\", "
+        f"'country': \"England\", 'club': \"<a href='/club/c{i % 20}'>Club {i % 20}</a>\",\n}},"
+        for i in range(550)
+    ])
+    return (f'<html><head><script>var x = 1;</script></head><body>{_filler(500, rng)}'
+            '<table id="table"><tbody></tbody></table><script type="text/javascript">'
+            f'$(document).ready(function() {{ var data = [{records}];'
+            "$('#table').bootstrapTable({data: data}); });</script></body></html>")
+
+
+# ==================================================================================================
+def synthetic_pages(n_pages: int=3, seed: int=0) -> dict:
+    """ Returns {url: response} of `n_pages` synthetic pages per benchmark.
+    """
+    rng = random.Random(seed)
+    pages = dict()
+    for i in range(n_pages):
+        pages[f'https://fbref.com/en/matches/{i:08x}/Home-FC-Away-FC'] = \
+            SyntheticResponse(fbref_match_page(f'{i:08x}', rng))
+        pages[f'https://fbref.com/en/comps/9/{2023 - i}-{2024 - i}/stats/Premier-League-Stats'] = \
+            SyntheticResponse(fbref_stats_page(rng))
+        pages[f'https://understat.com/match/{20000 + i}'] = \
+            SyntheticResponse(understat_match_page(20000 + i, rng))
+        pages['https://api.sofascore.com/api/v1/unique-tournament/17/season/'
+              f'{50000 + i}/statistics?limit=100&offset=0'] = \
+            SyntheticResponse(sofascore_stats_page(rng), 'application/json')
+        pages[f'https://www.transfermarkt.us/player-{i}/profil/spieler/{i}'] = \
+            SyntheticResponse(transfermarkt_player_page(i, rng))
+        pages[f'https://www.capology.com/uk/premier-league/salaries/{2023 - i}-{2024 - i}/'] = \
+            SyntheticResponse(capology_salaries_page(rng))
+    return pages
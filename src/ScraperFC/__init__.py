@@ -1,6 +1,9 @@
+from .caching import ParseCache
 from .capology import Capology
 from .clubelo import ClubElo
 from .fbref import FBref
+from .fetching import ProxyPool
+from .sinks import ParquetSink, SQLiteSink
 from .sofascore import Sofascore
 from .transfermarkt import Transfermarkt
 from .understat import Understat
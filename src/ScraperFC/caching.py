@@ -0,0 +1,184 @@
+from .fetching import notify
+from .shared_functions import get_parser
+from functools import lru_cache
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import uuid
+from typing import Callable, Union
+
+MANIFEST = 'manifest.json'
+
+
+# ==================================================================================================
+def code_version(*functions: Callable) -> str:
+    """ Returns a version string of parsing code: a hash of the source code of the functions and of
+    the current HTML parser backend (see shared_functions.set_parser()). Any change to the functions
+    or the parser changes the version, which invalidates the ParseCache entries made by older
+    code.
+
+    Parameters
+    ----------
+    *functions : functions
+        The parsing functions, including the helpers whose output they depend on.
+
+    Returns
+    -------
+    : str
+    """
+    h = hashlib.sha256(get_parser().encode('utf-8'))
+    for function in functions:
+        h.update(_source_hash(function).encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+# ==================================================================================================
+@lru_cache(maxsize=None)
+def _source_hash(function: Callable) -> str:
+    """ Private, hash of the source code of a function, computed once per process.
+    """
+    try:
+        source = inspect.getsource(function)
+    except (OSError, TypeError):  # source isn't available, e.g. a frozen install
+        source = function.__qualname__
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+# ==================================================================================================
+class ParseCache():
+    """ Cache of parsed pages, so re-scraping pages that haven't changed skips parsing them.
+
+    Entries are keyed by the page URL, the hash of the page content, and the version of the parsing
+    code (see code_version()), so they're invalidated automatically when either the page or the
+    parser changes. Each entry is a dict of DataFrames stored as Arrow IPC files, which are
+    memory-mapped when they're read.
+
+    Layout: ``<root>/<namespace>/<code version>/<key[:2]>/<key>/``, with one Arrow file per table
+    and a manifest.json. Entries of old code versions can be deleted with prune(). Requires
+    pyarrow.
+
+    Pass the cache to a scraper, e.g. ``FBref(parse_cache=cache)``.
+
+    Parameters
+    ----------
+    root : str
+        Directory of the cache
+    """
+
+    # ==============================================================================================
+    def __init__(self, root: str) -> None:
+        if not isinstance(root, str):
+            raise TypeError('`root` must be a string.')
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError('ParseCache requires pyarrow, install it with '
+                              '`pip install ScraperFC[parquet]`.')
+        self.root = root
+        self.hits = 0
+        self.misses = 0
+
+    # ==============================================================================================
+    def entry_path(self, namespace: str, version: str, url: str, content: bytes) -> str:
+        """ Returns the directory of the entry of a page.
+        """
+        content_hash = hashlib.sha256(content).hexdigest()
+        key = hashlib.sha256(f'{url}\0{content_hash}'.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, namespace, version, key[:2], key)
+
+    # ==============================================================================================
+    def get(self, namespace: str, version: str, url: str, content: bytes) -> Union[dict, None]:
+        """ Returns the cached {table name: DataFrame, ...} of a page, or None if it isn't cached.
+
+        Parameters
+        ----------
+        namespace : str
+            Name of the parser, e.g. "fbref_match"
+        version : str
+            Version of the parsing code, see code_version()
+        url : str
+            URL of the page
+        content : bytes
+            Content of the page
+        """
+        import pyarrow as pa
+
+        path = self.entry_path(namespace, version, url, content)
+        try:
+            with open(os.path.join(path, MANIFEST)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            notify('cache_miss', url)
+            return None
+
+        tables: dict = dict()
+        for i, name in enumerate(manifest['tables']):
+            if name in manifest['none']:
+                tables[name] = None
+                continue
+            # The memory map stays open as long as the DataFrame references its buffers
+            source = pa.memory_map(os.path.join(path, f'{i}.arrow'))
+            tables[name] = pa.ipc.open_file(source).read_all().to_pandas()
+        self.hits += 1
+        notify('cache_hit', url)
+        return tables
+
+    # ==============================================================================================
+    def put(self, namespace: str, version: str, url: str, content: bytes, tables: dict) -> None:
+        """ Caches the {table name: DataFrame or None, ...} parsed from a page. See get() for the
+        parameters.
+        """
+        import pyarrow as pa
+
+        path = self.entry_path(namespace, version, url, content)
+        # Write to a temporary directory and move it into place, so that readers never see a
+        # partial entry
+        tmp_path = f'{path}.{uuid.uuid4().hex[:8]}.tmp'
+        os.makedirs(tmp_path)
+        try:
+            for i, (name, df) in enumerate(tables.items()):
+                if df is None:
+                    continue
+                arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+                with pa.OSFile(os.path.join(tmp_path, f'{i}.arrow'), 'wb') as sink:
+                    with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                        writer.write_table(arrow_table)
+            with open(os.path.join(tmp_path, MANIFEST), 'w') as f:
+                json.dump({
+                    'url': url,
+                    'tables': list(tables),
+                    'none': [name for name, df in tables.items() if df is None],
+                }, f)
+            os.replace(tmp_path, path)
+        except OSError:  # another process cached the page first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if not os.path.exists(os.path.join(path, MANIFEST)):
+                raise
+
+    # ==============================================================================================
+    def get_or_parse(
+            self, namespace: str, version: str, url: str, content: bytes,
+            parse: Callable[[], dict]
+    ) -> dict:
+        """ Returns the cached tables of a page, or parses it with `parse()` and caches them. See
+        get() for the other parameters.
+        """
+        tables = self.get(namespace, version, url, content)
+        if tables is None:
+            tables = parse()
+            self.put(namespace, version, url, content, tables)
+        return tables
+
+    # ==============================================================================================
+    def prune(self, namespace: str, version: str) -> None:
+        """ Deletes the entries of a namespace that were made by other versions of its parsing code.
+        """
+        directory = os.path.join(self.root, namespace)
+        if not os.path.isdir(directory):
+            return
+        for old_version in os.listdir(directory):
+            if old_version != version:
+                shutil.rmtree(os.path.join(directory, old_version))
@@ -3,11 +3,14 @@ from selenium.webdriver.chrome.options import Options
 from random import choice
 import logging
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+from bs4 import SoupStrainer
 from ScraperFC.scraperfc_exceptions import InvalidCurrencyException, InvalidLeagueException, InvalidYearException
+from ScraperFC.shared_functions import make_soup, parse_money, type_money_columns
+from ScraperFC.fetching import ProxyPool, fetch
+from ScraperFC.tracing import trace_methods, traced
 from io import StringIO
-from typing import Sequence
+import re
+from typing import Any, Sequence, Union
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
@@ -39,7 +42,171 @@ comps = {
     "Belgian 1st Division":  {'url': 'be/first-division-a'},
 }
 
-def setup_selenium():
+# Columns of the embedded salary dataset that are renamed to match the rendered table
+salary_data_columns = {
+    'name': 'Player', 'weekly_gross': 'Weekly Gross', 'annual_gross': 'Annual Gross',
+    'adjusted_gross': 'Adj. Gross', 'bonus': 'Annual Bonus', 'signed': 'Signed',
+    'expiration': 'Expiration', 'length': 'Length', 'total_gross': 'Total Gross',
+    'years_remaining': 'Years Remaining', 'gross_remaining': 'Gross Remaining',
+    'release_clause': 'Release Clause', 'status': 'Status', 'position_group': 'Pos. group',
+    'position': 'Pos.', 'age': 'Age', 'country': 'Country', 'club': 'Club',
+}
+
+# Salary table columns that hold money amounts
+salary_money_columns = [
+    'Weekly Gross', 'Annual Gross', 'Adj. Gross', 'Annual Bonus', 'Total Gross', 'Gross Remaining',
+    'Release Clause'
+]
+
+# Position group codes in the salary table, named like the columns of Capology's payroll page
+position_groups = {'K': 'Keeper', 'D': 'Defense', 'M': 'Midfield', 'F': 'Forward'}
+
+
+def _split_top_level(text: str, sep: str) -> list:
+    """ Splits JS source on `sep`, ignoring separators inside quotes and brackets.
+    """
+    parts, depth, quote, start, i = list(), 0, None, 0, 0
+    while i < len(text):
+        c = text[i]
+        if quote:
+            if c == '\\':
+                i += 1
+            elif c == quote:
+                quote = None
+        elif c in '"\'`':
+            quote = c
+        elif c in '([{':
+            depth += 1
+        elif c in ')]}':
+            depth -= 1
+        elif c == sep and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+        i += 1
+    parts.append(text[start:])
+    return [p.strip() for p in parts if p.strip() != '']
+
+
+def _money_number(value: Any) -> Any:
+    """ Converts a money amount string from the salary dataset (e.g. "1000.0") to a float. Other
+    values are returned as they are.
+    """
+    if not isinstance(value, str):
+        return value
+    try:
+        return float(value.replace(',', ''))
+    except ValueError:
+        return value
+
+
+def _js_value(raw: str) -> Union[str, float, bool, None]:
+    """ Converts a JS literal from the salary dataset to a Python value. Function calls are reduced
+    to their first argument, which is converted to a money amount for formatMoney() calls, e.g.
+    `accounting.formatMoney("1000.0", "£ ", 0)`. HTML in strings (e.g. player links) is reduced to
+    its text. Quoted strings stay strings, even if they look like numbers.
+    """
+    raw = raw.strip()
+    call = re.match(r'^([\w.$]+)\((.*)\)$', raw, re.DOTALL)
+    if call:
+        args = _split_top_level(call.group(2), ',')
+        value = _js_value(args[0]) if len(args) > 0 else None
+        return _money_number(value) if call.group(1).endswith('formatMoney') else value
+    if raw in ['null', 'undefined', '']:
+        return None
+    if raw in ['true', 'false']:
+        return raw == 'true'
+    if raw[0] in '"\'`' and raw[-1] == raw[0]:
+        value = raw[1:-1]
+        if '\\' in value:
+            # Decode JS escapes without mangling non-ASCII characters
+            value = value.encode('latin-1', 'backslashreplace').decode('unicode_escape')
+        if '<' in value:
+            value = make_soup(value).get_text()
+        return value.strip()
+    try:
+        return float(raw)
+    except ValueError:
+        return raw
+
+
+@traced('parse')
+def _salary_records_from_html(content: Union[str, bytes]) -> list:
+    """ Extracts the salary dataset the Capology salary table is rendered from.
+
+    The table is built client-side from a JS array of objects (`var data = [{...}, ...]`) embedded
+    in a script tag. Returns a list of dicts, or an empty list if the dataset isn't on the page.
+    """
+    soup = make_soup(content, SoupStrainer('script'))
+    for script in soup.find_all('script'):
+        match = re.search(r'\bdata\s*=\s*\[', script.text)
+        if match is None:
+            continue
+        # Find the end of the array literal
+        array_src = script.text[match.end() - 1:]
+        array_parts = _split_top_level(array_src, ';')
+        array_src = array_parts[0] if len(array_parts) > 0 else ''
+        end = array_src.rfind(']')
+        records = list()
+        for obj_src in _split_top_level(array_src[1:end], ','):
+            if not obj_src.startswith('{'):
+                continue
+            record = dict()
+            for pair in _split_top_level(obj_src.strip()[1:-1], ','):
+                key_value = _split_top_level(pair, ':')
+                if len(key_value) < 2:
+                    continue
+                key = key_value[0].strip('\'"` ')
+                record[key] = _js_value(':'.join(key_value[1:]))
+            records.append(record)
+        if len(records) > 0:
+            return records
+    return list()
+
+
+@traced('build')
+def _salary_dfs_from_records(records: list, currencies: Sequence[str], typed: bool) -> dict:
+    """ Splits the salary dataset into a DataFrame per currency.
+
+    Money fields in the dataset are suffixed with their currency (e.g. "annual_gross_eur"). Each
+    currency's DataFrame gets that currency's money fields with the suffix removed, plus all of the
+    fields that don't depend on currency. Money fields are Int64 amounts if `typed`, otherwise
+    they're formatted like the rendered table. Returns {currency: DataFrame}.
+    """
+    symbols = {'eur': '€', 'gbp': '£', 'usd': '$'}
+    df = pd.DataFrame.from_records(records)
+    suffixes = tuple([f'_{currency}' for currency in ['eur', 'gbp', 'usd']])
+    shared_cols = [c for c in df.columns if not c.endswith(suffixes)]
+    dfs = dict()
+    for currency in currencies:
+        currency_cols = [c for c in df.columns if c.endswith(f'_{currency}')]
+        if len(currency_cols) == 0:
+            logging.warning(f'No {currency} salaries in the Capology salary dataset.')
+            continue
+        currency_df = df[shared_cols + currency_cols].copy()
+        # Some amounts are quoted in the dataset
+        for column in currency_cols:
+            currency_df[column] = currency_df[column].map(_money_number)
+        currency_df = currency_df.rename(
+            columns=dict([(c, c[:-len(f'_{currency}')]) for c in currency_cols])
+        )
+        currency_df = currency_df.rename(columns=salary_data_columns)
+        # Same column order as the rendered table, anything unrecognized goes at the end
+        ordered_cols = [c for c in salary_data_columns.values() if c in currency_df.columns]
+        ordered_cols += [c for c in currency_df.columns if c not in ordered_cols]
+        currency_df = type_money_columns(
+            currency_df[ordered_cols], salary_money_columns, currency.upper()
+        )
+        if not typed:
+            currency_df.attrs = dict()
+            for column in [c for c in salary_money_columns if c in currency_df.columns]:
+                currency_df[column] = currency_df[column].map(
+                    lambda x: None if pd.isna(x) else f'{symbols[currency]} {x:,}'
+                )
+        dfs[currency] = currency_df
+    return dfs
+
+
+def setup_selenium(proxy: Union[str, None]=None):
     options = Options()
     options.add_argument('--headless')
     options.add_argument('--no-sandbox')
@@ -50,20 +217,32 @@ def setup_selenium():
     options.add_argument("--ignore-certificate-errors")
     options.add_argument("--incognito")
     options.add_argument(f'--user-agent={choice(user_agents)}')
+    if proxy is not None:
+        options.add_argument(f'--proxy-server={proxy}')
     driver = gs.Chrome(options=options)
     return driver
 
+
+@trace_methods
 class Capology():
 
     # ==============================================================================================
-    def __init__(self) -> None:
+    def __init__(self, proxy_pool: Union[ProxyPool, None]=None) -> None:
+        # Sends requests (and the Selenium driver) through proxies
+        self.proxy_pool = proxy_pool
         self.valid_currencies = ['eur', 'gbp', 'usd']
+        # {league: {season string: season URL path}}, so the league page is only downloaded once
+        self._season_values: dict = dict()
+        # {(year, league, currency): salaries DataFrame}, reused by scrape_payrolls()
+        self._salaries: dict = dict()
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
     # ==============================================================================================
     def _webdriver_init(self) -> None:
         """Initializes a new webdriver"""
-        self.driver = setup_selenium()
+        self.driver = setup_selenium(
+            None if self.proxy_pool is None else self.proxy_pool.get()
+        )
 
     # ==============================================================================================
     def _webdriver_close(self) -> None:
@@ -81,6 +260,19 @@ class Capology():
 
         return f'https://www.capology.com/{comps[league]["url"]}/salaries/'
 
+    # ==============================================================================================
+    def _get_season_values(self, league: str) -> dict:
+        """Private, returns {season string: season URL path} for the league, cached per league"""
+        if league not in self._season_values:
+            soup = make_soup(
+                fetch(self.get_league_url(league), self.proxy_pool).content,
+                SoupStrainer('select', {'id': 'nav-submenu2'})
+            )
+            year_dropdown_tags = soup.find('select', {'id': 'nav-submenu2'})\
+                .find_all('option', value=True)  # type: ignore
+            self._season_values[league] = dict([(x.text, x['value']) for x in year_dropdown_tags])
+        return self._season_values[league]
+
     # ==============================================================================================
     def get_valid_seasons(self, league: str) -> Sequence[str]:
         """Returns valid season strings for the chosen league"""
@@ -89,11 +281,7 @@ class Capology():
         if league not in comps.keys():
             raise InvalidLeagueException(league, 'Capology', list(comps.keys()))
 
-        soup = BeautifulSoup(requests.get(self.get_league_url(league)).content, 'html.parser')
-        year_dropdown_tags = soup.find('select', {'id': 'nav-submenu2'}).find_all('option', value=True)
-        seasons = [x.text for x in year_dropdown_tags]
-
-        return seasons
+        return list(self._get_season_values(league).keys())
 
     # ==============================================================================================
     def get_season_url(self, year: str, league: str) -> str:
@@ -104,128 +292,359 @@ class Capology():
         if year not in valid_seasons:
             raise InvalidYearException(year, league, valid_seasons)
 
-        soup = BeautifulSoup(requests.get(self.get_league_url(league)).content, 'html.parser')
-        year_dropdown_tags = soup.find('select', {'id': 'nav-submenu2'}).find_all('option', value=True)
-        value = [x['value'] for x in year_dropdown_tags if x.text == year][0]
+        value = self._get_season_values(league)[year]
 
         return f'https://capology.com{value}'
 
     # ==============================================================================================
-    def scrape_salaries(self, year: str, league: str, currency: str) -> pd.DataFrame:
-        """Scrapes player salaries for the given league season."""
+    def _show_all_players(self) -> bool:
+        """Private, clicks the "All" pagination button. Returns False if it never became clickable"""
+        while True:
+            try:
+                all_btn = WebDriverWait(self.driver, 10).until(
+                    EC.element_to_be_clickable((By.LINK_TEXT, 'All'))
+                )
+                self.driver.execute_script('arguments[0].click()', all_btn)
+                return True
+            except StaleElementReferenceException:
+                pass
+            except TimeoutException:
+                logging.error("Timeout while waiting for the 'All' button to become clickable.")
+                return False
+
+    # ==============================================================================================
+    def _select_currency(self, currency: str) -> bool:
+        """Private, clicks the currency button. Returns False if it never became clickable"""
+        try:
+            currency_btn = WebDriverWait(self.driver, 10).until(
+                EC.element_to_be_clickable((By.ID, f'btn_{currency}'))
+            )
+            self.driver.execute_script('arguments[0].click()', currency_btn)
+            logging.info('Changed currency')
+            return True
+        except TimeoutException:
+            logging.error("Timeout while waiting for the currency button to become clickable.")
+            return False
+
+    # ==============================================================================================
+    def _get_tbody_html(self) -> str:
+        """Private, returns the outer HTML of the salary table body currently on the page"""
+        return self.driver.find_element(By.ID, 'table').find_element(By.TAG_NAME, 'tbody')\
+            .get_attribute('outerHTML')
+
+    # ==============================================================================================
+    def _read_salary_table(self, tbody_html: str) -> pd.DataFrame:
+        """Private, converts the salary table body HTML to a DataFrame with named columns"""
+        table_html = '<table>' + tbody_html + '</table>'
+        df = pd.read_html(StringIO(table_html))[0]
+
+        # Process DataFrame
+        if df.shape[1] == 13:
+            df = df.drop(columns=[1])
+            df.columns = [
+                'Player', 'Weekly Gross', 'Annual Gross', 'Expiration', 'Length', 'Total Gross',
+                'Status', 'Pos. group', 'Pos.', 'Age', 'Country', 'Club'
+            ]
+        elif df.shape[1] == 17:
+            df = df.drop(columns=[1, 16])
+            df.columns = [
+                'Player', 'Weekly Gross', 'Annual Gross', 'Annual Bonus', 'Signed',
+                'Expiration', 'Years Remaining', 'Gross Remaining', 'Release Clause', 'Status',
+                'Pos. group', 'Pos.', 'Age', 'Country', 'Club'
+            ]
+        else:
+            df.columns = [
+                'Player', 'Weekly Gross', 'Annual Gross', 'Adj. Gross', 'Pos. group', 'Age',
+                'Country', 'Club'
+            ]
+
+        return df
+
+    # ==============================================================================================
+    def _scrape_loaded_season(self, currencies: Sequence[str], typed: bool) -> dict:
+        """Private, reads the salary table in each currency from the season page that's already
+        loaded in the driver, toggling the currency in-place instead of reloading the page.
+
+        Returns {currency: DataFrame}. DataFrames are empty if the page couldn't be loaded.
+        """
+        if not self._show_all_players():
+            return dict([(currency, pd.DataFrame()) for currency in currencies])
+
+        salaries = dict()
+        for currency in currencies:
+            previous_html = self._get_tbody_html()
+            if not self._select_currency(currency):
+                salaries[currency] = pd.DataFrame()
+                continue
+            # The table is re-rendered in place, wait for the new values. The HTML won't change if
+            # the currency was already selected so don't treat the timeout as an error.
+            try:
+                WebDriverWait(self.driver, 5).until(
+                    lambda driver: self._get_tbody_html() != previous_html
+                )
+            except TimeoutException:
+                pass
+            df = self._read_salary_table(self._get_tbody_html())
+            if typed:
+                df = type_money_columns(df, salary_money_columns, currency.upper())
+            salaries[currency] = df
+
+        return salaries
+
+    # ==============================================================================================
+    def _cache_salaries(self, year: str, league: str, currency: str, df: pd.DataFrame) -> None:
+        """Private, keeps scraped salaries so scrape_payrolls() doesn't need to load them again"""
+        if df.shape[0] > 0:
+            self._salaries[(year, league, currency)] = df
+
+    # ==============================================================================================
+    def scrape_salaries(
+            self, year: str, league: str, currency: str, typed: bool=False
+    ) -> pd.DataFrame:
+        """Scrapes player salaries for the given league season.
+
+        If `typed` is True, the money columns are converted from currency strings to Int64 amounts
+        and the currency is recorded in the DataFrame's `attrs['units']`.
+        """
+        if not isinstance(typed, bool):
+            raise TypeError('`typed` must be a boolean.')
         if not isinstance(currency, str):
             raise TypeError('`currency` must be a string.')
         if currency not in self.valid_currencies:
             raise InvalidCurrencyException()
 
+        season_url = self.get_season_url(year, league)
         self._webdriver_init()
         try:
-            self.driver.get(self.get_season_url(year, league))
-
-            # Show all players on one page
-            done = False
-            while not done:
-                try:
-                    all_btn = WebDriverWait(self.driver, 10).until(EC.element_to_be_clickable((By.LINK_TEXT, 'All')))
-                    self.driver.execute_script('arguments[0].click()', all_btn)
-                    done = True
-                except StaleElementReferenceException:
-                    pass
-                except TimeoutException:
-                    logging.error("Timeout while waiting for the 'All' button to become clickable.")
-                    return pd.DataFrame()
-
-            # Select the currency
-            try:
-                currency_btn = WebDriverWait(self.driver, 10).until(EC.element_to_be_clickable((By.ID, f'btn_{currency}')))
-                self.driver.execute_script('arguments[0].click()', currency_btn)
-                logging.info('Changed currency')
-            except TimeoutException:
-                logging.error("Timeout while waiting for the currency button to become clickable.")
-                return pd.DataFrame()
-
-            # Table to pandas df
-            tbody_html = self.driver.find_element(By.ID, 'table').find_element(By.TAG_NAME, 'tbody').get_attribute('outerHTML')
-            table_html = '<table>' + tbody_html + '</table>'
-            df = pd.read_html(StringIO(table_html))[0]
-
-            # Process DataFrame
-            if df.shape[1] == 13:
-                df = df.drop(columns=[1])
-                df.columns = [
-                    'Player', 'Weekly Gross', 'Annual Gross', 'Expiration', 'Length', 'Total Gross',
-                    'Status', 'Pos. group', 'Pos.', 'Age', 'Country', 'Club'
-                ]
-            elif df.shape[1] == 17:
-                df = df.drop(columns=[1, 16])
-                df.columns = [
-                    'Player', 'Weekly Gross', 'Annual Gross', 'Annual Bonus', 'Signed',
-                    'Expiration', 'Years Remaining', 'Gross Remaining', 'Release Clause', 'Status',
-                    'Pos. group', 'Pos.', 'Age', 'Country', 'Club'
-                ]
-            else:
-                df.columns = [
-                    'Player', 'Weekly Gross', 'Annual Gross', 'Adj. Gross', 'Pos. group', 'Age',
-                    'Country', 'Club'
-                ]
-
-            return df
+            self.driver.get(season_url)
+            salaries = self._scrape_loaded_season([currency,], typed)[currency]
+        finally:
+            self._webdriver_close()
+
+        self._cache_salaries(year, league, currency, salaries)
+        return salaries
+
+    # ==============================================================================================
+    def scrape_salaries_many(
+            self, years: Sequence[str], leagues: Sequence[str], currencies: Sequence[str],
+            typed: bool=False
+    ) -> dict:
+        """Scrapes player salaries for many league seasons and currencies in one browser session.
+
+        A single webdriver is kept alive for all of the league seasons, each season page is only
+        loaded once, and all of the currencies are read from that page by toggling the currency
+        in-place. All league/year combinations are validated before the browser is started.
+
+        Parameters
+        ----------
+        years : list of str
+            Seasons to scrape (e.g, "2020-21"). Every year must be valid for every league, call
+            get_valid_seasons(league) to see valid seasons for a league.
+        leagues : list of str
+            Leagues to scrape. See the comps variable in ScraperFC.Capology for valid leagues.
+        currencies : list of str
+            Currencies to scrape. Options are "eur", "gbp", and "usd".
+        typed : bool, optional, default False
+            If True, money columns are converted to Int64 amounts. See scrape_salaries().
+
+        Returns
+        -------
+        : dict
+            {(year, league, currency): DataFrame, ...}. Same DataFrames as scrape_salaries().
+        """
+        if not isinstance(typed, bool):
+            raise TypeError('`typed` must be a boolean.')
+        for arg, name in [(years, 'years'), (leagues, 'leagues'), (currencies, 'currencies')]:
+            if isinstance(arg, str) or not all([isinstance(x, str) for x in arg]):
+                raise TypeError(f'`{name}` must be a list of strings.')
+        for currency in currencies:
+            if currency not in self.valid_currencies:
+                raise InvalidCurrencyException()
+
+        # Validate everything before starting the browser, uses the cached season values
+        season_urls = dict()
+        for league in leagues:
+            for year in years:
+                season_urls[(year, league)] = self.get_season_url(year, league)
+
+        salaries = dict()
+        self._webdriver_init()
+        try:
+            for (year, league), season_url in season_urls.items():
+                logging.info(f'Scraping {year} {league} salaries')
+                self.driver.get(season_url)
+                season_salaries = self._scrape_loaded_season(currencies, typed)
+                for currency, df in season_salaries.items():
+                    salaries[(year, league, currency)] = df
+                    self._cache_salaries(year, league, currency, df)
         finally:
             self._webdriver_close()
 
+        return salaries
+
+    # ==============================================================================================
+    def scrape_salaries_http(
+            self, year: str, league: str, currencies: Sequence[str]=('eur', 'gbp', 'usd'),
+            typed: bool=False
+    ) -> dict:
+        """Scrapes player salaries for the given league season without a browser.
+
+        Reads the salary dataset that's embedded in the season page (the data Capology's salary
+        table is rendered from) with a single HTTP request, instead of clicking through the page
+        with Selenium. The dataset includes every player, so there's no need to click "All", and
+        it includes the salaries in every currency, so all currencies come from one request.
+
+        Parameters
+        ----------
+        year : str
+            Season to be scraped (e.g, "2020-21"). Call get_valid_seasons(league) to see valid
+            seasons for a league.
+        league : str
+            League to be scraped (e.g., "EPL"). See the comps variable in ScraperFC.Capology for
+            valid leagues.
+        currencies : list of str, optional
+            Currencies to return. Options are "eur", "gbp", and "usd". Defaults to all three.
+        typed : bool, optional, default False
+            If True, money columns are returned as Int64 amounts with the currency recorded in
+            each DataFrame's `attrs['units']`. If False, they're formatted like the rendered table
+            (e.g. "£ 1,250,000").
+
+        Returns
+        -------
+        : dict
+            {currency: DataFrame, ...}. The DataFrames will be empty if the salary dataset couldn't
+            be found on the page.
+        """
+        if isinstance(currencies, str) or not all([isinstance(x, str) for x in currencies]):
+            raise TypeError('`currencies` must be a list of strings.')
+        for currency in currencies:
+            if currency not in self.valid_currencies:
+                raise InvalidCurrencyException()
+        if not isinstance(typed, bool):
+            raise TypeError('`typed` must be a boolean.')
+
+        r = fetch(
+            self.get_season_url(year, league), self.proxy_pool,
+            headers={'user-agent': choice(user_agents)}
+        )
+        records = _salary_records_from_html(r.content)
+        if len(records) == 0:
+            logging.error(f'Could not find the salary dataset for {year} {league}.')
+            return dict([(currency, pd.DataFrame()) for currency in currencies])
+
+        salaries = _salary_dfs_from_records(records, currencies, typed)
+        for currency, df in salaries.items():
+            self._cache_salaries(year, league, currency, df)
+        return salaries
+
     # ==============================================================================================
-    def scrape_payrolls(self, year: str, league: str, currency: str) -> pd.DataFrame:
-        """Deprecated. Use scrape_salaries() instead."""
-        raise NotImplementedError(
-            '`scrape_payrolls()` has been deprecated. Please use `scrape_salaries()` instead.'
+    def scrape_payrolls(
+            self, year: str, league: str, currency: str,
+            salaries: Union[pd.DataFrame, None]=None, validate: bool=False
+    ) -> pd.DataFrame:
+        """ Computes team payrolls for the given league season from the player salaries.
+
+        Payrolls are summed from the salary table by club instead of being scraped from Capology's
+        payroll page. If the salaries for this league season and currency were already scraped by
+        this Capology instance (with scrape_salaries(), scrape_salaries_many(), or
+        scrape_salaries_http()), no pages are loaded at all.
+
+        Parameters
+        ----------
+        year : str
+            Season to be scraped (e.g, "2020-21"). Please use the same string that is in the
+            season dropdown on the Capology website. Call
+            ScraperFC.Capology.get_valid_seasons(league) to see valid seasons for a league.
+        league : str
+            League to be scraped (e.g., "EPL"). See the comps variable in ScraperFC.Capology for
+            valid leagues for this module.
+        currency : str
+            The currency for the returned payrolls. Options are "eur" for Euro, "gbp" for British
+            Pound, and "USD" for US Dollar
+        salaries : DataFrame or None, optional
+            Salary table to compute the payrolls from, e.g. the output of scrape_salaries(). If
+            None, the salaries already scraped by this instance are used, or scrape_salaries() is
+            called if there aren't any.
+        validate : bool, optional, default False
+            If True, Capology's payroll page is also scraped and its annual gross payrolls are added
+            as the "Official Annual Gross" column. Clubs whose payrolls differ by more than 1% are
+            logged as warnings. This loads the payroll page with Selenium.
+
+        Returns
+        -------
+        : DataFrame
+            The payrolls of all teams in the given league season. Money columns are Int64 amounts
+            and their currency is recorded in the DataFrame's `attrs['units']`.
+        """
+        if not isinstance(currency, str):
+            raise TypeError('`currency` must be a string.')
+        if currency not in self.valid_currencies:
+            raise InvalidCurrencyException()
+        if salaries is not None and not isinstance(salaries, pd.DataFrame):
+            raise TypeError('`salaries` must be a DataFrame or None.')
+        if not isinstance(validate, bool):
+            raise TypeError('`validate` must be a boolean.')
+
+        if salaries is None:
+            salaries = self._salaries.get((year, league, currency))
+        if salaries is None:
+            salaries = self.scrape_salaries(year, league, currency)
+        if salaries.shape[0] == 0:
+            return pd.DataFrame()
+
+        salaries = type_money_columns(salaries, salary_money_columns, currency.upper())
+        money_cols = [c for c in ['Weekly Gross', 'Annual Gross', 'Adj. Gross'] if c in salaries]
+        payrolls = salaries.groupby('Club')[money_cols].sum()
+        # Annual gross per position group, same breakdown as Capology's payroll page
+        if 'Pos. group' in salaries.columns:
+            position_payrolls = salaries.pivot_table(
+                index='Club', columns='Pos. group', values='Annual Gross', aggfunc='sum',
+                fill_value=0
+            ).rename(columns=position_groups)
+            position_payrolls.columns.name = None
+            payrolls = payrolls.join(position_payrolls)
+        payrolls = payrolls.sort_values('Annual Gross', ascending=False).reset_index()
+        payrolls = type_money_columns(
+            payrolls, [c for c in payrolls.columns if c != 'Club'], currency.upper()
         )
 
-        # """ Scrapes team payrolls for the given league season.
-
-        # Parameters
-        # ----------
-        # year : str
-        #     Season to be scraped (e.g, "2020-21"). Please use the same string that is in the
-        #     season dropdown on the Capology website. Call
-        #     ScraperFC.Capology.get_valid_seasons(league) to see valid seasons for a league.
-        # league : str
-        #     League to be scraped (e.g., "EPL"). See the comps variable in ScraperFC.Capology for
-        #     valid leagues for this module.
-        # currency : str
-        #     The currency for the returned salaries. Options are "eur" for Euro, "gbp" for British
-        #     Pound, and "USD" for US Dollar
-        # Returns
-        # -------
-        # : Pandas DataFrame
-        #     The payrolls of all teams in the given league season
-        # """
-        # if type(currency) is not str:
-        #     raise TypeError('`currency` must be a string.')
-        # if currency not in self.valid_currencies:
-        #     raise InvalidCurrencyException()
-
-        # self._webdriver_init()
-        # try:
-        #     self.driver.get(self.get_season_url(year, league))
-
-        #     # select the currency
-        #     currency_btn = (
-        #         WebDriverWait(self.driver, 10)
-        #         .until(EC.element_to_be_clickable((By.ID, f'btn_{currency}')))
-        #     )
-        #     self.driver.execute_script('arguments[0].click()', currency_btn)
-
-        #     # table to pandas df
-        #     table = (
-        #         WebDriverWait(self.driver, 10).until(EC.element_to_be_clickable((By.ID, 'table')))
-        #     )
-        #     df = pd.read_html(StringIO(table.get_attribute('outerHTML')))[0]
-        #     # df.columns = [
-        #     #     'Club', 'Weekly Gross (000s)', 'Annual Gross (000s)',
-        #     #     'Inflcation-Adj. Gross (000s)', 'Keeper (000s)', 'Defense (000s)',
-        #     #     'Midfield (000s)', 'Forward (000s)'
-        #     # ]
-
-        #     return df
-        # finally:
-        #     self._webdriver_close()
+        if validate:
+            official = self._scrape_official_payrolls(year, league, currency)
+            payrolls = payrolls.merge(official, on='Club', how='left')
+            difference = (payrolls['Annual Gross'] - payrolls['Official Annual Gross']).abs()
+            mismatched = payrolls.loc[difference > 0.01 * payrolls['Official Annual Gross'], 'Club']
+            for club in mismatched:
+                logging.warning(f'{club} payroll differs from the Capology payroll page by >1%.')
+
+        return payrolls
+
+    # ==============================================================================================
+    def _scrape_official_payrolls(self, year: str, league: str, currency: str) -> pd.DataFrame:
+        """Private, scrapes the annual gross payrolls from Capology's payroll page.
+
+        Returns a DataFrame with "Club" and "Official Annual Gross" columns.
+        """
+        payrolls_url = self.get_season_url(year, league).replace('/salaries/', '/payrolls/')
+        self._webdriver_init()
+        try:
+            self.driver.get(payrolls_url)
+            if not self._select_currency(currency):
+                return pd.DataFrame(columns=['Club', 'Official Annual Gross'])
+            table = WebDriverWait(self.driver, 10).until(
+                EC.presence_of_element_located((By.ID, 'table'))
+            )
+            df = pd.read_html(StringIO(table.get_attribute('outerHTML')))[0]
+        finally:
+            self._webdriver_close()
+
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = df.columns.get_level_values(-1)
+        annual_col = [c for c in df.columns if 'annual gross' in str(c).lower()][0]
+        official = pd.DataFrame({
+            'Club': df.iloc[:, 0],
+            'Official Annual Gross': parse_money(df[annual_col]),
+        })
+        # The payroll page lists amounts in thousands
+        if '000' in str(annual_col):
+            official['Official Annual Gross'] *= 1000
+        return official
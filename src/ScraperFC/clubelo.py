@@ -9,6 +9,9 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import TimeoutException
 from .scraperfc_exceptions import ClubEloInvalidTeamException
+from .fetching import ProxyPool, notify, sleep
+from .tracing import trace_methods
+from typing import Union
 
 import time
 
@@ -20,7 +23,7 @@ user_agents = [
     'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.96 Safari/537.36'
 ]
 
-def setup_selenium():
+def setup_selenium(proxy: Union[str, None]=None):
     options = Options()
     options.add_argument('--headless')
     options.add_argument('--no-sandbox')
@@ -31,20 +34,26 @@ def setup_selenium():
     options.add_argument("--ignore-certificate-errors")
     options.add_argument("--incognito")
     options.add_argument(f'--user-agent={choice(user_agents)}')
+    if proxy is not None:
+        options.add_argument(f'--proxy-server={proxy}')
     driver = gs.Chrome(options=options)
     return driver
 
 def get_page_content(url, driver, request_interval=2, page_load_delay=2):
+    start = time.monotonic()
     driver.get(url)
-    time.sleep(request_interval)
+    seconds = time.monotonic() - start
+    sleep(request_interval, url)
     html_content = driver.page_source
-    time.sleep(page_load_delay)
+    notify('request', url, status_code=200, seconds=seconds, n_bytes=len(html_content))
+    sleep(page_load_delay, url)
     return html_content
 
+@trace_methods
 class ClubElo:
 
-    def __init__(self):
-        self.driver = setup_selenium()
+    def __init__(self, proxy_pool: Union[ProxyPool, None]=None) -> None:
+        self.driver = setup_selenium(None if proxy_pool is None else proxy_pool.get())
 
     def __del__(self):
         self.driver.close()
@@ -1,11 +1,19 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer, Tag
 import requests
 from .scraperfc_exceptions import InvalidYearException, InvalidLeagueException, \
     NoMatchLinksException, FBrefRateLimitException
+from .caching import ParseCache, code_version
+from .fetching import ProxyPool, fetch, notify, rate_limiter, replaying, sleep, with_retries
+from .pipeline import parse_pages
+from .shared_functions import make_soup
+from .sinks import Sink
+from .tracing import trace_methods, traced
 import time
+from functools import partial
+from io import StringIO
+from types import SimpleNamespace
 import numpy as np
 import pandas as pd
-from io import StringIO
 import re
 from tqdm import tqdm
 from selenium import webdriver
@@ -152,13 +160,350 @@ comps = {
         'finders': ['NWSL-Fall-Series']},
 }
 
+# Collapses runs of whitespace in cell text, like pd.read_html()
+_whitespace_re = re.compile(r'[\r\n]+|\s{2,}')
+
+
+# ==================================================================================================
+def _cell_text(cell: Tag) -> str:
+    return _whitespace_re.sub(' ', cell.get_text()).strip()
+
+
+# ==================================================================================================
+def _type_column(values: list) -> pd.Series:
+    """ Private, converts a column of cell strings to numbers if all of its non-empty values are
+    numbers (with "," thousands separators), and empty strings to NaN.
+    """
+    # object dtype, so that an all-blank column doesn't become float64, which has no .str
+    column = pd.Series(values, dtype=object).replace('', np.nan)
+    if not column.notna().any():
+        return column
+    numbers = pd.to_numeric(column.str.replace(',', '', regex=False), errors='coerce')
+    if numbers.notna().sum() == column.notna().sum():
+        return numbers
+    return column
+
+
+# ==================================================================================================
+@traced('build')
+def table_to_df(
+        table_tag: Tag, column_keys: str='header', link_stats: Sequence[str]=('player', 'team')
+) -> tuple[pd.DataFrame, dict]:
+    """ Converts an FBref table tag to a DataFrame in one pass over the parsed table.
+
+    Replaces `pd.read_html(StringIO(str(table_tag)))[0]`, which serializes the table and parses
+    it again. The spacer rows and header repeats that FBref inserts in the body of long tables are
+    dropped, and the links in the cells are collected in the same pass.
+
+    Parameters
+    ----------
+    table_tag : bs4.element.Tag
+        The <table> tag
+    column_keys : str, optional, default "header"
+        "header" names the columns like pd.read_html(), with a MultiIndex if the table has an
+        over-header row. "data-stat" names the columns by the `data-stat` attributes of the cells,
+        e.g. "minutes", which are stable and unique.
+    link_stats : list of str, optional
+        `data-stat`s of the cells to collect the links of.
+
+    Returns
+    -------
+    : tuple
+        (DataFrame, {data-stat: list of hrefs, ...}). The href lists have one item per row of the
+        DataFrame, None for cells without a link.
+    """
+    if column_keys not in ['header', 'data-stat']:
+        raise ValueError('`column_keys` must be "header" or "data-stat".')
+
+    # Header rows, spanning cells are repeated for every column they cover
+    thead = table_tag.find('thead')
+    header_rows = list()
+    stats = list()  # data-stat of each column
+    for tr in (thead.find_all('tr', recursive=False) if isinstance(thead, Tag) else []):
+        row = list()
+        for cell in tr.find_all(['th', 'td'], recursive=False):
+            row += [_cell_text(cell)] * int(cell.get('colspan', 1))
+        header_rows.append(row)
+        if 'over_header' not in tr.get('class', []):
+            stats = [cell.get('data-stat') for cell in tr.find_all(['th', 'td'], recursive=False)]
+
+    # Body and footer rows
+    data = list()
+    links: dict = dict([(stat, list()) for stat in link_stats])
+    bodies = table_tag.find_all(['tbody', 'tfoot'], recursive=False) or [table_tag]
+    for body in bodies:
+        for tr in body.find_all('tr', recursive=False):
+            classes = tr.get('class', [])
+            if 'thead' in classes or 'over_header' in classes or 'spacer' in classes:
+                continue
+            row, row_links = list(), dict()
+            for cell in tr.find_all(['th', 'td'], recursive=False):
+                row += [_cell_text(cell)] * int(cell.get('colspan', 1))
+                stat = cell.get('data-stat')
+                if stat in links:
+                    a = cell.find('a', href=True)
+                    row_links[stat] = a['href'] if a is not None else None
+            data.append(row)
+            for stat in links:
+                links[stat].append(row_links.get(stat))
+
+    n_columns = max([len(row) for row in header_rows + data] or [0])
+    data = [row + [''] * (n_columns - len(row)) for row in data]
+    columns: list
+    if column_keys == 'data-stat' and len(stats) == n_columns:
+        columns = list(stats)
+    elif len(header_rows) > 1:
+        columns = [tuple(
+            row[i] if i < len(row) and row[i] != '' else f'Unnamed: {i}_level_{level}'
+            for level, row in enumerate(header_rows)
+        ) for i in range(n_columns)]
+    elif len(header_rows) == 1:
+        columns = [name if name != '' else f'Unnamed: {i}'
+                   for i, name in enumerate(header_rows[0])]
+    else:
+        columns = list(range(n_columns))
+
+    # Mangle duplicate column names like pd.read_html(), e.g. "xG" and "xG.1"
+    counts: dict = dict()
+    for i, column in enumerate(columns):
+        if column in counts:
+            counts[column] += 1
+            columns[i] = (column[:-1] + (f'{column[-1]}.{counts[column]}',)
+                          if isinstance(column, tuple) else f'{column}.{counts[column]}')
+        else:
+            counts[column] = 0
+
+    df = pd.DataFrame(dict([
+        (i, _type_column([row[i] for row in data])) for i in range(n_columns)
+    ]))
+    df.columns = (pd.MultiIndex.from_tuples(columns) if len(columns) > 0
+                  and isinstance(columns[0], tuple) else pd.Index(columns))
+    return df, links
+
+
+# ==================================================================================================
+def _squad_stats_df(table_tag: Tag) -> pd.DataFrame:
+    """ Private, converts a squad or opponent stats table and adds the team IDs.
+    """
+    df, links = table_to_df(table_tag)
+    df['Team ID'] = [None if href is None else href.split('/')[3] for href in links['team']]
+    squad = df.loc[:, (slice(None), 'Squad')].iloc[:, 0]  # type: ignore
+    return df.loc[squad.notna()].reset_index(drop=True)
+
+
+# ==================================================================================================
+@traced('build')
+def _stats_dfs(
+        squad_stats_tag: Union[Tag, None], opponent_stats_tag: Union[Tag, None],
+        player_stats_tag: Union[Tag, None]
+) -> tuple:
+    """ Private, converts the tables of a stats page to the DataFrames of FBref.scrape_stats(),
+    with the team and player links from the same pass over the tables.
+    """
+    squad_stats = _squad_stats_df(squad_stats_tag) if squad_stats_tag is not None else None
+    opponent_stats = _squad_stats_df(opponent_stats_tag) if opponent_stats_tag is not None else None
+    player_stats = None
+    if player_stats_tag is not None:
+        player_stats, links = table_to_df(player_stats_tag)
+        player_links = [None if href is None else 'https://fbref.com' + href
+                        for href in links['player']]
+        player_stats['Player Link'] = player_links
+        player_stats['Player ID'] = [None if x is None else x.split('/')[-2] for x in player_links]
+    return squad_stats, opponent_stats, player_stats
+
+
+# ==================================================================================================
+def _match_info(soup: BeautifulSoup) -> dict:
+    """ Private, parses the date, stage, teams and score of a match page.
+    """
+    date = soup.find("div", {"class": "scorebox_meta"}).find("strong").text  # type: ignore
+    stage = soup.find("div", {"role": "main"}).find("div").text  # type: ignore
+
+    # Team names, IDs, goals, and xG
+    team_els = soup.find("div", {"class": "scorebox"}).find_all("div", recursive=False)  # type: ignore
+    info = {'date': date, 'stage': stage}
+    for side, team_el in zip(['home', 'away'], team_els[:2]):
+        info[f'{side}_team'] = team_el.find("div").text.strip()
+        info[f'{side}_team_id'] = team_el.find("div").find("strong").find("a")["href"].split("/")[3]
+        info[f'{side}_goals'] = int(team_el.find("div", {"class": "score"}).text)
+    return info
+
+
+# ==================================================================================================
+@traced('build')
+def _tidy_match_tables(soup: BeautifulSoup, link: str) -> dict:
+    """ Private, parses a match page into normalized tables, see FBref.scrape_match(tidy=True).
+    """
+    match_id = link.split('/')[5]
+    info = _match_info(soup)
+    matches = pd.DataFrame([{'match_id': match_id, 'link': link, **info}])
+    tables = {'matches': matches}
+
+    def player_rows(table_tag: Tag, team_id: str, is_home: bool) -> pd.DataFrame:
+        df, links = table_to_df(table_tag, column_keys='data-stat')
+        df.insert(0, 'player_id', [None if href is None else href.split('/')[3]
+                                   for href in links['player']])
+        df.insert(0, 'is_home', is_home)
+        df.insert(0, 'team_id', team_id)
+        df.insert(0, 'match_id', match_id)
+        # Drop the team totals row in the table footer
+        return df.loc[df['player_id'].notna()].reset_index(drop=True)
+
+    player_tables: dict = dict()
+    for side, is_home in [('home', True), ('away', False)]:
+        team_id = info[f'{side}_team_id']
+        for table_tag in soup.find_all("table", {"id": re.compile(f"^stats_{team_id}_")}):
+            category = "_".join(table_tag["id"].split("_")[2:])
+            player_tables.setdefault(f'player_{category}', list())\
+                .append(player_rows(table_tag, team_id, is_home))
+        for table_tag in soup.find_all("table", {"id": re.compile(f"keeper_stats_{team_id}")}):
+            player_tables.setdefault('keeper_stats', list())\
+                .append(player_rows(table_tag, team_id, is_home))
+    for name, dfs in player_tables.items():
+        tables[name] = pd.concat(dfs, axis=0, ignore_index=True)
+
+    # All shots are in shots_all, the per team shots tables are subsets of it
+    shots_tag = soup.find("table", {"id": "shots_all"})
+    if shots_tag is not None:
+        shots, links = table_to_df(shots_tag, column_keys='data-stat')  # type: ignore
+        shots.insert(0, 'player_id', [None if href is None else href.split('/')[3]
+                                      for href in links['player']])
+        shots.insert(0, 'team_id', [None if href is None else href.split('/')[3]
+                                    for href in links['team']])
+        shots.insert(0, 'match_id', match_id)
+        tables['shots'] = shots
+
+    return tables
+
+
+# The functions whose output scrape_match(tidy=True) depends on, their source code versions the
+# parse cache
+_tidy_parsers: list = [_tidy_match_tables, _match_info, table_to_df, _cell_text, _type_column]
+
+
+# ==================================================================================================
+@traced('build')
+def _match_df(soup: BeautifulSoup, link: str) -> pd.DataFrame:
+    """ Private, converts a parsed match page to the 1-row DataFrame of FBref.scrape_match().
+    """
+    info = _match_info(soup)
+    date, stage = info['date'], info['stage']
+    home_name, home_id, home_goals = \
+        info['home_team'], info['home_team_id'], info['home_goals']
+    away_name, away_id, away_goals = \
+        info['away_team'], info['away_team_id'], info['away_goals']
+
+    # Outfield player stats tables
+    home_player_stats_tag, away_player_stats_tag = soup.find_all(
+        "div", {"id": re.compile("all_player_stats")}
+    )
+    home_player_stats_table_tags = home_player_stats_tag\
+        .find_all("table", re.compile("stats_"))
+    away_player_stats_table_tags = away_player_stats_tag\
+        .find_all("table", re.compile("stats_"))
+
+    home_player_stats_dict = dict()
+    for table_tag in home_player_stats_table_tags:
+        table_name = " ".join(table_tag["id"].split("_")[2:]).capitalize()
+        table_df, _ = table_to_df(table_tag)
+        home_player_stats_dict[table_name] = table_df
+
+    away_player_stats_dict = dict()
+    for table_tag in away_player_stats_table_tags:
+        table_name = " ".join(table_tag["id"].split("_")[2:]).capitalize()
+        table_df, _ = table_to_df(table_tag)
+        away_player_stats_dict[table_name] = table_df
+
+    # Keeper stats tables
+    # Do home and away separately because some matches only have GK stats for 1 team
+    home_gk_table_tag = soup.find("table", {"id": re.compile(f"keeper_stats_{home_id}")})
+    if home_gk_table_tag:
+        home_gk_df, _ = table_to_df(home_gk_table_tag)  # type: ignore
+        home_player_stats_dict["Keeper"] = home_gk_df
+    else:
+        home_player_stats_dict["Keeper"] = None  # type: ignore
+    
+    away_gk_table_tag = soup.find("table", {"id": re.compile(f"keeper_stats_{away_id}")})
+    if away_gk_table_tag:
+        away_gk_df, _ = table_to_df(away_gk_table_tag)  # type: ignore
+        away_player_stats_dict["Keeper"] = away_gk_df
+    else:
+        away_player_stats_dict["Keeper"] = None  # type: ignore
+
+    # Shots tables
+    # Do these separately too because some matches only have data for 1 team
+    shots_dict = {"Both": None, "Home": None, "Away": None}
+    all_shots_table_tag = soup.find("table", {"id": "shots_all"})
+    if all_shots_table_tag:
+        all_shots_df, _ = table_to_df(all_shots_table_tag)  # type: ignore
+        shots_dict["Both"] = all_shots_df  # type: ignore
+    
+    home_shots_table_tag = soup.find("table", {"id": f"shots_{home_id}"})
+    if home_shots_table_tag:
+        home_shots_df, _ = table_to_df(home_shots_table_tag)  # type: ignore
+        shots_dict["Home"] = home_shots_df  # type: ignore
+    
+    away_shots_table_tag = soup.find("table", {"id": f"shots_{away_id}"})
+    if away_shots_table_tag:
+        away_shots_df, _ = table_to_df(away_shots_table_tag)  # type: ignore
+        shots_dict["Away"] = away_shots_df  # type: ignore
+
+    # 1-row df for output
+    match_df_data = {
+        "Link": link,
+        "Date": date,
+        "Stage": stage,
+        "Home Team": home_name,
+        "Away Team": away_name,
+        "Home Team ID": home_id,
+        "Away Team ID": away_id,
+        "Home Goals": home_goals,
+        "Away Goals": away_goals,
+        "Home Player Stats": pd.Series(home_player_stats_dict),
+        "Away Player Stats": pd.Series(away_player_stats_dict),
+        "Shots": pd.Series(shots_dict)
+    }
+    match_df = pd.Series(match_df_data).to_frame().T
+
+    return match_df
+
+
+# ==================================================================================================
+def _parse_match_page(
+        link: str, content: bytes, tidy: bool=False, parse_cache: Union[ParseCache, None]=None
+) -> Union[pd.DataFrame, dict]:
+    """ Private, parses the content of a match page, see FBref.scrape_match(). A module level
+    function, so that it can be run in pipeline.parse_pages() workers.
+    """
+    if tidy and parse_cache is not None:
+        return parse_cache.get_or_parse(
+            'fbref_match', code_version(*_tidy_parsers), link, content,
+            lambda: _tidy_match_tables(make_soup(content), link)
+        )
+    soup = make_soup(content)
+    if tidy:
+        return _tidy_match_tables(soup, link)
+    return _match_df(soup, link)
+
 
+@trace_methods
 class FBref():
 
     # ==============================================================================================
-    def __init__(self, wait_time: int=7) -> None:
+    def __init__(
+            self, wait_time: int=7, proxy_pool: Union[ProxyPool, None]=None,
+            parse_cache: Union[ParseCache, None]=None
+    ) -> None:
         # FBref rate limits bots -- https://www.sports-reference.com/bot-traffic.html
+        # Requests are paced by FBref's adaptive rate limiter (see fetching.RateLimiter), which is
+        # shared by all instances and capped at FBref's limit of 10 requests per minute. The
+        # requests of this instance are also spaced at least `wait_time` seconds apart.
         self.wait_time = wait_time
+        self._next_request = 0.0  # monotonic time this instance can send its next request at
+        # Sends requests (and the Selenium driver) through proxies
+        self.proxy_pool = proxy_pool
+        # Skips re-parsing match pages that haven't changed, see scrape_match(tidy=True)
+        self.parse_cache = parse_cache
 
     # ==============================================================================================
     def _driver_init(self) -> None:
@@ -169,6 +514,8 @@ class FBref():
         options.add_argument('--headless')
         prefs = {'profile.managed_default_content_settings.images': 2}  # don't load images
         options.add_experimental_option('prefs', prefs)
+        if self.proxy_pool is not None:
+            options.add_argument(f'--proxy-server={self.proxy_pool.get()}')
         self.driver = webdriver.Chrome(options=options)
 
     # ==============================================================================================
@@ -178,23 +525,52 @@ class FBref():
         self.driver.close()
         self.driver.quit()
 
+    # ==============================================================================================
+    def _space(self, url: str) -> None:
+        """ Private, sleeps until `wait_time` seconds after the previous request of this instance.
+        Replayed requests aren't spaced.
+        """
+        if replaying(url):
+            return
+        wait = self._next_request - time.monotonic()
+        if wait > 0:
+            sleep(wait, url)
+        self._next_request = time.monotonic() + self.wait_time
+
     # ==============================================================================================
     def _get(self, url: str) -> requests.Response:
-        """ Private, calls requests.get() and enforces FBref's wait time.
+        """ Private, calls fetching.fetch(), which paces the requests. 429 responses are retried
+        with backoff (see fetching.RetryPolicy), FBrefRateLimitException is raised if the retries
+        run out.
         """
-        response = requests.get(url)
-        time.sleep(self.wait_time)
+        self._space(url)
+        response = fetch(url, self.proxy_pool)
         if response.status_code == 429:
             raise FBrefRateLimitException()
         return response
 
     # ==============================================================================================
     def _driver_get(self, url: str) -> None:
-        """ Private, calls driver.get() and enforces FBref's wait time.
+        """ Private, calls driver.get(), paced by FBref's rate limiter. Rate limited pages are
+        retried like in _get().
         """
-        self.driver.get(url)
-        time.sleep(self.wait_time)
-        if "429 error" in self.driver.page_source:
+        def load() -> SimpleNamespace:
+            self._space(url)
+            limiter = rate_limiter(url)
+            if limiter is not None:
+                limiter.wait(url)
+            start = time.monotonic()
+            self.driver.get(url)
+            page_source = self.driver.page_source
+            status_code = 429 if "429 error" in page_source else 200
+            seconds = time.monotonic() - start
+            if limiter is not None:
+                limiter.update(status_code, seconds)
+            notify('request', url, status_code=status_code, seconds=seconds,
+                   n_bytes=len(page_source))
+            return SimpleNamespace(status_code=status_code, headers=dict())
+
+        if with_retries(url, load).status_code == 429:
             self._driver_close()
             raise FBrefRateLimitException()
 
@@ -220,7 +596,7 @@ class FBref():
 
         url = comps[league]['history url']  # type: ignore
         r = self._get(url)  # type: ignore
-        soup = BeautifulSoup(r.content, 'html.parser')
+        soup = make_soup(r.content, SoupStrainer('th'))
 
         season_urls = dict([
             (x.text, x.find('a')['href'])
@@ -296,7 +672,7 @@ class FBref():
         split[-1] = '-'.join(split[-1].split('-')[:-1]) + '-Scores-and-Fixtures'
         fixtures_url = '/'.join(split)
 
-        soup = BeautifulSoup(self._get(fixtures_url).content, 'html.parser')
+        soup = make_soup(self._get(fixtures_url).content, SoupStrainer('td'))
 
         # Identify match links
         match_urls = list()
@@ -332,8 +708,9 @@ class FBref():
             vary by competition.
         """
         season_link = self.get_season_link(year, league)
+        response = self._get(season_link)
         tables = list()
-        for df in pd.read_html(season_link):
+        for df in pd.read_html(StringIO(response.text)):
             if 'Rk' in df.columns:
                 # Remove all-NaN rows
                 df = df.dropna(axis=0, how='all').reset_index(drop=True)
@@ -343,118 +720,44 @@ class FBref():
         return tables
 
     # ==============================================================================================
-    def scrape_match(self, link: str) -> pd.DataFrame:
+    def scrape_match(self, link: str, tidy: bool=False) -> Union[pd.DataFrame, dict]:
         """ Scrapes an FBref match page.
 
         Parameters
         ----------
         link : str
             URL to the FBref match page
+        tidy : bool, optional, default False
+            If True, returns normalized tables instead of a 1-row DataFrame with DataFrames nested
+            in its cells. See the Returns section. The tables are cached in the scraper's
+            `parse_cache`, if it has one.
+
         Returns
         -------
-        : DataFrame
+        : DataFrame or dict
             DataFrame containing most parts of the match page if they're available (e.g. formations,
             lineups, scores, player stats, etc.). The fields that are available vary by competition
             and year.
+
+            If `tidy` is True, {table name: DataFrame, ...} with the tables "matches" (1 row),
+            "player_<category>" for each player stats category (e.g. "player_summary",
+            "player_passing"), "keeper_stats" and "shots". Stats columns are named by FBref's
+            `data-stat` keys and every table has a "match_id" column. Player and shot rows also have
+            "team_id" and "player_id" columns.
         """
         if not isinstance(link, str):
             raise TypeError('`link` must be a string.')
+        if not isinstance(tidy, bool):
+            raise TypeError('`tidy` must be a boolean.')
 
         r = self._get(link)
-        soup = BeautifulSoup(r.content, 'html.parser')
-
-        # General match info
-        date = soup.find("div", {"class": "scorebox_meta"}).find("strong").text  # type: ignore
-        stage = soup.find("div", {"role": "main"}).find("div").text  # type: ignore
-
-        # Team names, IDs, goals, and xG
-        team_els = soup.find("div", {"class": "scorebox"}).find_all("div", recursive=False)  # type: ignore
-        home_el, away_el = team_els[0], team_els[1]
-
-        home_name = home_el.find("div").text.strip()
-        home_id = home_el.find("div").find("strong").find("a")["href"].split("/")[3]
-        home_goals = int(home_el.find("div", {"class": "score"}).text)
-
-        away_name = away_el.find("div").text.strip()
-        away_id = away_el.find("div").find("strong").find("a")["href"].split("/")[3]
-        away_goals = int(away_el.find("div", {"class": "score"}).text)
-
-        # Outfield player stats tables
-        home_player_stats_tag, away_player_stats_tag = soup.find_all(
-            "div", {"id": re.compile("all_player_stats")}
-        )
-        home_player_stats_table_tags = home_player_stats_tag\
-            .find_all("table", re.compile("stats_"))
-        away_player_stats_table_tags = away_player_stats_tag\
-            .find_all("table", re.compile("stats_"))
-
-        home_player_stats_dict = dict()
-        for table_tag in home_player_stats_table_tags:
-            table_name = " ".join(table_tag["id"].split("_")[2:]).capitalize()
-            table_df = pd.read_html(StringIO(str(table_tag)))[0]
-            home_player_stats_dict[table_name] = table_df
-
-        away_player_stats_dict = dict()
-        for table_tag in away_player_stats_table_tags:
-            table_name = " ".join(table_tag["id"].split("_")[2:]).capitalize()
-            table_df = pd.read_html(StringIO(str(table_tag)))[0]
-            away_player_stats_dict[table_name] = table_df
-
-        # Keeper stats tables
-        # Do home and away separately because some matches only have GK stats for 1 team
-        home_gk_table_tag = soup.find("table", {"id": re.compile(f"keeper_stats_{home_id}")})
-        if home_gk_table_tag:
-            home_gk_df = pd.read_html(StringIO(str(home_gk_table_tag)))[0]
-            home_player_stats_dict["Keeper"] = home_gk_df
-        else:
-            home_player_stats_dict["Keeper"] = None  # type: ignore
-        
-        away_gk_table_tag = soup.find("table", {"id": re.compile(f"keeper_stats_{away_id}")})
-        if away_gk_table_tag:
-            away_gk_df = pd.read_html(StringIO(str(away_gk_table_tag)))[0]
-            away_player_stats_dict["Keeper"] = away_gk_df
-        else:
-            away_player_stats_dict["Keeper"] = None  # type: ignore
-
-        # Shots tables
-        # Do these separately too because some matches only have data for 1 team
-        shots_dict = {"Both": None, "Home": None, "Away": None}
-        all_shots_table_tag = soup.find("table", {"id": "shots_all"})
-        if all_shots_table_tag:
-            all_shots_df = pd.read_html(StringIO(str(all_shots_table_tag)))[0]
-            shots_dict["Both"] = all_shots_df  # type: ignore
-        
-        home_shots_table_tag = soup.find("table", {"id": f"shots_{home_id}"})
-        if home_shots_table_tag:
-            home_shots_df = pd.read_html(StringIO(str(home_shots_table_tag)))[0]
-            shots_dict["Home"] = home_shots_df  # type: ignore
-        
-        away_shots_table_tag = soup.find("table", {"id": f"shots_{away_id}"})
-        if away_shots_table_tag:
-            away_shots_df = pd.read_html(StringIO(str(away_shots_table_tag)))[0]
-            shots_dict["Away"] = away_shots_df  # type: ignore
-
-        # 1-row df for output
-        match_df_data = {
-            "Link": link,
-            "Date": date,
-            "Stage": stage,
-            "Home Team": home_name,
-            "Away Team": away_name,
-            "Home Team ID": home_id,
-            "Away Team ID": away_id,
-            "Home Goals": home_goals,
-            "Away Goals": away_goals,
-            "Home Player Stats": pd.Series(home_player_stats_dict),
-            "Away Player Stats": pd.Series(away_player_stats_dict),
-            "Shots": pd.Series(shots_dict)
-        }
-        match_df = pd.Series(match_df_data).to_frame().T
-
-        return match_df
+        return _parse_match_page(link, r.content, tidy, self.parse_cache)
 
     # ==============================================================================================
-    def scrape_matches(self, year: str, league: str) -> pd.DataFrame:
+    def scrape_matches(
+            self, year: str, league: str, tidy: bool=False, sink: Union[Sink, None]=None,
+            n_workers: int=1
+    ) -> Union[pd.DataFrame, dict]:
         """ Scrapes the FBref standard stats page of the chosen league season.
 
         Works by gathering all of the match URL's from the homepage of the chosen league season on
@@ -468,16 +771,54 @@ class FBref():
             The league to retrieve valid seasons for. Examples include "EPL" and
             "La Liga". To see all possible options import `comps` from the FBref
             module file and look at the keys.
+        tidy : bool, optional, default False
+            If True, returns the normalized tables of scrape_match(tidy=True), concatenated across
+            the matches.
+        sink : Sink, optional
+            If given, the tables of each match are written to the sink as soon as it's scraped,
+            e.g. a ScraperFC.ParquetSink. Requires `tidy` to be True.
+        n_workers : int, optional, default 1
+            Number of processes that parse the match pages while the next ones are fetched, see
+            pipeline.parse_pages(). Useful when the pages don't need to be paced, e.g. when they're
+            replayed from a cassette.
+
         Returns
         -------
-        : DataFrame
-            Each row is the data from a single match.
+        : DataFrame or dict
+            Each row is the data from a single match. If `tidy` is True, {table name: DataFrame,
+            ...} instead, see scrape_match().
         """
-        matches_df = pd.DataFrame()
+        if not isinstance(tidy, bool):
+            raise TypeError('`tidy` must be a boolean.')
+        if sink is not None and not tidy:
+            raise ValueError('`sink` requires `tidy` to be True.')
+
         match_links = self.get_match_links(year, league)
-        for link in tqdm(match_links, desc=f'{year} {league} matches'):
-            match_df = self.scrape_match(link)
-            matches_df = pd.concat([matches_df, match_df], axis=0, ignore_index=True)
+        parsed = tqdm(
+            parse_pages(
+                ((link, self._get(link).content) for link in match_links),
+                partial(_parse_match_page, tidy=tidy, parse_cache=self.parse_cache), n_workers
+            ),
+            desc=f'{year} {league} matches', total=len(match_links)
+        )
+        if tidy:
+            tables: dict = dict()
+            for match_tables in parsed:
+                if sink is not None:
+                    sink.write_tables(match_tables, 'fbref', league, year)  # type: ignore
+                for name, df in match_tables.items():  # type: ignore
+                    tables.setdefault(name, list()).append(df)
+            tables = dict([
+                (name, pd.concat(dfs, axis=0, ignore_index=True)) for name, dfs in tables.items()
+            ])
+            if 'matches' in tables:
+                tables['matches'] = tables['matches'].sort_values(by='date')\
+                    .reset_index(drop=True)
+            return tables
+
+        matches_df = pd.DataFrame()
+        for match_df in parsed:
+            matches_df = pd.concat([matches_df, match_df], axis=0, ignore_index=True)  # type: ignore
 
         # If matches were added, sort matches by date
         if matches_df.shape[0] > 0:
@@ -531,8 +872,8 @@ class FBref():
             ])
 
             # Get the soups from the 2 pages
-            players_soup = BeautifulSoup(self._get(players_stats_url).content, 'html.parser')
-            squads_soup = BeautifulSoup(self._get(squads_stats_url).content, 'html.parser')
+            players_soup = make_soup(self._get(players_stats_url).content, SoupStrainer('table'))
+            squads_soup = make_soup(self._get(squads_stats_url).content, SoupStrainer('table'))
 
             # Gather stats table tags
             squad_stats_tag = squads_soup.find('table', {'id': re.compile('for')})
@@ -542,19 +883,6 @@ class FBref():
                 {'id': re.compile(f'stats_{stats_categories[stat_category]["html"]}')}
             )
 
-            # Gather squad and opponent squad IDs
-            # These are 'td' elements for Big 5
-            squad_ids = [
-                tag.find('a')['href'].split('/')[3] for tag
-                in squad_stats_tag.find_all('td', {'data-stat': 'team'})  # type: ignore
-                if tag and tag.find('a')
-            ]
-            opponent_ids = [
-                tag.find('a')['href'].split('/')[3] for tag
-                in opponent_stats_tag.find_all('td', {'data-stat': 'team'})  # type: ignore
-                if tag and tag.find('a')
-            ]
-
         else:
             # Get URL to stat category
             old_suffix = season_url.split('/')[-1]  # suffix is last element 202X-202X-divider-stats
@@ -568,7 +896,7 @@ class FBref():
                 WebDriverWait(self.driver, 10).until(EC.visibility_of_element_located((
                     By.XPATH,
                     f'//table[contains(@id, "stats_{stats_categories[stat_category]["html"]}")]')))
-                soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+                soup = make_soup(self.driver.page_source, SoupStrainer('table'))
             finally:
                 self._driver_close()
 
@@ -579,57 +907,7 @@ class FBref():
                 'table', {'id': re.compile(f'stats_{stats_categories[stat_category]["html"]}')}
             )
 
-            # Gather squad and opponent squad IDs
-            # These are 'th' elements for all other leagues
-            squad_ids = [
-                tag.find('a')['href'].split('/')[3] for tag
-                in squad_stats_tag.find_all('th', {'data-stat': 'team'})[1:]  # type: ignore
-                if tag and tag.find('a')
-            ]
-            opponent_ids = [
-                tag.find('a')['href'].split('/')[3] for tag
-                in opponent_stats_tag.find_all('th', {'data-stat': 'team'})[1:]  # type: ignore
-                if tag and tag.find('a')
-            ]
-
-        # Get stats dataframes
-        squad_stats = (pd.read_html(StringIO(str(squad_stats_tag)))[0]
-                       if squad_stats_tag is not None else None)
-        opponent_stats = (pd.read_html(StringIO(str(opponent_stats_tag)))[0]
-                          if opponent_stats_tag is not None else None)
-        player_stats = (pd.read_html(StringIO(str(player_stats_tag)))[0]
-                        if player_stats_tag is not None else None)
-
-        # Drop rows that contain duplicated table headers, add team/player IDs
-        if squad_stats is not None:
-            squad_drop_mask = (
-                ~squad_stats.loc[:, (slice(None), 'Squad')].isna()  # type: ignore
-                & (squad_stats.loc[:, (slice(None), 'Squad')] != 'Squad')  # type: ignore
-            )
-            squad_stats = squad_stats[squad_drop_mask.values].reset_index(drop=True)
-            squad_stats['Team ID'] = squad_ids
-
-        if opponent_stats is not None:
-            opponent_drop_mask = (
-                ~opponent_stats.loc[:, (slice(None), 'Squad')].isna()  # type: ignore
-                & (opponent_stats.loc[:, (slice(None), 'Squad')] != 'Squad')  # type: ignore
-            )
-            opponent_stats = opponent_stats[opponent_drop_mask.values].reset_index(drop=True)
-            opponent_stats['Team ID'] = opponent_ids
-
-        if player_stats is not None:
-            keep_players_mask = (player_stats.loc[:, (slice(None), 'Rk')] != 'Rk').values  # type: ignore
-            player_stats = player_stats.loc[keep_players_mask, :].reset_index(drop=True)
-
-        # Add player links and ID's
-        if player_stats is not None:
-            player_links = ['https://fbref.com' + tag.find('a')['href'] for tag
-                            in player_stats_tag.find_all('td', {'data-stat': 'player'})  # type: ignore
-                            if tag and tag.find('a')]
-            player_stats['Player Link'] = player_links
-            player_stats['Player ID'] = [x.split('/')[-2] for x in player_links]
-
-        return squad_stats, opponent_stats, player_stats
+        return _stats_dfs(squad_stats_tag, opponent_stats_tag, player_stats_tag)  # type: ignore
 
     # ==============================================================================================
     def scrape_all_stats(self, year: str, league: str) -> dict:
@@ -0,0 +1,644 @@
+from .scraperfc_exceptions import CircuitOpenException, NoWorkingProxiesException
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+import math
+import pandas as pd
+import random
+import requests
+import threading
+import time
+from io import StringIO
+from urllib.parse import urlsplit
+from typing import Any, Callable, Sequence, Union
+
+PROXY_LIST_URL = 'https://sslproxies.org/'
+PROXY_TEST_URL = 'https://httpbin.org/ip'
+
+# Active replay.Cassette, see replay.use_cassette()
+_cassette: Any = None
+# Rewrites request URLs, see replay.StandInServer.intercept()
+_rewrite_url: Union[Callable[[str], str], None] = None
+# Callables notified of request events, see add_hook()
+_hooks: list = list()
+
+
+# ==================================================================================================
+def download_proxy_list(url: str=PROXY_LIST_URL) -> Sequence[str]:
+    """ Downloads the free proxy list from sslproxies.org.
+
+    Parameters
+    ----------
+    url : str, optional
+        URL of the page with the proxy table.
+
+    Returns
+    -------
+    : list of str
+        Proxies in the form <IP address>:<port>
+    """
+    r = requests.get(url, timeout=30)
+    df = pd.read_html(StringIO(r.text), match='IP Address')[0]
+    df = df.loc[~df['Port'].isna(), :]
+    return [f'{ip}:{int(port)}' for ip, port in zip(df['IP Address'], df['Port'])]
+
+
+# ==================================================================================================
+class ProxyPool():
+    """ Pool of validated proxies, shared by all of the requests of one or more scrapers.
+
+    The proxy list is loaded once and every proxy is tested concurrently against `test_url`. Proxies
+    are scored by their average latency divided by their success rate, so fast reliable proxies are
+    used the most, and requests rotate across the best `rotation_size` of them. A proxy is evicted
+    after `max_failures` consecutive failures. If every proxy has been evicted, the list is reloaded
+    and validated again.
+
+    Pass the pool to a scraper, e.g. ``FBref(proxy_pool=pool)``, and all of its HTTP requests will
+    be sent through it.
+
+    Parameters
+    ----------
+    proxies : list of str, optional
+        Proxies in the form <IP address>:<port>. Defaults to the sslproxies.org list, see
+        download_proxy_list().
+    test_url : str, optional
+        URL requested through each proxy to validate it.
+    timeout : float, optional, default 5
+        Seconds to wait for a response when validating or using a proxy.
+    max_failures : int, optional, default 3
+        Number of consecutive failures after which a proxy is evicted.
+    rotation_size : int, optional, default 5
+        Number of the best scoring proxies that requests rotate across.
+    max_attempts : int, optional, default 3
+        Number of proxies a request is tried with before giving up, see fetch().
+    n_workers : int, optional, default 32
+        Number of proxies validated concurrently.
+    """
+
+    # ==============================================================================================
+    def __init__(
+            self, proxies: Union[Sequence[str], None]=None, test_url: str=PROXY_TEST_URL,
+            timeout: float=5, max_failures: int=3, rotation_size: int=5, max_attempts: int=3,
+            n_workers: int=32
+    ) -> None:
+        if proxies is not None and (
+                isinstance(proxies, str) or not all([isinstance(x, str) for x in proxies])):
+            raise TypeError('`proxies` must be a list of strings.')
+        if not isinstance(test_url, str):
+            raise TypeError('`test_url` must be a string.')
+        for name, value in [('max_failures', max_failures), ('rotation_size', rotation_size),
+                            ('max_attempts', max_attempts), ('n_workers', n_workers)]:
+            if not isinstance(value, int) or value < 1:
+                raise TypeError(f'`{name}` must be an int greater than 0.')
+
+        self._source = None if proxies is None else list(proxies)
+        self.test_url = test_url
+        self.timeout = timeout
+        self.max_failures = max_failures
+        self.rotation_size = rotation_size
+        self.max_attempts = max_attempts
+        self.n_workers = n_workers
+        self._lock = threading.Lock()
+        self._stats: dict = dict()  # {proxy: stats dict}, healthy proxies only
+        self._next = 0  # rotation counter
+        self._loaded = False
+
+    # ==============================================================================================
+    def _test_proxy(self, proxy: str) -> Union[float, None]:
+        """ Private, returns the latency of a request to the test URL through the proxy, or None if
+        it failed.
+        """
+        start = time.monotonic()
+        try:
+            r = requests.get(
+                self.test_url, proxies=proxy_dict(proxy), timeout=self.timeout
+            )
+        except requests.RequestException:
+            return None
+        return time.monotonic() - start if r.ok else None
+
+    # ==============================================================================================
+    def load(self) -> None:
+        """ Loads the proxy list and validates every proxy concurrently, replacing the pool.
+
+        Raises
+        ------
+        NoWorkingProxiesException
+            If none of the proxies work.
+        """
+        proxies = download_proxy_list() if self._source is None else self._source
+        with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+            latencies = list(executor.map(self._test_proxy, proxies))
+
+        with self._lock:
+            self._stats = dict([
+                (proxy, {'latency': latency, 'successes': 1, 'failures': 0, 'consecutive': 0})
+                for proxy, latency in zip(proxies, latencies) if latency is not None
+            ])
+            self._loaded = True
+        if len(self._stats) == 0:
+            raise NoWorkingProxiesException(len(proxies), self.test_url)
+
+    # ==============================================================================================
+    def _score(self, proxy: str) -> float:
+        """ Private, average latency divided by success rate, lower is better.
+        """
+        stats = self._stats[proxy]
+        success_rate = stats['successes'] / (stats['successes'] + stats['failures'])
+        return stats['latency'] / success_rate
+
+    # ==============================================================================================
+    def get(self) -> str:
+        """ Returns the next proxy to use, loading the pool first if needed.
+
+        Returns
+        -------
+        : str
+            In the form <IP address>:<port>
+        """
+        if not self._loaded or len(self._stats) == 0:
+            self.load()
+        with self._lock:
+            best = sorted(self._stats, key=self._score)[:self.rotation_size]
+            if len(best) == 0:  # evicted by another thread since loading
+                raise NoWorkingProxiesException(0, self.test_url)
+            self._next += 1
+            return best[self._next % len(best)]
+
+    # ==============================================================================================
+    def report_success(self, proxy: str, latency: float) -> None:
+        """ Records a successful request through the proxy and how long it took.
+        """
+        with self._lock:
+            if proxy in self._stats:
+                stats = self._stats[proxy]
+                n = stats['successes']
+                stats['latency'] = (stats['latency'] * n + latency) / (n + 1)
+                stats['successes'] += 1
+                stats['consecutive'] = 0
+
+    # ==============================================================================================
+    def report_failure(self, proxy: str) -> None:
+        """ Records a failed request through the proxy, evicting it after `max_failures` failures in
+        a row.
+        """
+        with self._lock:
+            if proxy in self._stats:
+                stats = self._stats[proxy]
+                stats['failures'] += 1
+                stats['consecutive'] += 1
+                if stats['consecutive'] >= self.max_failures:
+                    del self._stats[proxy]
+
+    # ==============================================================================================
+    def stats(self) -> pd.DataFrame:
+        """ Returns the latency, successes, failures and score of every healthy proxy, best first.
+        """
+        with self._lock:
+            df = pd.DataFrame.from_dict(self._stats, orient='index',
+                                        columns=['latency', 'successes', 'failures', 'consecutive'])
+            df['score'] = [self._score(proxy) for proxy in df.index]
+        return df.sort_values('score')
+
+    # ==============================================================================================
+    def __len__(self) -> int:
+        return len(self._stats)
+
+
+# ==================================================================================================
+def proxy_dict(proxy: str) -> dict:
+    """ Returns the `proxies` argument of requests for the proxy.
+    """
+    return {'http': f'http://{proxy}', 'https': f'http://{proxy}'}
+
+
+# ==================================================================================================
+def add_hook(hook: Callable[[str, str, dict], None]) -> None:
+    """ Registers a function that is called with every request event of the scrapers, e.g. a
+    metrics.Metrics. It's called as ``hook(event, url, values)``, with the events
+
+    * "request": a request was sent, values has `status_code` (None if it failed), `seconds`, and
+      `n_bytes` of the response body
+    * "retry": a failed request is retried
+    * "sleep": the scraper sleeps `seconds` to respect the site's rate limit
+    * "replay": a response is replayed from a cassette
+    * "cache_hit" and "cache_miss": a page is looked up in a caching.ParseCache
+
+    Parameters
+    ----------
+    hook : function
+    """
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+# ==================================================================================================
+def remove_hook(hook: Callable[[str, str, dict], None]) -> None:
+    """ Unregisters a function registered with add_hook().
+    """
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+# ==================================================================================================
+def notify(event: str, url: str, **values: Any) -> None:
+    """ Calls the registered hooks with a request event, see add_hook().
+    """
+    for hook in list(_hooks):
+        hook(event, url, values)
+
+
+# ==================================================================================================
+def sleep(seconds: float, url: str) -> None:
+    """ time.sleep() to respect a site's rate limit after requesting `url`, reported to the hooks.
+    """
+    time.sleep(seconds)
+    notify('sleep', url, seconds=seconds)
+
+
+# ==================================================================================================
+def replaying(url: str) -> bool:
+    """ Returns whether a request to `url` is replayed from the active cassette instead of being
+    sent, see the replay module.
+    """
+    cassette = _cassette
+    return cassette is not None and cassette.replays(url)
+
+
+# ==================================================================================================
+def send(url: str, send_request: Callable[[str], Any]) -> Any:
+    """ Sends a request with `send_request(url)`, unless it's replayed from the active cassette.
+    Recorded by the active cassette, unless the response is retried by the source's RetryPolicy,
+    and sent to the stand-in server that is intercepting requests, if there are any. See the
+    replay module. Requests that are sent are paced by the source's RateLimiter, and every request
+    is reported to the hooks, see add_hook().
+
+    Parameters
+    ----------
+    url : str
+        URL to request
+    send_request : function
+        Sends the request to the URL it's called with and returns the response.
+
+    Returns
+    -------
+    : response
+    """
+    cassette = _cassette
+    if replaying(url):
+        notify('replay', url)
+        return cassette.response(url)
+    limiter = rate_limiter(url)
+    if limiter is not None:
+        limiter.wait(url)
+    start = time.monotonic()
+    try:
+        response = send_request(url if _rewrite_url is None else _rewrite_url(url))
+    except Exception:
+        seconds = time.monotonic() - start
+        if limiter is not None:
+            limiter.update(None, seconds)
+        notify('request', url, status_code=None, seconds=seconds, n_bytes=0)
+        raise
+    seconds = time.monotonic() - start
+    status_code = getattr(response, 'status_code', None)
+    if limiter is not None:
+        limiter.update(status_code, seconds)
+    notify('request', url, status_code=status_code, seconds=seconds,
+           n_bytes=len(getattr(response, 'content', b'') or b''))
+    # Responses that are retried (e.g. 429s) aren't recorded, so they're never replayed
+    if cassette is not None and response is not None and \
+            not retry_policy(url).retries(response):
+        cassette.record(url, response)
+    return response
+
+
+# ==================================================================================================
+def url_source(url: str) -> str:
+    """ Returns the name of the site of a URL, e.g. "fbref" for https://fbref.com/...
+    """
+    host = urlsplit(url).hostname
+    host_parts = ('' if host is None else host).split('.')
+    return host_parts[-2] if len(host_parts) > 1 else host_parts[0]
+
+
+# ==================================================================================================
+class RetryPolicy():
+    """ Retries of the requests to one source, with exponential backoff and a circuit breaker. See
+    with_retries().
+
+    A request that raises a connection error or timeout, or gets one of `retry_statuses`, is tried
+    up to `max_attempts` times. Before each retry it waits for the Retry-After of the response if it
+    has one, or else for a random time between 0 and `backoff * 2**retry` seconds (capped at
+    `max_backoff`), so that concurrent scrapers don't retry in lockstep. If the Retry-After is
+    longer than `max_retry_after`, the response is returned without retrying.
+
+    After `breaker_threshold` failed attempts in a row, the circuit breaker opens and requests to
+    the source raise CircuitOpenException for `breaker_cooldown` seconds, instead of hammering a
+    site that is down or has banned the scraper. After the cooldown one request is let through, and
+    the breaker closes again if it succeeds.
+
+    Parameters
+    ----------
+    max_attempts : int, optional, default 4
+    backoff : float, optional, default 1
+        Base of the exponential backoff, in seconds
+    max_backoff : float, optional, default 60
+    max_retry_after : float, optional, default 300
+    retry_statuses : list of int, optional, default [429, 500, 502, 503, 504]
+    timeout : float, optional, default 30
+        Default timeout of the requests, in seconds
+    breaker_threshold : int, optional, default 10
+    breaker_cooldown : float, optional, default 300
+    """
+
+    # ==============================================================================================
+    def __init__(
+            self, max_attempts: int=4, backoff: float=1, max_backoff: float=60,
+            max_retry_after: float=300, retry_statuses: Sequence[int]=(429, 500, 502, 503, 504),
+            timeout: float=30, breaker_threshold: int=10, breaker_cooldown: float=300
+    ) -> None:
+        for name, value in [('max_attempts', max_attempts),
+                            ('breaker_threshold', breaker_threshold)]:
+            if not isinstance(value, int) or value < 1:
+                raise TypeError(f'`{name}` must be an int greater than 0.')
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.retry_statuses = list(retry_statuses)
+        self.timeout = timeout
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._lock = threading.Lock()
+        self._failures = 0  # consecutive failed attempts
+        self._open_until = 0.0  # monotonic time the breaker closes at
+
+    # ==============================================================================================
+    def check(self, url: str) -> None:
+        """ Raises CircuitOpenException if the circuit breaker is open.
+        """
+        with self._lock:
+            remaining = self._open_until - time.monotonic()
+        if remaining > 0:
+            raise CircuitOpenException(url, remaining)
+
+    # ==============================================================================================
+    def record(self, success: bool) -> None:
+        """ Records the outcome of an attempt, opening the circuit breaker after
+        `breaker_threshold` failures in a row.
+        """
+        with self._lock:
+            if success:
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._failures >= self.breaker_threshold:
+                self._open_until = time.monotonic() + self.breaker_cooldown
+                # Half-open after the cooldown, one more failure reopens it
+                self._failures = self.breaker_threshold - 1
+
+    # ==============================================================================================
+    def retries(self, response: Any) -> bool:
+        """ Returns True if the response should be retried.
+        """
+        return response is None or response.status_code in self.retry_statuses
+
+    # ==============================================================================================
+    def delay(self, retry: int, response: Any=None) -> Union[float, None]:
+        """ Returns the seconds to wait before the `retry`-th retry (starting at 0) of a request,
+        or None if the response's Retry-After is too long to wait for.
+        """
+        retry_after = _retry_after(response)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**retry))
+
+
+# ==================================================================================================
+def _retry_after(response: Any) -> Union[float, None]:
+    """ Private, seconds in the Retry-After header of a response, None if it doesn't have one.
+    """
+    headers = getattr(response, 'headers', None)
+    value = None if headers is None else headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# {source: RetryPolicy}, see url_source(). Sources without a policy get a default RetryPolicy.
+# FBref temporarily bans scrapers that exceed its rate limit, so it backs off for longer.
+retry_policies: dict = {
+    'fbref': RetryPolicy(max_attempts=3, backoff=10, max_backoff=120),
+}
+
+
+# ==================================================================================================
+def retry_policy(url: str) -> RetryPolicy:
+    """ Returns the RetryPolicy of the source of a URL, see `retry_policies`.
+    """
+    return retry_policies.setdefault(url_source(url), RetryPolicy())
+
+
+# ==================================================================================================
+class RateLimiter():
+    """ Adaptive (AIMD) pacing of the requests to one source, shared by all of the scrapers in the
+    process.
+
+    Requests are spaced at least 1 / `rate` seconds apart. Every healthy response increases the rate
+    by `increase` requests per second, up to `max_rate`. A response with one of
+    `backoff_statuses`, a failed request, or a latency spike (more than `latency_factor` times the
+    average latency) multiplies the rate by `decrease`, down to `min_rate`. So the rate converges on
+    the fastest rate the source tolerates, without ever exceeding its ceiling. Waits are reported to
+    the hooks as sleeps.
+
+    Parameters
+    ----------
+    rate : float, optional, default 1
+        Initial rate, in requests per second
+    max_rate : float, optional, default 10
+        Ceiling of the rate, e.g. the published limit of the site. None for no ceiling.
+    min_rate : float, optional, default 1/60
+    increase : float, optional, default 0.1
+    decrease : float, optional, default 0.5
+    latency_factor : float, optional, default 3
+    backoff_statuses : list of int, optional, default [429, 503]
+    """
+
+    # ==============================================================================================
+    def __init__(
+            self, rate: float=1, max_rate: Union[float, None]=10, min_rate: float=1/60,
+            increase: float=0.1, decrease: float=0.5, latency_factor: float=3,
+            backoff_statuses: Sequence[int]=(429, 503)
+    ) -> None:
+        if not 0 < decrease < 1:
+            raise ValueError('`decrease` must be between 0 and 1.')
+        self.max_rate = math.inf if max_rate is None else max_rate
+        self.min_rate = min_rate
+        self.rate = max(min_rate, min(rate, self.max_rate))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.backoff_statuses = list(backoff_statuses)
+        self._lock = threading.Lock()
+        self._next = 0.0  # monotonic time the next request can be sent at
+        self._latency: Union[float, None] = None  # moving average of the latencies
+
+    # ==============================================================================================
+    def set_ceiling(self, max_rate: Union[float, None]) -> None:
+        """ Changes `max_rate`, lowering the current rate if it's above it.
+        """
+        with self._lock:
+            self.max_rate = math.inf if max_rate is None else max_rate
+            self.rate = max(self.min_rate, min(self.rate, self.max_rate))
+
+    # ==============================================================================================
+    def wait(self, url: str) -> None:
+        """ Reserves the next request slot and sleeps until it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + 1 / self.rate
+        if start > now:
+            sleep(start - now, url)
+
+    # ==============================================================================================
+    def update(self, status_code: Union[int, None], seconds: float) -> None:
+        """ Adjusts the rate after a response (`status_code` None if the request failed) that took
+        `seconds`.
+        """
+        with self._lock:
+            spike = self._latency is not None and seconds > self.latency_factor * self._latency
+            if status_code is None or status_code in self.backoff_statuses or spike:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                # Space the next request by the new rate, not the one it was reserved with
+                self._next = max(self._next, time.monotonic() + 1 / self.rate)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+            # Spikes are folded into the average too, so that a lasting rise in latency becomes
+            # the new baseline instead of backing off to `min_rate` forever
+            if status_code is not None:
+                self._latency = seconds if self._latency is None else \
+                    0.8 * self._latency + 0.2 * seconds
+
+
+# {source: RateLimiter or None}, see url_source(). Sources without a limiter get a default
+# RateLimiter, None turns pacing off for a source.
+# FBref allows bots at most 10 requests per minute -- https://www.sports-reference.com/bot-traffic.html
+rate_limiters: dict = {
+    'fbref': RateLimiter(rate=10/60, max_rate=10/60),
+}
+
+
+# ==================================================================================================
+def rate_limiter(url: str) -> Union[RateLimiter, None]:
+    """ Returns the RateLimiter of the source of a URL, see `rate_limiters`.
+    """
+    return rate_limiters.setdefault(url_source(url), RateLimiter())
+
+
+# ==================================================================================================
+def with_retries(url: str, request: Callable[[], Any]) -> Any:
+    """ Sends a request with `request()`, retrying it according to the RetryPolicy of the URL's
+    source. Waits between attempts are reported to the hooks as sleeps, and retries as retries.
+
+    Parameters
+    ----------
+    url : str
+        URL of the request
+    request : function
+        Sends the request and returns the response.
+
+    Returns
+    -------
+    : response
+        The last response, which can still have a retry status (e.g. 429) if the attempts ran out.
+
+    Raises
+    ------
+    CircuitOpenException
+        If the source's circuit breaker is open.
+    """
+    policy = retry_policy(url)
+    policy.check(url)
+    for attempt in range(policy.max_attempts):
+        last = attempt == policy.max_attempts - 1
+        try:
+            response = request()
+        except requests.RequestException:
+            policy.record(False)
+            if last:
+                raise
+            wait = policy.delay(attempt)
+        else:
+            if not policy.retries(response):
+                policy.record(True)
+                return response
+            policy.record(False)
+            wait = policy.delay(attempt, response)
+            if last or wait is None:
+                return response
+        notify('retry', url)
+        sleep(wait, url)  # type: ignore
+    return response
+
+
+# ==================================================================================================
+def fetch(
+        url: str, proxy_pool: Union[ProxyPool, None]=None,
+        session: Union[requests.Session, None]=None, **kwargs: Any
+) -> requests.Response:
+    """ Sends a GET request, the shared fetch path of the scrapers.
+
+    Parameters
+    ----------
+    url : str
+        URL to request.
+    proxy_pool : ProxyPool, optional
+        If given, the request is sent through the pool's proxies. Failed requests are retried with
+        the next proxy, up to the pool's `max_attempts` times, and every outcome is reported back to
+        the pool.
+        Requests that still fail, or get a 429 or 5xx response, are retried by the source's
+        RetryPolicy, see with_retries().
+    session : requests.Session, optional
+        Session to send the request with, e.g. a cloudscraper.CloudScraper. Defaults to a plain
+        requests.get().
+    **kwargs
+        Passed on to requests, e.g. `headers`. The `timeout` defaults to the proxy pool's or the
+        RetryPolicy's timeout.
+
+    Returns
+    -------
+    : requests.Response
+    """
+    get = requests.get if session is None else session.get
+    if proxy_pool is None:
+        kwargs.setdefault('timeout', retry_policy(url).timeout)
+        return with_retries(url, lambda: send(url, lambda u: get(u, **kwargs)))
+
+    kwargs.setdefault('timeout', proxy_pool.timeout)
+
+    def send_with_proxies() -> requests.Response:
+        for attempt in range(proxy_pool.max_attempts):
+            proxy = proxy_pool.get()
+            start = time.monotonic()
+            try:
+                response = send(url, lambda u: get(u, proxies=proxy_dict(proxy), **kwargs))
+            except requests.RequestException:
+                proxy_pool.report_failure(proxy)
+                if attempt == proxy_pool.max_attempts - 1:
+                    raise
+                notify('retry', url)
+                continue
+            proxy_pool.report_success(proxy, time.monotonic() - start)
+            break
+        return response
+
+    return with_retries(url, send_with_proxies)
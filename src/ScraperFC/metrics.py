@@ -0,0 +1,256 @@
+from . import fetching
+from contextlib import contextmanager
+import math
+import pandas as pd
+import re
+import threading
+from urllib.parse import urlsplit
+from typing import Any, Iterator, Sequence, Union
+
+PREFIX = 'scraperfc'
+
+# Path segments that are kept in endpoint labels, other segments are replaced with "{id}"
+_static_segment = re.compile(r'^([a-z_]+|v\d+)$')
+
+
+# ==================================================================================================
+def request_labels(url: str, static_segments: Sequence[str]=()) -> tuple:
+    """ Returns the (source, endpoint) labels of a request URL.
+
+    The source is the name of the site, see fetching.url_source(). The endpoint is the URL path with
+    the segments that identify a page (IDs, seasons, names) replaced with "{id}", so that the labels
+    have a small number of values, e.g. "/en/matches/{id}/{id}" or "/api/v1/event/{id}/lineups".
+
+    Parameters
+    ----------
+    url : str
+        URL of the request
+    static_segments : list of str, optional
+        Path segments to keep in the endpoint even though they aren't plain lowercase words, e.g.
+        "unique-tournament".
+
+    Returns
+    -------
+    : tuple of str
+    """
+    segments = [
+        x if (_static_segment.match(x) or x in static_segments) else '{id}'
+        for x in urlsplit(url).path.split('/') if x != ''
+    ]
+    return fetching.url_source(url), '/' + '/'.join(segments)
+
+
+# ==================================================================================================
+class Metrics():
+    """ Collects metrics of the HTTP requests of all scrapers, labelled by source and endpoint (see
+    request_labels()), while it's installed with collect_metrics().
+
+    Metrics (all prefixed with "scraperfc_"):
+
+    * requests_total: requests sent, also labelled by status code ("error" if it failed)
+    * request_seconds: histogram of request latencies
+    * response_bytes_total: size of the response bodies
+    * rate_limited_total: 429 responses
+    * retries_total: requests retried, e.g. with another proxy
+    * sleep_seconds_total: time spent sleeping to respect rate limits
+    * replayed_total: responses replayed from a cassette, see the replay module
+    * parse_cache_hits_total and parse_cache_misses_total: lookups in a ParseCache
+
+    Read them with snapshot(), summary() or to_prometheus().
+
+    Parameters
+    ----------
+    buckets : list of float, optional
+        Upper bounds, in seconds, of the request_seconds histogram buckets.
+    """
+
+    static_segments = ['unique-tournament', 'average-positions']
+    buckets = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+    help = {
+        'requests_total': 'HTTP requests sent.',
+        'request_seconds': 'Latency of HTTP requests in seconds.',
+        'response_bytes_total': 'Bytes of HTTP response bodies.',
+        'rate_limited_total': 'HTTP 429 (Too Many Requests) responses.',
+        'retries_total': 'HTTP requests retried.',
+        'sleep_seconds_total': 'Seconds spent sleeping to respect rate limits.',
+        'replayed_total': 'HTTP responses replayed from a cassette.',
+        'parse_cache_hits_total': 'Pages whose parsed tables were found in the parse cache.',
+        'parse_cache_misses_total': 'Pages that were not found in the parse cache.',
+    }
+
+    # ==============================================================================================
+    def __init__(self, buckets: Union[Sequence[float], None]=None) -> None:
+        if buckets is not None:
+            self.buckets = sorted(buckets)
+        self._lock = threading.Lock()
+        self._counters: dict = dict()  # {(name, labels): value}
+        self._histograms: dict = dict()  # {labels: [bucket counts..., sum, count]}
+
+    # ==============================================================================================
+    def _inc(self, name: str, labels: tuple, value: float=1) -> None:
+        """ Private, increments a counter. Call with the lock held.
+        """
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    # ==============================================================================================
+    def __call__(self, event: str, url: str, values: dict) -> None:
+        """ Records a request event, see fetching.notify().
+        """
+        labels = request_labels(url, self.static_segments)
+        with self._lock:
+            if event == 'request':
+                status = 'error' if values['status_code'] is None else str(values['status_code'])
+                self._inc('requests_total', labels + (status,))
+                self._inc('response_bytes_total', labels, values['n_bytes'])
+                if values['status_code'] == 429:
+                    self._inc('rate_limited_total', labels)
+                histogram = self._histograms.setdefault(labels, [0] * (len(self.buckets) + 2))
+                for i, bound in enumerate(self.buckets):
+                    if values['seconds'] <= bound:
+                        histogram[i] += 1
+                histogram[-2] += values['seconds']
+                histogram[-1] += 1
+            elif event == 'retry':
+                self._inc('retries_total', labels)
+            elif event == 'sleep':
+                self._inc('sleep_seconds_total', labels, values['seconds'])
+            elif event == 'replay':
+                self._inc('replayed_total', labels)
+            elif event == 'cache_hit':
+                self._inc('parse_cache_hits_total', labels)
+            elif event == 'cache_miss':
+                self._inc('parse_cache_misses_total', labels)
+
+    # ==============================================================================================
+    def snapshot(self) -> dict:
+        """ Returns the current values of the metrics as plain dicts and lists.
+
+        Returns
+        -------
+        : dict
+            {metric name: [{"source": ..., "endpoint": ..., "value": ...}, ...], ...}. The samples
+            of requests_total also have a "status", and those of request_seconds have "count",
+            "sum", and "buckets" ({upper bound: cumulative count, ...}) instead of "value".
+        """
+        snapshot: dict = dict()
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                sample = {'source': labels[0], 'endpoint': labels[1]}
+                if name == 'requests_total':
+                    sample['status'] = labels[2]
+                sample['value'] = value
+                snapshot.setdefault(name, list()).append(sample)
+            for labels, histogram in sorted(self._histograms.items()):
+                snapshot.setdefault('request_seconds', list()).append({
+                    'source': labels[0], 'endpoint': labels[1],
+                    'count': histogram[-1], 'sum': histogram[-2],
+                    'buckets': dict(zip(list(self.buckets) + [math.inf],
+                                        histogram[:-2] + [histogram[-1]])),
+                })
+        return snapshot
+
+    # ==============================================================================================
+    def summary(self) -> pd.DataFrame:
+        """ Returns a DataFrame with one row per source and endpoint and the totals of the metrics:
+        requests, errors, 429s, retries, request seconds, sleep seconds, bytes, replays, and parse
+        cache hits and misses. Shows whether a slow scrape is waiting on the network or sleeping.
+        """
+        columns = {
+            'requests_total': 'requests', 'rate_limited_total': '429s', 'retries_total': 'retries',
+            'response_bytes_total': 'bytes', 'sleep_seconds_total': 'sleep seconds',
+            'replayed_total': 'replays', 'parse_cache_hits_total': 'cache hits',
+            'parse_cache_misses_total': 'cache misses',
+        }
+        rows: dict = dict()
+        for name, samples in self.snapshot().items():
+            for sample in samples:
+                row = rows.setdefault((sample['source'], sample['endpoint']), dict())
+                if name == 'request_seconds':
+                    row['request seconds'] = sample['sum']
+                    continue
+                row[columns[name]] = row.get(columns[name], 0) + sample['value']
+                if sample.get('status') == 'error' or \
+                        (name == 'requests_total' and sample['status'][0] == '5'):
+                    row['errors'] = row.get('errors', 0) + sample['value']
+        order = ['requests', 'errors', '429s', 'retries', 'request seconds', 'sleep seconds',
+                 'bytes', 'replays', 'cache hits', 'cache misses']
+        df = pd.DataFrame.from_dict(rows, orient='index', columns=order).fillna(0)
+        df.index.names = ['source', 'endpoint']
+        return df
+
+    # ==============================================================================================
+    def to_prometheus(self) -> str:
+        """ Returns the metrics in the Prometheus text exposition format, e.g. to serve from a
+        /metrics endpoint or to write to a node_exporter textfile.
+        """
+        snapshot = self.snapshot()
+        lines = list()
+        for name, samples in snapshot.items():
+            full_name = f'{PREFIX}_{name}'
+            lines.append(f'# HELP {full_name} {self.help[name]}')
+            metric_type = 'histogram' if name == 'request_seconds' else 'counter'
+            lines.append(f'# TYPE {full_name} {metric_type}')
+            for sample in samples:
+                labels = ','.join([
+                    f'{k}="{_escape(v)}"' for k, v in sample.items()
+                    if k in ['source', 'endpoint', 'status']
+                ])
+                if name != 'request_seconds':
+                    lines.append(f'{full_name}{{{labels}}} {_format(sample["value"])}')
+                    continue
+                for bound, count in sample['buckets'].items():
+                    le = '+Inf' if bound == math.inf else _format(bound)
+                    lines.append(f'{full_name}_bucket{{{labels},le="{le}"}} {count}')
+                lines.append(f'{full_name}_sum{{{labels}}} {_format(sample["sum"])}')
+                lines.append(f'{full_name}_count{{{labels}}} {sample["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    # ==============================================================================================
+    def reset(self) -> None:
+        """ Clears all of the metrics.
+        """
+        with self._lock:
+            self._counters = dict()
+            self._histograms = dict()
+
+
+# ==================================================================================================
+def _escape(value: Any) -> str:
+    """ Private, escapes a Prometheus label value.
+    """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# ==================================================================================================
+def _format(value: float) -> str:
+    """ Private, formats a Prometheus sample value.
+    """
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# ==================================================================================================
+@contextmanager
+def collect_metrics(metrics: Union[Metrics, None]=None) -> Iterator[Metrics]:
+    """ Collects the metrics of the HTTP requests of all scrapers inside the `with` block.
+
+    Requests that go through fetching.send() (FBref, Understat, Transfermarkt, Capology, and
+    Sofascore's API) are covered, as are FBref's and ClubElo's Selenium page loads.
+
+    Parameters
+    ----------
+    metrics : Metrics, optional
+        Metrics to add to, e.g. to collect across several blocks. Defaults to a new Metrics.
+
+    Examples
+    --------
+    >>> with collect_metrics() as metrics:
+    ...     FBref().scrape_stats('2023-2024', 'EPL', 'standard')
+    >>> metrics.summary()
+    """
+    metrics = Metrics() if metrics is None else metrics
+    fetching.add_hook(metrics)
+    try:
+        yield metrics
+    finally:
+        fetching.remove_hook(metrics)
@@ -1,28 +1,389 @@
 from bs4 import BeautifulSoup
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import hashlib
+import json
 import numpy as np
+import os
 import pandas as pd
+import queue
 import re
-from ScraperFC.shared_functions import xpath_soup, get_source_comp_info
+import sqlite3
+from ScraperFC.scraperfc_exceptions import InvalidLeagueException
+from ScraperFC.shared_functions import xpath_soup, xpaths_soup
 from selenium import webdriver
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, \
+    WebDriverException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
+import threading
 import time
 from tqdm import tqdm
 import warnings
 
 
+# Path of each league's pages on Oddsportal. The path is also in the hrefs of its match links.
+comps = {
+    'EPL': {'path': '/football/england/premier-league'},
+    'EFL Championship': {'path': '/football/england/championship'},
+    'La Liga': {'path': '/football/spain/laliga'},
+    'Bundesliga': {'path': '/football/germany/bundesliga'},
+    'Serie A': {'path': '/football/italy/serie-a'},
+    'Ligue 1': {'path': '/football/france/ligue-1'},
+    'Eredivisie': {'path': '/football/netherlands/eredivisie'},
+    'Primeira Liga': {'path': '/football/portugal/liga-portugal'},
+    'MLS': {'path': '/football/usa/mls'},
+}
+
+# Betting type IDs and outcome names used in Oddsportal's odds feed
+feed_markets = {1: ('1X2', ['1', 'X', '2']), 2: ('O/U', ['over', 'under'])}
+FULL_TIME_SCOPE = 2
+
+# Rows at the bottom of the odds tables that aggregate the bookmakers' odds
+AGGREGATE_ROWS = ['Average', 'Highest']
+
+# Rough memory footprint of one Chrome instance, used to size the worker pool
+DRIVER_MEMORY_MB = 600
+
+
+# ==============================================================================
+def workers_for_available_memory(memory_per_worker_mb=DRIVER_MEMORY_MB):
+    """ Number of browser workers that fit in the currently available memory,
+    capped at the number of CPUs. Returns 1 if available memory can't be read
+    (e.g. on Windows).
+    """
+    try:
+        available = os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return 1
+    n_workers = int(available / (memory_per_worker_mb * 1024 ** 2))
+    return max(1, min(n_workers, os.cpu_count() or 1))
+
+
+# ==============================================================================
+def match_id_from_url(url):
+    """ Oddsportal match ID, the last part of the match URL's slug, e.g.
+    "AbCdEfGh" from .../arsenal-chelsea-AbCdEfGh/.
+    """
+    return url.rstrip('/').split('/')[-1].split('-')[-1]
+
+
+# ==============================================================================
+def compact_odds(odds):
+    """ Applies the compact dtypes of the long odds table: categorical keys and
+    float32 values. Use after concatenating long odds tables, which turns
+    categoricals with different categories back into objects.
+    """
+    odds = odds.astype({'match_id': 'category', 'market': 'category',
+                        'bookmaker': 'category', 'outcome': 'category',
+                        'line': 'float32', 'odds': 'float32', 'payout': 'float32',
+                        'implied_prob': 'float32', 'overround': 'float32'})
+    return odds.reset_index(drop=True)
+
+
+# ==============================================================================
+def long_odds(moneyline_df, over_under_df, match_id):
+    """ Converts the 1-row wide odds DataFrames of a match to a long table.
+
+    Returns a DataFrame with columns match_id, market, line, bookmaker,
+    outcome, odds, payout, implied_prob and overround. There's one row per
+    outcome of each market/line/bookmaker. Payout is the payout % shown on
+    Oddsportal, implied_prob is 1 / odds, and overround is the sum of the
+    implied probabilities of the bookmaker's outcomes minus 1. The Average and
+    Highest rows of the wide tables are dropped, they aren't bookmakers and can
+    be computed from the long table.
+    """
+    frames = list()
+    if moneyline_df.shape[1] > 0:
+        ml = moneyline_df.iloc[0].rename('odds').rename_axis(['bookmaker', 'outcome'])\
+            .reset_index()
+        ml['market'], ml['line'] = '1X2', np.nan
+        frames.append(ml)
+    if over_under_df.shape[1] > 0:
+        ou = over_under_df.iloc[0].rename('odds')\
+            .rename_axis(['line', 'bookmaker', 'outcome']).reset_index()
+        ou['market'] = 'O/U'
+        ou['line'] = pd.to_numeric(ou['line'].astype(str).str.lstrip('+'),
+                                   errors='coerce')
+        frames.append(ou)
+    columns = ['match_id', 'market', 'line', 'bookmaker', 'outcome', 'odds', 'payout',
+               'implied_prob', 'overround']
+    if len(frames) == 0:
+        return compact_odds(pd.DataFrame(columns=columns))
+
+    odds = pd.concat(frames, ignore_index=True)
+    odds['odds'] = pd.to_numeric(odds['odds'], errors='coerce')
+    odds['match_id'] = match_id
+    keys = ['market', 'line', 'bookmaker']
+
+    # Payout is its own "outcome" in the wide tables, make it a column instead
+    is_payout = odds['outcome'] == 'po %'
+    payouts = odds.loc[is_payout, keys + ['odds']].rename(columns={'odds': 'payout'})
+    is_aggregate = odds['bookmaker'].astype(str).str.strip().isin(AGGREGATE_ROWS)
+    odds = odds.loc[~is_payout & ~is_aggregate & odds['odds'].notna()]\
+        .merge(payouts, on=keys, how='left')
+
+    odds['implied_prob'] = 1 / odds['odds']
+    odds['overround'] = odds.groupby(keys, dropna=False)['implied_prob']\
+        .transform('sum') - 1
+    return compact_odds(odds[columns])
+
+
+# ==============================================================================
+def odds_deltas(previous, current, scraped_at):
+    """ Compares two long odds tables of the same match, see long_odds().
+
+    Returns a DataFrame with one row per outcome whose odds changed, appeared
+    or disappeared, with columns match_id, market, line, bookmaker, outcome,
+    previous_odds, odds, change and scraped_at. Odds that disappeared have NaN
+    odds, new odds have NaN previous_odds.
+    """
+    keys = ['match_id', 'market', 'line', 'bookmaker', 'outcome']
+    previous = previous[keys + ['odds']].astype({k: object for k in keys if k != 'line'})
+    current = current[keys + ['odds']].astype({k: object for k in keys if k != 'line'})
+    merged = previous.rename(columns={'odds': 'previous_odds'})\
+        .merge(current, on=keys, how='outer')
+    merged[['previous_odds', 'odds']] = merged[['previous_odds', 'odds']]\
+        .astype('float64').round(4)
+    changed = ~((merged['previous_odds'] == merged['odds'])
+                | (merged['previous_odds'].isna() & merged['odds'].isna()))
+    deltas = merged.loc[changed].reset_index(drop=True)
+    deltas['change'] = deltas['odds'] - deltas['previous_odds']
+    deltas['scraped_at'] = scraped_at
+    return deltas
+
+
+# ==============================================================================
+class OddsSnapshotStore:
+    """ Local SQLite store of the latest odds of each match, market, line,
+    bookmaker and outcome, plus the history of changes to them. Used by
+    Oddsportal.poll_odds() to emit only the odds that changed since the last
+    poll.
+
+    Tables
+    ------
+    snapshots : latest odds, one row per (match_id, market, line, bookmaker,
+        outcome)
+    deltas : every change returned by update(), see odds_deltas()
+    pages : content hash of each match's page when it was last polled
+    """
+
+    # ==========================================================================
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.executescript(
+                'CREATE TABLE IF NOT EXISTS snapshots (match_id TEXT, market TEXT, '
+                'line REAL, bookmaker TEXT, outcome TEXT, odds REAL, scraped_at TEXT);'
+                'CREATE INDEX IF NOT EXISTS snapshots_match ON snapshots (match_id);'
+                'CREATE TABLE IF NOT EXISTS deltas (match_id TEXT, market TEXT, '
+                'line REAL, bookmaker TEXT, outcome TEXT, previous_odds REAL, '
+                'odds REAL, change REAL, scraped_at TEXT);'
+                'CREATE TABLE IF NOT EXISTS pages (match_id TEXT PRIMARY KEY, '
+                'content_hash TEXT, checked_at TEXT);')
+
+    # ==========================================================================
+    def close(self):
+        """ Closes the database connection.
+        """
+        self.connection.close()
+
+    # ==========================================================================
+    def latest(self, match_id=None):
+        """ Returns the latest odds of one match, or of all of them.
+        """
+        query = 'SELECT * FROM snapshots'
+        params = ()
+        if match_id is not None:
+            query, params = query + ' WHERE match_id = ?', (match_id,)
+        return pd.read_sql_query(query, self.connection, params=params)
+
+    # ==========================================================================
+    def history(self, match_id=None):
+        """ Returns the recorded odds changes of one match, or of all of them,
+        oldest first.
+        """
+        query = 'SELECT * FROM deltas'
+        params = ()
+        if match_id is not None:
+            query, params = query + ' WHERE match_id = ?', (match_id,)
+        return pd.read_sql_query(query + ' ORDER BY rowid', self.connection,
+                                 params=params)
+
+    # ==========================================================================
+    def content_hash(self, match_id):
+        """ Returns the content hash of the match's page from the last poll, or
+        None if it hasn't been polled.
+        """
+        row = self.connection.execute(
+            'SELECT content_hash FROM pages WHERE match_id = ?', (match_id,)).fetchone()
+        return None if row is None else row[0]
+
+    # ==========================================================================
+    def set_content_hash(self, match_id, content_hash, checked_at):
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO pages VALUES (?, ?, ?)',
+                (match_id, content_hash, checked_at))
+
+    # ==========================================================================
+    def update(self, match_id, odds, scraped_at):
+        """ Replaces the stored snapshot of the match with odds, a long odds
+        table (see long_odds()), and records the changes. Returns the changes,
+        see odds_deltas(). Everything is new the first time a match is stored.
+        """
+        previous = self.latest(match_id)
+        odds = odds.loc[odds['match_id'] == match_id]
+        deltas = odds_deltas(previous, odds, scraped_at)
+
+        snapshot = odds[['match_id', 'market', 'line', 'bookmaker', 'outcome', 'odds']]\
+            .astype({'match_id': object, 'market': object, 'bookmaker': object,
+                     'outcome': object, 'line': 'float64', 'odds': 'float64'})
+        snapshot = snapshot.assign(scraped_at=scraped_at)
+        with self.connection:
+            self.connection.execute('DELETE FROM snapshots WHERE match_id = ?', (match_id,))
+            self.connection.executemany(
+                'INSERT INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)',
+                snapshot.astype(object).where(snapshot.notna(), None)
+                .itertuples(index=False, name=None))
+            self.connection.executemany(
+                'INSERT INTO deltas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                deltas.astype(object).where(deltas.notna(), None)
+                .itertuples(index=False, name=None))
+        return deltas
+
+
+# ==============================================================================
+def _decode_feed(body):
+    """ Decodes an odds feed response. The feed is JSON, sometimes wrapped in a
+    JSONP callback. Returns None if the body can't be decoded (e.g. it's
+    encrypted).
+    """
+    start, end = body.find('{'), body.rfind('}')
+    if start == -1 or end == -1:
+        return None
+    try:
+        feed = json.loads(body[start:end + 1])
+    except ValueError:
+        return None
+    return feed if isinstance(feed, dict) else None
+
+
+# ==============================================================================
+def _feed_odds_records(feed, bookmakers):
+    """ Flattens the full time odds in a decoded feed into records.
+
+    Odds are keyed by E-{betting type}-{scope}-{handicap type}-{handicap value}-
+    {mixed parameter} and hold {bookmaker ID: odds for each outcome}. Odds that
+    a bookmaker has deactivated are skipped, like the crossed out odds on the
+    page.
+
+    Returns [{'market', 'line', 'bookmaker', 'outcome', 'odds'}, ...]
+    """
+    records = list()
+    oddsdata = feed.get('d', dict()).get('oddsdata', dict()).get('back', dict())
+    for key, outcome_data in oddsdata.items():
+        parts = key.split('-')
+        if len(parts) < 5 or not parts[1].isdigit() or not parts[2].isdigit():
+            continue
+        betting_type, scope = int(parts[1]), int(parts[2])
+        if betting_type not in feed_markets or scope != FULL_TIME_SCOPE:
+            continue
+        market, outcomes = feed_markets[betting_type]
+        line = float(parts[4]) if market == 'O/U' else None
+        active = outcome_data.get('act', dict())
+        for bookie_id, bookie_odds in outcome_data.get('odds', dict()).items():
+            if not active.get(bookie_id, True):
+                continue
+            if isinstance(bookie_odds, dict):
+                bookie_odds = [bookie_odds[k] for k in sorted(bookie_odds, key=int)]
+            for outcome, odds in zip(outcomes, bookie_odds):
+                records.append({
+                    'market': market, 'line': line,
+                    'bookmaker': bookmakers.get(str(bookie_id), str(bookie_id)),
+                    'outcome': outcome, 'odds': float(odds)
+                })
+    return records
+
+
+# ==============================================================================
+def _wide_odds_from_records(records, market):
+    """ Builds the same 1-row odds DataFrames as get_1X2odds_from_match() and
+    get_OUodds_from_match() from feed records, including the payout and the
+    Average and Highest rows.
+    """
+    records = pd.DataFrame([r for r in records if r['market'] == market])
+    if records.shape[0] == 0:
+        return pd.DataFrame()
+    outcomes = [o for o in dict(feed_markets.values())[market]]
+    groups = ['line', 'bookmaker'] if market == 'O/U' else ['bookmaker']
+    table = records.pivot_table(index=groups, columns='outcome', values='odds',
+                                aggfunc='first')[outcomes].dropna()
+    # Average and highest odds across bookmakers, like the bottom rows on the page
+    aggs = list()
+    for agg_type, func in [('Average', 'mean'), ('Highest', 'max')]:
+        if market == 'O/U':
+            agg = table.groupby(level='line').agg(func).round(2)
+            agg.index = pd.MultiIndex.from_product([agg.index, [agg_type]],
+                                                   names=groups)
+        else:
+            agg = table.agg(func).round(2).to_frame(agg_type).T
+        aggs.append(agg)
+    table = pd.concat([table] + aggs)
+    table['po %'] = (100 / (1 / table[outcomes]).sum(axis=1)).round(1)
+
+    if market == 'O/U':
+        levels = [[], [], []]
+        odds_df = pd.Series(index=pd.MultiIndex(levels=levels, codes=levels),
+                            dtype=object)
+        table = table.sort_index(level='line', sort_remaining=False)
+        for (line, bookie), row in table.iterrows():
+            for column, value in row.items():
+                odds_df[(f'+{line:g}', bookie, column)] = value
+    else:
+        odds_df = pd.Series(index=pd.MultiIndex(levels=[[], []], codes=[[], []]),
+                            dtype=object)
+        for bookie, row in table.iterrows():
+            for column, value in row.items():
+                odds_df[(bookie, column)] = value
+
+    return odds_df.to_frame().T
+
+
 class Oddsportal:
 
+    # Guards self.timings, which the workers add their timings to
+    _timings_lock = threading.Lock()
+
     # ==========================================================================
-    def __init__(self):
+    def __init__(self, capture_feed=False, timeout=10, settle_time=0.5,
+                 poll_frequency=0.1):
+        """ capture_feed=True records the browser's network log so that
+        scrape_match() can decode the odds from the data feeds the match page
+        loads, instead of clicking through and re-parsing the rendered page.
+
+        timeout is the max number of seconds to wait for a page to load or
+        render. Pages are considered rendered once the number of loaded
+        resources or rows hasn't changed for settle_time seconds, checked every
+        poll_frequency seconds.
+        """
+        self.capture_feed = capture_feed
+        self.timeout = timeout
+        self.settle_time = settle_time
+        self.poll_frequency = poll_frequency
+        self.timings = list()  # per-page timings, see get_timing_report()
+        self._feed_request_urls = dict()  # {request ID: URL} of unfinished feed requests
+        self._feeds = list()  # decoded feeds captured since the last navigation
+
         options = Options()
         # options.headless = True
         prefs = {'profile.managed_default_content_settings.images': 2}  # don't load images
         options.add_experimental_option('prefs', prefs)
+        if capture_feed:
+            options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
         self.driver = webdriver.Chrome(options=options)
 
     # ==========================================================================
@@ -32,87 +393,169 @@ class Oddsportal:
         self.driver.close()
         self.driver.quit()
 
+    # ==========================================================================
+    def _wait_until_stable(self, measure, settle_time=None):
+        """ Waits until measure(driver) returns the same value for settle_time
+        seconds, or raises TimeoutException after self.timeout seconds.
+        None values never count as stable.
+        """
+        settle_time = self.settle_time if settle_time is None else settle_time
+        state = {'value': None, 'since': time.monotonic()}
+
+        def stable(driver):
+            value, now = measure(driver), time.monotonic()
+            if value is None or value != state['value']:
+                state['value'], state['since'] = value, now
+                return False
+            return now - state['since'] >= settle_time
+
+        WebDriverWait(self.driver, self.timeout,
+                      poll_frequency=self.poll_frequency).until(stable)
+        return state['value']
+
+    # ==========================================================================
+    def _wait_for_network_idle(self):
+        """ Waits until the page has loaded and no new resources have been
+        requested for self.settle_time seconds.
+        """
+        self._wait_until_stable(lambda driver: (
+            driver.execute_script(
+                "return performance.getEntriesByType('resource').length")
+            if driver.execute_script('return document.readyState') == 'complete'
+            else None))
+
+    # ==========================================================================
+    def _wait_for_divs(self, class_, n, message):
+        """ Waits until the page has at least n divs with the class, and returns
+        the parsed page. Raises TimeoutException with the message after
+        self.timeout seconds.
+
+        The divs are counted in the browser, with one script call per poll, and
+        the page is only parsed once they're there. Like BeautifulSoup, class_
+        matches the whole class attribute or one of the classes.
+        """
+        def loaded(driver):
+            return driver.execute_script(
+                'return Array.from(document.getElementsByTagName("div")).filter('
+                'div => div.getAttribute("class") === arguments[0] '
+                '|| div.classList.contains(arguments[0])).length;', class_) >= n
+
+        WebDriverWait(self.driver, self.timeout,
+                      poll_frequency=self.poll_frequency).until(loaded, message)
+        return BeautifulSoup(self.driver.page_source, 'html.parser')
+
+    # ==========================================================================
+    def _get_rendered_links(self, finder):
+        """ Returns the hrefs of the rendered match links with one script call
+        instead of re-parsing the whole page.
+        """
+        return self.driver.execute_script(
+            'return Array.from(document.querySelectorAll('
+            '\'a[class*="flex-col"][href]\')).map(a => a.getAttribute("href"))'
+            '.filter(href => href.includes(arguments[0]));', finder)
+
+    # ==========================================================================
+    def _collect_page_links(self, finder):
+        """ Scrolls through the results page one screen at a time, collecting
+        match links as they're rendered. Waits for the number of rendered links
+        to settle after each scroll instead of polling the scroll offset.
+        """
+        page_links = set()
+        at_bottom = False
+        while not at_bottom:
+            try:
+                self._wait_until_stable(
+                    lambda driver: len(self._get_rendered_links(finder)))
+            except TimeoutException:
+                pass  # Rows kept changing, take what's rendered and keep scrolling
+            page_links.update(self._get_rendered_links(finder))
+            at_bottom = self.driver.execute_script(
+                'window.scrollBy(0, window.innerHeight);'
+                'return window.innerHeight + window.pageYOffset '
+                '>= document.body.scrollHeight;')
+        page_links.update(self._get_rendered_links(finder))
+        self.driver.execute_script('window.scrollTo(0,0)')
+        return page_links
+
+    # ==========================================================================
+    def _go_to_results_page(self, url, page_num, previous_link):
+        """ Goes to another page of results by clicking its pagination link and
+        waiting for the old rows to be replaced. Falls back to loading the
+        page's URL if the link can't be clicked.
+        """
+        try:
+            link = self.driver.find_element(
+                By.CSS_SELECTOR, f'a.pagination-link[data-number="{page_num}"]')
+            old_row = (self.driver.find_element(By.CSS_SELECTOR,
+                                                f'a[href="{previous_link}"]')
+                       if previous_link else None)
+            self.driver.execute_script('arguments[0].click()', link)
+            if old_row is not None:
+                WebDriverWait(self.driver, self.timeout,
+                              poll_frequency=self.poll_frequency)\
+                    .until(EC.staleness_of(old_row))
+        except (NoSuchElementException, TimeoutException):
+            self.driver.get(f'{url}/#/page/{page_num}')
+            self.driver.refresh()
+        self._wait_for_network_idle()
+
     # ==========================================================================
     def get_match_links(self, year, league):
         """ 
         year=None for current season
+
+        Timings for each results page are added to self.timings, see
+        get_timing_report().
         """
-        source_comp_info = get_source_comp_info(year, league, 'Oddsportal')
+        if league not in comps.keys():
+            raise InvalidLeagueException(league, 'Oddsportal', list(comps.keys()))
+        finder = comps[league]['path']
 
         if not year:
             # current season
-            url = source_comp_info['Oddsportal'][league]['url'] + '/results/'
+            url = f'https://www.oddsportal.com{finder}/results/'
         else:
             # previous season
-            url = source_comp_info['Oddsportal'][league]['url'] + f'-{year - 1}-{year}/results/'
+            url = f'https://www.oddsportal.com{finder}-{year - 1}-{year}/results/'
 
-        # Go the season's page, scroll down and back up to render everything
+        # Go the season's page and wait for it to finish loading
+        start = time.monotonic()
         self.driver.get(url)
-        # loaded = False
-        # next_button, prev_button = None, None
-        # while not loaded:
-        #     soup = BeautifulSoup(self.driver.page_source, 'html.parser') # update soup
-        #     next_button = [el for el in soup.find_all(['p','a']) if 'next'==el.text.lower()]
-        #     prev_button = [el for el in soup.find_all(['p','a']) if 'prev'==el.text.lower()]
-        #     if next_button or prev_button:
-        #         loaded = True
-        # Scroll down and back up
-        offset = self.driver.execute_script('return window.pageYOffset')
-        html = self.driver.find_element(By.TAG_NAME, 'html')
-        html.send_keys(Keys.PAGE_DOWN)
-        while offset < self.driver.execute_script('return window.pageYOffset'):
-            offset = self.driver.execute_script('return window.pageYOffset')
-            html.send_keys(Keys.PAGE_DOWN)
-        self.driver.execute_script('window.scrollTo(0,0)')
+        self._wait_for_network_idle()
         
         # Get number of pages. If there are no page number elements, there is only 
         # 1 page (happens early in a new season, for example).
-        soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-        pagination_div_xpath = xpath_soup(soup.find_all('div', 
-                                                        {'class': re.compile('pagination')})[-1])
-        _ = (WebDriverWait(self.driver, 10)\
-             .until(EC.presence_of_element_located((By.XPATH, pagination_div_xpath))))
-        soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-        page_num_els = soup.find_all('a', {'class': 'pagination-link', 
-                                           'data-number': lambda tag: tag is not None})
-        max_page_num = (max([int(el['data-number']) for el in page_num_els]) 
-                        if len(page_num_els) > 0 else 1)
+        try:
+            WebDriverWait(self.driver, self.timeout, poll_frequency=self.poll_frequency)\
+                .until(EC.presence_of_element_located(
+                    (By.CSS_SELECTOR, 'div[class*="pagination"]')))
+            page_nums = self.driver.execute_script(
+                'return Array.from(document.querySelectorAll('
+                '"a.pagination-link[data-number]")).map(a => a.dataset.number);')
+        except TimeoutException:
+            page_nums = list()
+        max_page_num = max([int(x) for x in page_nums]) if len(page_nums) > 0 else 1
 
         # Iterate over all pages
         all_links = list()
+        page_links = set()
         for page_num in range(1, max_page_num + 1):
-            page_links = []
-            
-            # Go to the page link, refresh, scroll down and back up to render everything
-            self.driver.get(f'{url}/#/page/{page_num}')
-            self.driver.refresh()
-            # Scroll down and back up
-            offset = self.driver.execute_script('return window.pageYOffset')
-            html = self.driver.find_element(By.TAG_NAME, 'html')
-            html.send_keys(Keys.PAGE_DOWN)
-            while offset < self.driver.execute_script('return window.pageYOffset'):
-                offset = self.driver.execute_script('return window.pageYOffset')
-                html.send_keys(Keys.PAGE_DOWN)
-            self.driver.execute_script('window.scrollTo(0,0)')
+            if page_num > 1:
+                start = time.monotonic()
+                # Any row from the previous page, to know when it has been replaced
+                previous_link = next(iter(page_links), None)
+                self._go_to_results_page(url, page_num, previous_link)
+            loaded = time.monotonic()
 
             # Scroll down, collect links on the way
-            offset = self.driver.execute_script('return window.pageYOffset')
-            html.send_keys(Keys.PAGE_DOWN)
-            while offset < self.driver.execute_script('return window.pageYOffset'):
-                # Scroll down
-                offset = self.driver.execute_script('return window.pageYOffset')
-                html.send_keys(Keys.PAGE_DOWN)
-
-                # Find any new links
-                soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-                page_links += [el['href'] 
-                               for el in soup.find_all('a', {'class': re.compile('flex-col')}, 
-                                                       href=True)
-                               if source_comp_info['Oddsportal'][league]['finder'] in el['href']
-                               and el['href'] not in page_links]
+            page_links = self._collect_page_links(finder)
+            self.timings.append({
+                'url': f'{url}/#/page/{page_num}', 'load (s)': loaded - start,
+                'render (s)': time.monotonic() - loaded, 'links': len(page_links)
+            })
 
             # Append links from this page to list of all links
-            all_links += list(set(page_links))
+            all_links += [link for link in page_links if link not in all_links]
 
         all_links = list(set(all_links))  # remove duplicates
         all_links = ['https://oddsportal.com' + link for link in all_links]
@@ -120,8 +563,32 @@ class Oddsportal:
         return all_links
 
     # ==========================================================================
-    def scrape_match(self, url):
+    def get_timing_report(self):
+        """ Returns the timings recorded by get_match_links() and scrape_match()
+        as a DataFrame, one row per page.
+        """
+        return pd.DataFrame(self.timings)
+
+    # ==========================================================================
+    def scrape_match(self, url, as_long=False):
+        """ Scrapes the info and odds of a match.
+
+        Returns a 1-row DataFrame with MultiIndex columns by default. If
+        as_long=True, returns (match info DataFrame, long odds DataFrame)
+        instead, see long_odds(). Both have a match_id column to join them on.
+        """
+        start = time.monotonic()
+        if self.capture_feed:
+            self._reset_feeds()
         self.driver.get(url)
+
+        # Wait for final result to load
+        final_result_el = WebDriverWait(self.driver, self.timeout,
+                                        poll_frequency=self.poll_frequency)\
+            .until(EC.presence_of_element_located((
+                By.XPATH, '//strong[contains(.., "Final") and contains(.., "result")]')))
+        final_result = final_result_el.text
+        loaded = time.monotonic()
         soup = BeautifulSoup(self.driver.page_source, 'html.parser')
 
         # Date
@@ -140,14 +607,6 @@ class Oddsportal:
         team1 = teams[0]
         team2 = teams[1]
 
-        # Wait for final result to load
-        final_result = list()
-        while len(final_result) == 0:
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')  # update soup
-            final_result = [el.text for el in soup.find_all('strong')
-                            if re.search('(?=.*Final)(?=.*result)', el.parent.text)]
-        final_result = final_result[0]
-        
         # Goals and result
         goals1 = int(final_result.split(':')[0])
         goals2 = int(final_result.split(':')[1])
@@ -164,8 +623,22 @@ class Oddsportal:
         match_df = match_df.to_frame().T
 
         # Scrape odds
-        moneyline_df = self.get_1X2odds_from_match(url)
-        over_under_df = self.get_OUodds_from_match(url)
+        odds_dfs = self._odds_from_feed(url) if self.capture_feed else None
+        if odds_dfs is None:
+            moneyline_df = self.get_1X2odds_from_match(url)
+            over_under_df = self.get_OUodds_from_match(url)
+        else:
+            moneyline_df, over_under_df = odds_dfs
+
+        if as_long:
+            match_id = match_id_from_url(url)
+            match_df.insert(0, 'match_id', match_id)
+            match_df = match_df.astype({'Goals1': 'int16', 'Goals2': 'int16',
+                                        'Total goals': 'int16'})
+            self.timings.append({'url': url, 'load (s)': loaded - start,
+                                 'render (s)': time.monotonic() - loaded,
+                                 'links': None})
+            return match_df, long_odds(moneyline_df, over_under_df, match_id)
 
         # New columns as MultiIndex
         columns = pd.MultiIndex.from_tuples([(i,) if type(i) is str else i 
@@ -176,30 +649,333 @@ class Oddsportal:
         # Actually merge the odds dfs now
         match_df = pd.concat([match_df, moneyline_df, over_under_df], axis=1)
         match_df.columns = columns
+        self.timings.append({'url': url, 'load (s)': loaded - start,
+                             'render (s)': time.monotonic() - loaded, 'links': None})
 
         return match_df
     
     # ==========================================================================
-    def scrape_season_odds(self, year, league):
+    def scrape_season_odds(self, year, league, n_workers=1, max_retries=1,
+                           as_long=False):
+        """ Scrapes the odds of every match in the season.
+
+        If as_long=True, returns (matches DataFrame, long odds DataFrame)
+        instead of one wide DataFrame, see scrape_match().
+
+        n_workers > 1 scrapes the matches in parallel, each worker with its own
+        browser. n_workers='auto' uses as many workers as fit in the available
+        memory, see workers_for_available_memory(). Matches are returned in the
+        same order either way. If a match page times out, or a worker's browser
+        crashes (and is replaced), the match is retried up to max_retries times
+        before being skipped. Matches that fail otherwise are skipped.
+        """
         # Verify season is valid
         # check_season(year, league, 'Oddsportal')
+        if n_workers == 'auto':
+            n_workers = workers_for_available_memory()
+        if not isinstance(n_workers, int) or n_workers < 1:
+            raise ValueError('n_workers must be an int > 0 or "auto".')
 
         # Get match links
         match_links = self.get_match_links(year, league)
 
         # Scrape matches
-        df = pd.DataFrame()
-        for link in tqdm(match_links, desc=f'{year} {league}'):
-            match_df = self.scrape_match(link)
-            df = pd.concat([df, match_df], axis=0, ignore_index=True)
+        if n_workers == 1:
+            results, worker = list(), self
+            for link in tqdm(match_links, desc=f'{year} {league}'):
+                result, worker = self._scrape_link(worker, link, max_retries, as_long)
+                results.append(result)
+            if worker is not None and worker is not self:
+                self._retire_worker(worker)
+        else:
+            results = self._scrape_matches_parallel(
+                match_links, n_workers, max_retries, as_long, desc=f'{year} {league}')
+        results = [result for result in results if result is not None]
+
+        if as_long:
+            if len(results) == 0:
+                return pd.DataFrame(), long_odds(pd.DataFrame(), pd.DataFrame(), None)
+            matches = pd.concat([r[0] for r in results], axis=0, ignore_index=True)
+            odds = compact_odds(pd.concat([r[1] for r in results], axis=0,
+                                          ignore_index=True))
+            return matches, odds
+
+        df = pd.concat(results, axis=0, ignore_index=True) if len(results) > 0 \
+            else pd.DataFrame()
         
         return df
 
     # ==========================================================================
-    def get_1X2odds_from_match(self, url):
+    def _new_worker(self):
+        """ Creates another Oddsportal instance with the same settings, which
+        has its own browser.
+        """
+        return Oddsportal(capture_feed=self.capture_feed, timeout=self.timeout,
+                          settle_time=self.settle_time,
+                          poll_frequency=self.poll_frequency)
+
+    # ==========================================================================
+    def _retire_worker(self, worker):
+        """ Adds the timings of a worker created by _new_worker() to
+        self.timings and closes its browser.
+        """
+        with self._timings_lock:
+            self.timings += worker.timings
+        try:
+            worker.close()
+        except WebDriverException:
+            pass  # browser already crashed
+
+    # ==========================================================================
+    def _scrape_link(self, worker, link, max_retries, as_long):
+        """ Scrapes a match with worker.scrape_match(). Timeouts are retried
+        in the same browser. If the browser crashes, the worker is replaced
+        with a new one (see _new_worker()) and the match is retried. Either is
+        retried up to max_retries times. Matches that fail otherwise, or whose
+        worker can't be replaced, are skipped with a warning.
+
+        Returns (result, or None if the match was skipped, the worker to use
+        for the next match). worker can be self, which is never closed, or
+        None to start a new worker.
+        """
+        for _ in range(max_retries + 1):
+            if worker is None:
+                try:
+                    worker = self._new_worker()
+                except Exception as e:
+                    warnings.warn(f'Unable to start a browser ({e!r}), skipping {link}.')
+                    return None, None
+            try:
+                return worker.scrape_match(link, as_long), worker
+            except TimeoutException:
+                continue  # The page was slow, retry it in the same browser
+            except WebDriverException:
+                # The browser crashed or hung, replace it and retry
+                if worker is not self:
+                    self._retire_worker(worker)
+                worker = None
+            except Exception as e:
+                # e.g. the page is laid out differently, retrying won't help
+                warnings.warn(f'Unable to scrape {link} ({e!r}), skipping it.')
+                return None, worker
+        warnings.warn(f'Unable to scrape {link}, skipping it.')
+        return None, worker
+
+    # ==========================================================================
+    def _scrape_matches_parallel(self, links, n_workers, max_retries, as_long=False,
+                                 desc=None):
+        """ Scrapes the match links across a pool of workers. Returns the
+        scrape_match() results in the same order as links, None for skipped
+        matches.
+        """
+        results = [None] * len(links)
+        link_queue = queue.Queue()
+        for i, link in enumerate(links):
+            link_queue.put((i, link))
+        progress = tqdm(total=len(links), desc=desc)
+        lock = threading.Lock()
+
+        def work():
+            worker = None  # started for the first match
+            try:
+                while True:
+                    try:
+                        i, link = link_queue.get_nowait()
+                    except queue.Empty:
+                        return
+                    results[i], worker = self._scrape_link(worker, link, max_retries,
+                                                           as_long)
+                    with lock:
+                        progress.update(1)
+            finally:
+                if worker is not None:
+                    self._retire_worker(worker)
+
+        try:
+            with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                futures = [executor.submit(work) for _ in range(min(n_workers, len(links)))]
+                for future in futures:
+                    future.result()
+        finally:
+            progress.close()
+
+        return results
+
+    # ==========================================================================
+    def _page_content_hash(self):
+        """ Waits for the page to finish loading and returns the SHA-256 of its
+        visible text, which changes whenever any of the odds on it do.
+        """
+        self._wait_for_network_idle()
+        text = self.driver.execute_script('return document.body.innerText')
+        return hashlib.sha256(' '.join(text.split()).encode('utf-8')).hexdigest()
+
+    # ==========================================================================
+    def poll_odds(self, urls, store, skip_unchanged=True):
+        """ Scrapes the current odds of the matches and returns only the odds
+        that changed since the last poll, for cheap repeated polling of
+        upcoming matches.
+
+        Parameters
+        ----------
+        urls : list of str
+            Oddsportal match URLs. Unlike scrape_match(), the matches don't
+            need to have been played.
+        store : OddsSnapshotStore or str
+            Snapshot store, or the path to its SQLite database.
+        skip_unchanged : bool
+            If True, skips matches whose page text hasn't changed since the
+            last poll without parsing their odds.
+
+        Returns
+        -------
+        DataFrame
+            Odds changes of all of the matches, see odds_deltas()
+        """
+        if isinstance(urls, str):
+            urls = [urls]
+        own_store = not isinstance(store, OddsSnapshotStore)
+        if own_store:
+            store = OddsSnapshotStore(store)
+
+        deltas = list()
+        try:
+            for url in tqdm(urls, desc='Polling odds'):
+                match_id = match_id_from_url(url)
+                scraped_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+                if self.capture_feed:
+                    self._reset_feeds()
+                self.driver.get(url)
+                try:
+                    content_hash = self._page_content_hash()
+                except TimeoutException:
+                    content_hash = None  # page kept changing, parse it anyway
+                if (skip_unchanged and content_hash is not None
+                        and content_hash == store.content_hash(match_id)):
+                    continue
+
+                odds_dfs = self._odds_from_feed(url) if self.capture_feed else None
+                if odds_dfs is None:
+                    # The page is already loaded, don't load it again
+                    odds_dfs = (self.get_1X2odds_from_match(url, load=False),
+                                self.get_OUodds_from_match(url, load=False))
+                odds = long_odds(*odds_dfs, match_id)
+                deltas.append(store.update(match_id, odds, scraped_at))
+                if content_hash is not None:
+                    store.set_content_hash(match_id, content_hash, scraped_at)
+        finally:
+            if own_store:
+                store.close()
+
+        if len(deltas) == 0:
+            return odds_deltas(long_odds(pd.DataFrame(), pd.DataFrame(), None),
+                               long_odds(pd.DataFrame(), pd.DataFrame(), None), None)
+        return pd.concat(deltas, axis=0, ignore_index=True)
+
+    # ==========================================================================
+    def _reset_feeds(self):
+        """ Discards the network log and any captured feeds, call before
+        navigating to a new match.
+        """
+        self.driver.get_log('performance')
+        self._feed_request_urls = dict()
+        self._feeds = list()
+
+    # ==========================================================================
+    def _collect_feeds(self):
+        """ Reads new entries from the browser's network log and decodes the
+        odds feed responses that have finished loading. Returns the betting
+        type IDs of all of the feeds captured since the last navigation.
+        """
+        for entry in self.driver.get_log('performance'):
+            message = json.loads(entry['message'])['message']
+            params = message.get('params', dict())
+            if message['method'] == 'Network.responseReceived':
+                if '/feed/match' in params['response']['url']:
+                    self._feed_request_urls[params['requestId']] = \
+                        params['response']['url']
+            elif (message['method'] == 'Network.loadingFinished'
+                  and params['requestId'] in self._feed_request_urls):
+                request_id = params['requestId']
+                del self._feed_request_urls[request_id]
+                try:
+                    body = self.driver.execute_cdp_cmd(
+                        'Network.getResponseBody', {'requestId': request_id})['body']
+                except WebDriverException:
+                    continue  # evicted from the browser's buffer
+                feed = _decode_feed(body)
+                if feed is not None:
+                    self._feeds.append(feed)
+
+        betting_types = set()
+        for feed in self._feeds:
+            for key in feed.get('d', dict()).get('oddsdata', dict()).get('back', dict()):
+                if key.split('-')[1].isdigit():
+                    betting_types.add(int(key.split('-')[1]))
+        return betting_types
+
+    # ==========================================================================
+    def _bookmaker_names(self):
+        """ Returns {bookmaker ID: name} from the bookmaker data embedded in the
+        page. IDs are used as names if it can't be found.
+        """
+        return dict(re.findall(r'"(\d+)"\s*:\s*\{[^{}]*?"WebName"\s*:\s*"([^"]+)"',
+                               self.driver.page_source))
+
+    # ==========================================================================
+    def get_odds_from_feed(self, url):
+        """ Gets the 1X2 and Over/Under odds of a match from the data feeds the
+        page loads, with one navigation. Requires capture_feed=True.
+
+        Returns (moneyline_df, over_under_df), the same DataFrames as
+        get_1X2odds_from_match() and get_OUodds_from_match(), or None if the
+        feeds couldn't be captured or decoded.
+        """
+        if not self.capture_feed:
+            raise ValueError('Oddsportal must be created with capture_feed=True.')
+        self._reset_feeds()
+        self.driver.get(url)
+        return self._odds_from_feed(url)
+
+    # ==========================================================================
+    def _odds_from_feed(self, url):
+        """ Decodes the odds from the feeds of the match page that's already
+        loaded. The 1X2 feed loads with the page, the Over/Under feed loads when
+        its tab is clicked. Returns None so the caller can fall back to scraping
+        the page if the 1X2 feed can't be decoded.
+        """
+        wait = WebDriverWait(self.driver, self.timeout, poll_frequency=self.poll_frequency)
+        try:
+            wait.until(lambda _: 1 in self._collect_feeds())
+        except TimeoutException:
+            warnings.warn(f'Unable to decode the odds feed from {url}, '
+                          'scraping the page instead.')
+            return None
+
+        try:
+            button = self.driver.find_element(By.LINK_TEXT, 'Over/Under')
+            self.driver.execute_script('arguments[0].click()', button)
+            wait.until(lambda _: 2 in self._collect_feeds())
+        except NoSuchElementException:
+            warnings.warn(f'Over/Under odds not found at {url}.')
+        except TimeoutException:
+            warnings.warn(f'Unable to load over/under odds feed from {url}.')
+
+        bookmakers = self._bookmaker_names()
+        records = [record for feed in self._feeds
+                   for record in _feed_odds_records(feed, bookmakers)]
+        moneyline_df = _wide_odds_from_records(records, '1X2')
+        over_under_df = _wide_odds_from_records(records, 'O/U')
+        return moneyline_df, over_under_df
+
+    # ==========================================================================
+    def get_1X2odds_from_match(self, url, load=True):
+        """ load=False scrapes the match page that's already loaded.
+        """
         # if '#1X2' not in url:
         #     url += '#1X2'
-        self.driver.get(url)
+        if load:
+            self.driver.get(url)
 
         # Verify that odds are on the page
         soup = BeautifulSoup(self.driver.page_source, 'html.parser')
@@ -215,13 +991,8 @@ class Oddsportal:
             self.driver.execute_script('arguments[0].click()', button)
 
             # Wait for page to load
-            counter = 0
-            while len(soup.find_all('div', {'class': 'flex flex-col'})) < 2:
-                if counter == 0:
-                    raise Exception(f'Unable to load 1X2 odds from {url}.')
-                soup = BeautifulSoup(self.driver.page_source, 'html.parser')  # update soup
-                time.sleep(1)
-                counter += 1
+            soup = self._wait_for_divs('flex flex-col', 2,
+                                       f'Unable to load 1X2 odds from {url}.')
 
             # # Hide inactive odds
             # hide_inactive_checkbox = [el for el in soup.find_all('label') if 'Hide inactive odds' in el.text][0].parent.find('input', {'type': 'checkbox'})
@@ -282,10 +1053,13 @@ class Oddsportal:
         return odds_df
 
     # ==========================================================================
-    def get_OUodds_from_match(self, url):
+    def get_OUodds_from_match(self, url, load=True):
+        """ load=False scrapes the match page that's already loaded.
+        """
         # if '#over-under' not in url:
         #     url += '#over-under'
-        self.driver.get(url)
+        if load:
+            self.driver.get(url)
 
         # Verify that odds are on the page
         soup = BeautifulSoup(self.driver.page_source, 'html.parser')
@@ -302,17 +1076,9 @@ class Oddsportal:
             self.driver.execute_script('arguments[0].click()', button)
 
             # Wait for handicaps table to load
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            handicaps_table = soup.find_all('div', {'class': 'min-md:px-[10px]'})
-            counter = 0
-            while len(handicaps_table) < 2:
-                if counter == 10:
-                    raise Exception(f'Unable to load over/under odds from {url}.')
-                soup = BeautifulSoup(self.driver.page_source, 'html.parser')  # update soup
-                handicaps_table = soup.find_all('div', {'class': 'min-md:px-[10px]'})
-                time.sleep(1)
-                counter += 1
-            handicaps_table = handicaps_table[1]
+            soup = self._wait_for_divs('min-md:px-[10px]', 2,
+                                       f'Unable to load over/under odds from {url}.')
+            handicaps_table = soup.find_all('div', {'class': 'min-md:px-[10px]'})[1]
 
             # # Hide inactive odds
             # hide_inactive_checkbox = [el for el in soup.find_all('label') if 'Hide inactive odds' in el.text][0].parent.find('input', {'type': 'checkbox'})
@@ -327,24 +1093,20 @@ class Oddsportal:
                                 dtype=object)
             handicap_rows = handicaps_table.find_all('div', {'class': 'relative flex flex-col'}, 
                                                      recursive=False)
-            for handicap_row in handicap_rows:
+            # Xpaths of all of the row buttons at once, indexing each parent only once
+            button_xpaths = xpaths_soup([row.find('div') for row in handicap_rows])
+            for handicap_row, button_xpath in zip(handicap_rows, button_xpaths):
                 handicap = handicap_row.find('p').text.replace('Over/Under', '').strip()  # the total goals handicap text
 
                 # Click on handicap row to expand odds
-                handicap_row_button = self.driver.find_element(By.XPATH, 
-                                                               xpath_soup(handicap_row.find('div')))
+                handicap_row_button = self.driver.find_element(By.XPATH, button_xpath)
                 self.driver.execute_script('arguments[0].scrollIntoView()', handicap_row_button)
                 self.driver.execute_script('arguments[0].click()', handicap_row_button)
 
                 # Wait for odds table to load
-                loaded = False
-                while not loaded:
-                    soup = BeautifulSoup(self.driver.page_source, 'html.parser')  # update soup
-                    odds_table = soup.find_all('div', {'class': 'flex flex-col'})
-                    if len(odds_table) > 0:
-                        loaded = True
-
-                soup = BeautifulSoup(self.driver.page_source, 'html.parser')  # update soup
+                soup = self._wait_for_divs(
+                    'flex flex-col', 2,
+                    f'Unable to load {handicap} over/under odds from {url}.')
                 odds_table = soup.find_all('div', {'class': 'flex flex-col'})[1]
                 odds_rows = odds_table.find_all('div', {'class': re.compile('flex text-xs')})
                 for odds_row in odds_rows:
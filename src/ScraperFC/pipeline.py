@@ -0,0 +1,66 @@
+from . import fetching, tracing
+from .shared_functions import get_parser, set_parser
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator
+
+
+# ==================================================================================================
+def _init_worker(parser: str) -> None:
+    """ Private, sets up a parser worker process like the parent: same HTML parser backend, and no
+    hooks or tracer, which would record into copies that the parent never sees.
+    """
+    set_parser(parser)
+    fetching._hooks.clear()
+    tracing._tracer = None
+
+
+# ==================================================================================================
+def parse_pages(
+        pages: Iterable[tuple], parse: Callable[..., Any], n_workers: int=1
+) -> Iterator[Any]:
+    """ Parses pages in a pool of worker processes while the next pages are being fetched, and
+    yields the results in the order of the pages.
+
+    Parsing HTML is CPU-bound and holds the GIL, so parsing in processes scales with the number of
+    cores, e.g. when a season is replayed from a cassette or the pages are cached. Only the raw
+    bytes of the pages are sent to the workers, and only the parsed results are sent back. At most
+    2 * `n_workers` pages are waiting to be parsed at a time, so pages aren't fetched much faster
+    than they're parsed.
+
+    Hooks (see fetching.add_hook()) and tracing spans aren't recorded inside the workers. Parse
+    caches still work, their entries are written atomically.
+
+    Parameters
+    ----------
+    pages : iterable of (url, content) tuples
+        The pages, typically a generator that fetches them. Content can be None, e.g. for pages
+        that weren't found, if `parse` handles it.
+    parse : function
+        Called as ``parse(url, content)`` in a worker. Must be picklable, i.e. a module level
+        function or a functools.partial of one.
+    n_workers : int, optional, default 1
+        Number of worker processes. With 1, pages are parsed in this process.
+
+    Returns
+    -------
+    : generator
+        Results of `parse`, in the order of `pages`
+    """
+    if not isinstance(n_workers, int) or n_workers < 1:
+        raise TypeError('`n_workers` must be an int greater than 0.')
+    if n_workers == 1:
+        for url, content in pages:
+            yield parse(url, content)
+        return
+
+    with ProcessPoolExecutor(
+            max_workers=n_workers, initializer=_init_worker, initargs=(get_parser(),)
+    ) as executor:
+        pending: deque = deque()
+        for url, content in pages:
+            pending.append(executor.submit(parse, url, content))
+            if len(pending) >= 2 * n_workers:
+                yield pending.popleft().result()
+        while len(pending) > 0:
+            yield pending.popleft().result()
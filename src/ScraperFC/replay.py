@@ -0,0 +1,276 @@
+from . import fetching
+from .scraperfc_exceptions import UnrecordedRequestException
+import base64
+from contextlib import contextmanager
+import gzip
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import requests
+from requests.structures import CaseInsensitiveDict
+import threading
+import time
+from urllib.parse import urlsplit
+from typing import Any, Iterator, Union
+
+# Headers that describe the encoding of the original response, not the decoded body that is stored
+_dropped_headers = ['content-encoding', 'content-length', 'transfer-encoding', 'connection']
+
+
+# ==================================================================================================
+class Cassette():
+    """ File of recorded HTTP responses, which scrapers can replay instead of requesting the live
+    sites. Use it with use_cassette().
+
+    Responses are stored by URL as JSON, gzipped if the path ends with ".gz".
+
+    Parameters
+    ----------
+    path : str
+        Path of the cassette file
+    mode : str, optional, default "once"
+        "replay" only replays recorded responses and raises UnrecordedRequestException for any
+        other request, "record" sends every request and records (or re-records) its response,
+        and "once" replays the responses that are recorded and records the rest.
+    """
+
+    # ==============================================================================================
+    def __init__(self, path: str, mode: str='once') -> None:
+        if not isinstance(path, str):
+            raise TypeError('`path` must be a string.')
+        if mode not in ['replay', 'record', 'once']:
+            raise ValueError('`mode` must be one of "replay", "record", or "once".')
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self.responses: dict = dict()  # {url: {'status_code', 'headers', 'body'}}
+        if os.path.exists(path):
+            with (gzip.open(path, 'rt') if path.endswith('.gz') else open(path)) as f:
+                self.responses = json.load(f)
+        elif mode == 'replay':
+            raise FileNotFoundError(f'Cassette {path} does not exist.')
+
+    # ==============================================================================================
+    def replays(self, url: str) -> bool:
+        """ Returns True if the request to the URL is replayed instead of sent.
+        """
+        if self.mode == 'replay':
+            if url not in self.responses:
+                raise UnrecordedRequestException(url, self.path)
+            return True
+        return self.mode == 'once' and url in self.responses
+
+    # ==============================================================================================
+    def response(self, url: str) -> requests.Response:
+        """ Returns the recorded response of the URL.
+        """
+        recorded = self.responses[url]
+        response = requests.Response()
+        response.url = url
+        response.status_code = recorded['status_code']
+        response.headers = CaseInsensitiveDict(recorded['headers'])
+        response._content = base64.b64decode(recorded['body'])
+        response.encoding = recorded.get('encoding')
+        return response
+
+    # ==============================================================================================
+    def record(self, url: str, response: Any) -> None:
+        """ Records a response, either a requests.Response or any response object with
+        `status_code`, `headers`, and `content` attributes (e.g. botasaurus responses).
+        """
+        with self._lock:
+            self.responses[url] = {
+                'status_code': response.status_code,
+                'headers': dict([
+                    (k, v) for k, v in dict(response.headers).items()
+                    if k.lower() not in _dropped_headers
+                ]),
+                'encoding': getattr(response, 'encoding', None),
+                'body': base64.b64encode(response.content).decode('ascii'),
+            }
+
+    # ==============================================================================================
+    def save(self) -> None:
+        """ Writes the cassette file.
+        """
+        if os.path.dirname(self.path) != '':
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            with (gzip.open(self.path, 'wt') if self.path.endswith('.gz')
+                  else open(self.path, 'w')) as f:
+                json.dump(self.responses, f)
+
+
+# ==================================================================================================
+@contextmanager
+def use_cassette(path: str, mode: str='once') -> Iterator[Cassette]:
+    """ Records and/or replays the HTTP requests of all scrapers inside the `with` block. See
+    Cassette for the parameters.
+
+    Requests that go through fetching.fetch() (FBref, Understat, Transfermarkt, Capology, ClubElo)
+    and Sofascore's API requests are covered. Pages loaded in Selenium browsers are not.
+
+    Examples
+    --------
+    >>> with use_cassette('test/cassettes/epl.json.gz'):
+    ...     matches = Understat().scrape_matches('2023/2024', 'EPL')
+    """
+    cassette = Cassette(path, mode)
+    previous, fetching._cassette = fetching._cassette, cassette
+    try:
+        yield cassette
+    finally:
+        fetching._cassette = previous
+        if mode != 'replay':
+            cassette.save()
+
+
+# ==================================================================================================
+class StandInServer():
+    """ Local HTTP server that serves the responses of a cassette in place of the live sites, with
+    configurable latency and rate limiting, for testing and benchmarking without network access.
+
+    Inside intercept(), the requests of all scrapers are sent to the server. It serves the recorded
+    response of the original URL, or a 404 if it isn't recorded.
+
+    Parameters
+    ----------
+    cassette : Cassette or str
+        Cassette, or path of the cassette, to serve
+    latency : float, optional, default 0
+        Seconds to wait before sending each response
+    throttle_every : int, optional
+        If given, every `throttle_every`-th request gets a 429 response.
+    max_rps : float, optional
+        If given, requests above this many per second get a 429 response.
+    retry_after : int, optional, default 1
+        Retry-After header of the 429 responses, in seconds
+    port : int, optional, default 0
+        Port to listen on, 0 picks a free port.
+    """
+
+    # ==============================================================================================
+    def __init__(
+            self, cassette: Union[Cassette, str], latency: float=0,
+            throttle_every: Union[int, None]=None, max_rps: Union[float, None]=None,
+            retry_after: int=1, port: int=0
+    ) -> None:
+        self.cassette = cassette if isinstance(cassette, Cassette) else Cassette(cassette, 'replay')
+        if throttle_every is not None and (not isinstance(throttle_every, int) or
+                                           throttle_every < 1):
+            raise TypeError('`throttle_every` must be an int greater than 0.')
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+        self.port = port
+        self.requests = 0  # number of requests served
+        self.throttled = 0  # number of 429 responses
+        self._lock = threading.Lock()
+        self._tokens = 0.0 if max_rps is None else max_rps  # token bucket of max_rps
+        self._last_refill = time.monotonic()
+        self._server: Union[ThreadingHTTPServer, None] = None
+
+    # ==============================================================================================
+    @property
+    def address(self) -> str:
+        """ Base URL of the running server, e.g. "http://127.0.0.1:8765".
+        """
+        if self._server is None:
+            raise RuntimeError('The server is not running.')
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    # ==============================================================================================
+    def url_for(self, url: str) -> str:
+        """ Returns the URL on the server that serves the response of `url`.
+        """
+        parts = urlsplit(url)
+        query = '' if parts.query == '' else f'?{parts.query}'
+        return f'{self.address}/{parts.scheme}/{parts.netloc}{parts.path}{query}'
+
+    # ==============================================================================================
+    def _throttle(self) -> bool:
+        """ Private, counts a request and returns True if it should get a 429 response.
+        """
+        with self._lock:
+            self.requests += 1
+            throttle = self.throttle_every is not None and \
+                self.requests % self.throttle_every == 0
+            if self.max_rps is not None:
+                now = time.monotonic()
+                self._tokens = min(self.max_rps,
+                                   self._tokens + (now - self._last_refill) * self.max_rps)
+                self._last_refill = now
+                if self._tokens < 1:
+                    throttle = True
+                else:
+                    self._tokens -= 1
+            if throttle:
+                self.throttled += 1
+            return throttle
+
+    # ==============================================================================================
+    def start(self) -> 'StandInServer':
+        """ Starts the server in a background thread.
+        """
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                time.sleep(stand_in.latency)
+                if stand_in._throttle():
+                    self.send_response(429)
+                    self.send_header('Retry-After', str(stand_in.retry_after))
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                scheme, _, rest = self.path.lstrip('/').partition('/')
+                recorded = stand_in.cassette.responses.get(f'{scheme}://{rest}')
+                if recorded is None:
+                    self.send_error(404)
+                    return
+                body = base64.b64decode(recorded['body'])
+                self.send_response(recorded['status_code'])
+                for key, value in recorded['headers'].items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(
+            target=self._server.serve_forever, kwargs={'poll_interval': 0.1}, daemon=True
+        ).start()
+        return self
+
+    # ==============================================================================================
+    def stop(self) -> None:
+        """ Stops the server.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    # ==============================================================================================
+    @contextmanager
+    def intercept(self) -> Iterator['StandInServer']:
+        """ Sends the requests of all scrapers inside the `with` block to the server.
+        """
+        previous, fetching._rewrite_url = fetching._rewrite_url, self.url_for
+        try:
+            yield self
+        finally:
+            fetching._rewrite_url = previous
+
+    # ==============================================================================================
+    def __enter__(self) -> 'StandInServer':
+        return self.start()
+
+    # ==============================================================================================
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
@@ -70,3 +70,38 @@ class FBrefRateLimitException(Exception):
     def __str__(self) -> str:
         return "FBref returned a 429 status, Too Many Requests. See " +\
             "https://www.sports-reference.com/bot-traffic.html for more details."    
+
+class NoWorkingProxiesException(Exception):
+    """ Raised when none of the proxies in a ProxyPool pass validation.
+    """
+    def __init__(self, n_proxies: int, test_url: str) -> None:
+        super().__init__()
+        self.n_proxies = n_proxies
+        self.test_url = test_url
+
+    def __str__(self) -> str:
+        return f'None of the {self.n_proxies} proxies could reach {self.test_url}.'
+
+class UnrecordedRequestException(Exception):
+    """ Raised when a request isn't in the cassette that is being replayed.
+    """
+    def __init__(self, url: str, cassette_path: str) -> None:
+        super().__init__()
+        self.url = url
+        self.cassette_path = cassette_path
+
+    def __str__(self) -> str:
+        return f'{self.url} is not recorded in the cassette {self.cassette_path}. Record it ' +\
+            'with mode="record" or "once".'
+
+class CircuitOpenException(Exception):
+    """ Raised when requests to a source are paused because too many of them failed in a row.
+    """
+    def __init__(self, url: str, seconds: float) -> None:
+        super().__init__()
+        self.url = url
+        self.seconds = seconds
+
+    def __str__(self) -> str:
+        return f'Too many requests to the site of {self.url} failed in a row, requests to it ' +\
+            f'are paused for {self.seconds:.0f} more seconds.'
@@ -1,18 +1,33 @@
-import requests
-from bs4 import BeautifulSoup
+from .fetching import ProxyPool
+from .tracing import traced
 import bs4
-import random
+import re
 import pandas as pd
-from io import StringIO
-from typing import Union
+from typing import Union, Sequence
+
+currency_codes = {'€': 'EUR', '£': 'GBP', '$': 'USD'}
+money_multipliers = {'bn': 1e9, 'm': 1e6, 'k': 1e3, 'th.': 1e3}
+
+# Shared pool used by get_proxy(), created on the first call
+_default_proxy_pool: Union[ProxyPool, None] = None
+
+# HTML parser used by make_soup(). lxml is much faster than Python's html.parser, which is the
+# fallback if lxml isn't installed.
+valid_parsers = ['lxml', 'html.parser', 'html5lib']
+try:
+    import lxml  # noqa: F401
+    DEFAULT_PARSER = 'lxml'
+except ImportError:
+    DEFAULT_PARSER = 'html.parser'
+_parser = DEFAULT_PARSER
 
 # ==================================================================================================
 def get_proxy() -> str:
-    """ Gets a proxy address.
-    
-    Adapted from
-    https://stackoverflow.com/questions/59409418/how-to-rotate-selenium-webrowser-ip-address.
-    Randomly chooses one proxy.
+    """ Gets a working proxy address.
+
+    The proxy list is downloaded and validated once, on the first call, and later calls rotate
+    across the fastest proxies of that shared pool. Use a ProxyPool directly to configure the
+    validation, or to send all of a scraper's requests through proxies.
     
     Parameters
     ----------
@@ -23,20 +38,68 @@ def get_proxy() -> str:
     proxy : str
         In the form <IP address>:<port>
     """
-    r = requests.get("https://sslproxies.org/")
-    soup = BeautifulSoup(r.content, "html.parser")
-    df = pd.read_html(StringIO(str(soup.find("table"))))[0]
-    df = df.loc[~df["Port"].isna(),:]
-    rand_row_idx = random.randint(0, df.shape[0]-1)
-    row = df.iloc[rand_row_idx,:]
-    proxy = f"{row['IP Address']}:{row['Port']}"
-    return proxy
+    global _default_proxy_pool
+    if _default_proxy_pool is None:
+        _default_proxy_pool = ProxyPool()
+    return _default_proxy_pool.get()
+
+# ==================================================================================================
+def set_parser(parser: str) -> None:
+    """ Sets the HTML parser used by all of the scrapers.
+
+    Parameters
+    ----------
+    parser : str
+        One of "lxml" (default if installed), "html.parser" or "html5lib". The parser has to be
+        installed.
+
+    Returns
+    -------
+    None
+    """
+    global _parser
+    if not isinstance(parser, str):
+        raise TypeError('`parser` must be a string.')
+    if parser not in valid_parsers:
+        raise ValueError(f'`parser` must be one of {valid_parsers}.')
+    _parser = parser
+
+# ==================================================================================================
+def get_parser() -> str:
+    """ Returns the HTML parser used by all of the scrapers, see set_parser().
+    """
+    return _parser
+
+# ==================================================================================================
+@traced('parse')
+def make_soup(
+        markup: Union[str, bytes], parse_only: Union[bs4.SoupStrainer, None]=None,
+        parser: Union[str, None]=None
+) -> bs4.BeautifulSoup:
+    """ Parses HTML with the configured parser, see set_parser().
+
+    Parameters
+    ----------
+    markup : str or bytes
+        HTML to parse
+    parse_only : bs4.SoupStrainer, optional
+        Only the tags matched by the strainer (and their contents) are built, which is much faster
+        than building the whole page when only e.g. one table or the script tags are needed.
+    parser : str, optional
+        Overrides the configured parser for this call.
+
+    Returns
+    -------
+    : bs4.BeautifulSoup
+    """
+    return bs4.BeautifulSoup(markup, _parser if parser is None else parser, parse_only=parse_only)
 
 # ==================================================================================================
 def xpath_soup(element: Union[bs4.element.Tag, bs4.element.NavigableString]) -> str:
     """ Generate xpath from BeautifulSoup4 element.
     
-    I shamelessly stole this from https://gist.github.com/ergoithz/6cf043e3fdedd1b94fcf.
+    I shamelessly stole this from https://gist.github.com/ergoithz/6cf043e3fdedd1b94fcf. Use
+    xpaths_soup() to generate the xpaths of many elements of the same tree.
     
     Parameters
     ----------
@@ -63,16 +126,138 @@ def xpath_soup(element: Union[bs4.element.Tag, bs4.element.NavigableString]) ->
     >>> xpath_soup(soup.doc.elm.next_sibling)
     "/doc/elm[2]"
     """
-    components = []
-    child = element if element.name else element.parent  # type: ignore
-    for parent in child.parents:  # type: ignore
-        siblings = parent.find_all(child.name, recursive=False)  # type: ignore
-        components.append(
-            child.name if 1 == len(siblings) else "%s[%d]" % (  # type: ignore
-                child.name,  # type: ignore
-                next(i for i, s in enumerate(siblings, 1) if s is child)
+    return xpaths_soup([element])[0]
+
+# ==================================================================================================
+def _sibling_positions(parent: bs4.element.Tag) -> dict:
+    """ Private, indexes the child tags of parent in one pass.
+
+    Returns {id(child): (position among the children with the same name, number of children with
+    that name), ...}
+    """
+    positions: dict = dict()
+    counts: dict = dict()
+    for child in parent.children:
+        if isinstance(child, bs4.element.Tag):
+            counts[child.name] = counts.get(child.name, 0) + 1
+            positions[id(child)] = (child.name, counts[child.name])
+    return dict([
+        (child_id, (position, counts[name])) for child_id, (name, position) in positions.items()
+    ])
+
+# ==================================================================================================
+def xpaths_soup(
+        elements: Sequence[Union[bs4.element.Tag, bs4.element.NavigableString]]
+) -> Sequence[str]:
+    """ Generate xpaths for many BeautifulSoup4 elements of the same tree.
+
+    Each parent's children are indexed once and reused for every element below it, so generating
+    the xpaths of all of the rows of a big table is linear in the size of the table instead of
+    quadratic.
+
+    Parameters
+    ----------
+    elements : list of bs4.element.Tag or bs4.element.NavigableString
+        BeautifulSoup4 elements.
+
+    Returns
+    -------
+    xpaths : list of str
+        Same order as elements, see xpath_soup().
+    """
+    indexes: dict = dict()  # {id(parent): _sibling_positions(parent)}
+    xpaths = list()
+    for element in elements:
+        components = []
+        child = element if element.name else element.parent  # type: ignore
+        for parent in child.parents:  # type: ignore
+            if id(parent) not in indexes:
+                indexes[id(parent)] = _sibling_positions(parent)
+            position, count = indexes[id(parent)][id(child)]
+            components.append(
+                child.name if count == 1 else "%s[%d]" % (child.name, position)  # type: ignore
             )
-        )
-        child = parent
-    components.reverse()
-    return "/%s" % "/".join(components)
+            child = parent
+        components.reverse()
+        xpaths.append("/%s" % "/".join(components))
+    return xpaths
+
+# ==================================================================================================
+def parse_money(values: pd.Series) -> pd.Series:
+    """ Converts money strings to integer amounts with vectorized string ops.
+
+    Handles currency symbols, thousands separators and magnitude suffixes, e.g. "€50.00m",
+    "£ 1,250,000", "$1.2bn" and "€500k". Values that don't contain an amount (e.g. "-",
+    "free transfer", None) become <NA>. Numeric input is just rounded.
+
+    Parameters
+    ----------
+    values : Series
+        Money strings or numbers
+
+    Returns
+    -------
+    : Series
+        Amounts as a nullable Int64 series with the same index as `values`
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.round().astype('Int64')
+    parts = values.astype('string').str.extract(
+        r'(?P<number>\d[\d,]*(?:\.\d+)?)\s*(?P<suffix>bn|m|k|th\.)?', flags=re.IGNORECASE
+    )
+    number = pd.to_numeric(parts['number'].str.replace(',', '', regex=False), errors='coerce')
+    multiplier = parts['suffix'].str.lower().map(money_multipliers).astype(float).fillna(1)
+    return (number * multiplier).round().astype('Int64')
+
+# ==================================================================================================
+def money_currency(values: pd.Series) -> Union[str, None]:
+    """ Finds the currency of a column of money strings from the most common currency symbol.
+
+    Parameters
+    ----------
+    values : Series
+        Money strings
+
+    Returns
+    -------
+    : str or None
+        Currency code, e.g. "EUR". None if there aren't any currency symbols.
+    """
+    symbols = values.astype('string').str.extract(
+        f'([{"".join(currency_codes.keys())}])', expand=False
+    ).dropna()
+    if symbols.shape[0] == 0:
+        return None
+    return currency_codes[symbols.mode().iloc[0]]
+
+# ==================================================================================================
+def type_money_columns(
+        df: pd.DataFrame, columns: Sequence[str], currency: Union[str, None]=None
+) -> pd.DataFrame:
+    """ Converts the money columns of a DataFrame to Int64 amounts.
+
+    The currency of each converted column is recorded in `df.attrs['units']` as
+    {column: currency code, ...}, because it's no longer part of the values.
+
+    Parameters
+    ----------
+    df : DataFrame
+        DataFrame with money string columns
+    columns : list of str
+        Columns to convert. Columns that aren't in `df` are skipped.
+    currency : str or None, optional
+        Currency code of the columns, e.g. "GBP". If None, it's detected from the currency symbols
+        in each column.
+
+    Returns
+    -------
+    : DataFrame
+        Copy of `df` with the money columns converted
+    """
+    df = df.copy()
+    units = dict(df.attrs.get('units', dict()))
+    for column in [c for c in columns if c in df.columns]:
+        units[column] = currency if currency is not None else money_currency(df[column])
+        df[column] = parse_money(df[column])
+    df.attrs['units'] = units
+    return df
@@ -0,0 +1,582 @@
+from datetime import datetime, timezone
+from fnmatch import fnmatch
+import json
+import os
+import pandas as pd
+import re
+import sqlite3
+import uuid
+from urllib.parse import quote
+from typing import Any, Sequence, Union
+
+# Separator of the levels of flattened MultiIndex column names, e.g. "Performance / Gls"
+LEVEL_SEPARATOR = ' / '
+# Schema metadata key of the {flat column name: [MultiIndex levels]} mapping
+COLUMNS_METADATA_KEY = b'scraperfc.columns'
+# Columns that the sinks add to the rows, from the league and season they're written with
+PARTITION_COLUMNS = ['league', 'season']
+
+
+# ==================================================================================================
+def flatten_columns(df: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
+    """ Flattens MultiIndex columns, e.g. the FBref stats tables' columns, to strings.
+
+    Levels are joined with " / ", skipping the "Unnamed: ..." placeholders that pd.read_html()
+    names blank header cells with, so ("Unnamed: 1_level_0", "Player") becomes "Player" and
+    ("Performance", "Gls") becomes "Performance / Gls".
+
+    Parameters
+    ----------
+    df : DataFrame
+
+    Returns
+    -------
+    : tuple
+        (DataFrame with string column names, {flat column name: [levels], ...}). The mapping is
+        empty if the columns weren't a MultiIndex.
+    """
+    if not isinstance(df.columns, pd.MultiIndex):
+        return df.rename(columns=str), dict()
+
+    flat_names = list()
+    for column in df.columns:
+        levels = [str(x) for x in column if str(x) != '' and not str(x).startswith('Unnamed: ')]
+        flat_names.append(LEVEL_SEPARATOR.join(levels))
+    # Fall back to all of the levels for names that would collide
+    for i, column in enumerate(df.columns):
+        if flat_names[i] == '' or flat_names.count(flat_names[i]) > 1:
+            flat_names[i] = LEVEL_SEPARATOR.join([str(x) for x in column])
+
+    mapping = dict([(name, [str(x) for x in column])
+                    for name, column in zip(flat_names, df.columns)])
+    df = df.copy()
+    df.columns = flat_names
+    return df, mapping
+
+
+# ==================================================================================================
+def restore_columns(df: pd.DataFrame, mapping: dict) -> pd.DataFrame:
+    """ Restores the MultiIndex columns flattened by flatten_columns(). Columns that aren't in the
+    mapping, e.g. partition columns, get empty lower levels.
+    """
+    if len(mapping) == 0:
+        return df
+    n_levels = max([len(levels) for levels in mapping.values()])
+    df = df.copy()
+    df.columns = pd.MultiIndex.from_tuples([
+        tuple(mapping[c]) if c in mapping else (c,) + ('',) * (n_levels - 1) for c in df.columns
+    ])
+    return df
+
+
+# ==================================================================================================
+def rename_partition_columns(
+        df: pd.DataFrame, mapping: dict, source: str
+) -> tuple[pd.DataFrame, dict]:
+    """ Prefixes the flattened columns that clash with the partition columns with the source, e.g.
+    the "season" column of the Understat shots ("2023") becomes "understat_season", so that it's
+    kept next to the season the rows are written with ("2023/2024").
+
+    Parameters
+    ----------
+    df : DataFrame
+        DataFrame with flat column names, see flatten_columns()
+    mapping : dict
+        Its {flat column name: [levels]} mapping. Renamed columns are removed from it, so they're
+        restored as top level columns.
+    source : str
+
+    Returns
+    -------
+    : tuple
+        (DataFrame, mapping)
+    """
+    clashing = [c for c in df.columns if c in PARTITION_COLUMNS]
+    if len(clashing) == 0:
+        return df, mapping
+    df = df.rename(columns=dict([(c, f'{source}_{c}') for c in clashing]))
+    return df, dict([(k, v) for k, v in mapping.items() if k not in clashing])
+
+
+# ==================================================================================================
+def split_nested(df: pd.DataFrame, table: str, keys: Sequence[str]) -> dict:
+    """ Splits columns that hold DataFrames in their cells, e.g. the transfer histories of
+    Transfermarkt.scrape_players(), into tables of their own so that they can be written to a sink.
+
+    Parameters
+    ----------
+    df : DataFrame
+    table : str
+        Name of the table of `df`. Nested tables are named "<table>_<column>", e.g.
+        "players_transfer_history".
+    keys : list of str
+        Columns of `df` that are copied to the rows of the nested tables, to join them back.
+
+    Returns
+    -------
+    : dict
+        {table name: DataFrame, ...}, `df` without the nested columns and one table per nested
+        column.
+    """
+    nested = [
+        column for column, dtype in df.dtypes.items() if pd.api.types.is_object_dtype(dtype)
+        and df[column].map(lambda x: isinstance(x, pd.DataFrame)).any()
+    ]
+    tables = {table: df.drop(columns=nested)}
+    for column in nested:
+        dfs = [
+            value.assign(**dict([(key, row[key]) for key in keys]))
+            for value, (_, row) in zip(df[column], df.iterrows())
+            if isinstance(value, pd.DataFrame) and value.shape[0] > 0
+        ]
+        name = f'{table}_{re.sub(r"[^0-9a-z]+", "_", str(column).lower()).strip("_")}'
+        tables[name] = pd.DataFrame() if len(dfs) == 0 else \
+            pd.concat(dfs, axis=0, ignore_index=True)
+    return tables
+
+
+# ==================================================================================================
+class Sink():
+    """ Base class of the storage backends that scraper outputs can be written to.
+
+    Sinks are written to with write() as the data comes in, and must be closed (or used as a
+    context manager) to make sure everything is written.
+    """
+
+    # ==============================================================================================
+    def write(
+            self, df: pd.DataFrame, table: str, source: str, league: str, season: str
+    ) -> None:
+        """ Writes a DataFrame to a table.
+
+        Parameters
+        ----------
+        df : DataFrame
+            Data to write
+        table : str
+            Table name, e.g. "player_stats"
+        source : str
+            Data source, e.g. "fbref"
+        league : str
+            League, e.g. "EPL"
+        season : str
+            Season, e.g. "2023-2024"
+        """
+        raise NotImplementedError
+
+    # ==============================================================================================
+    def write_tables(self, tables: dict, source: str, league: str, season: str) -> None:
+        """ Writes {table name: DataFrame, ...}, e.g. the output of FBref.scrape_match(tidy=True).
+        """
+        for table, df in tables.items():
+            if df is not None:
+                self.write(df, table, source, league, season)
+
+    # ==============================================================================================
+    def flush(self) -> None:
+        """ Writes any buffered data.
+        """
+        pass
+
+    # ==============================================================================================
+    def close(self) -> None:
+        """ Flushes the sink and releases its resources.
+        """
+        self.flush()
+
+    # ==============================================================================================
+    def __enter__(self) -> 'Sink':
+        return self
+
+    # ==============================================================================================
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+# ==================================================================================================
+class ParquetSink(Sink):
+    """ Writes scraper outputs to Parquet datasets, one per source and table, partitioned by league
+    and season.
+
+    Layout: ``<root>/<source>/<table>/league=<league>/season=<season>/part-*.parquet``. The
+    partitions use Hive naming, so the datasets can be read with pyarrow.dataset, DuckDB, Spark,
+    etc., which memory-map the files and only read the columns and partitions that are needed.
+
+    Rows are buffered per partition and written as a new part file every `batch_rows` rows (and on
+    flush()/close()), so results can be written as they're scraped. Columns that clash with the
+    partition columns are renamed, see rename_partition_columns(). Requires pyarrow.
+
+    Parameters
+    ----------
+    root : str
+        Directory of the datasets
+    batch_rows : int, optional, default 100000
+        Number of buffered rows of a partition after which they're written.
+    compression : str, optional, default "zstd"
+        Parquet compression codec
+    """
+
+    # ==============================================================================================
+    def __init__(self, root: str, batch_rows: int=100_000, compression: str='zstd') -> None:
+        if not isinstance(root, str):
+            raise TypeError('`root` must be a string.')
+        if not isinstance(batch_rows, int) or batch_rows < 1:
+            raise TypeError('`batch_rows` must be an int greater than 0.')
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError('ParquetSink requires pyarrow, install it with '
+                              '`pip install ScraperFC[parquet]`.')
+        self.root = root
+        self.batch_rows = batch_rows
+        self.compression = compression
+        self._buffers: dict = dict()  # {(source, table, league, season): list of DataFrames}
+
+    # ==============================================================================================
+    def partition_path(self, source: str, table: str, league: str, season: str) -> str:
+        """ Returns the directory of a partition. Values are URI encoded like Hive partitions, e.g.
+        season "2023/2024" is stored as "season=2023%2F2024".
+        """
+        return os.path.join(self.root, source, table, f'league={quote(league, safe="")}',
+                            f'season={quote(season, safe="")}')
+
+    # ==============================================================================================
+    def write(
+            self, df: pd.DataFrame, table: str, source: str, league: str, season: str
+    ) -> None:
+        if not isinstance(df, pd.DataFrame):
+            raise TypeError('`df` must be a DataFrame.')
+        for name, value in [('table', table), ('source', source), ('league', league),
+                            ('season', season)]:
+            if not isinstance(value, str):
+                raise TypeError(f'`{name}` must be a string.')
+        if df.shape[0] == 0:
+            return
+
+        key = (source, table, league, season)
+        self._buffers.setdefault(key, list()).append(df)
+        if sum([x.shape[0] for x in self._buffers[key]]) >= self.batch_rows:
+            self._write_partition(key)
+
+    # ==============================================================================================
+    def flush(self) -> None:
+        for key in list(self._buffers):
+            self._write_partition(key)
+
+    # ==============================================================================================
+    def _write_partition(self, key: tuple) -> None:
+        """ Private, writes the buffered rows of a partition to a new part file.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        dfs = self._buffers.pop(key, list())
+        if len(dfs) == 0:
+            return
+        df, mapping = flatten_columns(pd.concat(dfs, axis=0, ignore_index=True))
+        df, mapping = rename_partition_columns(df, mapping, key[0])
+        arrow_table = pa.Table.from_pandas(_arrow_compatible(df), preserve_index=False)
+        if len(mapping) > 0:
+            arrow_table = arrow_table.replace_schema_metadata({
+                **(arrow_table.schema.metadata or dict()),
+                COLUMNS_METADATA_KEY: json.dumps(mapping).encode('utf-8')
+            })
+
+        path = self.partition_path(*key)
+        os.makedirs(path, exist_ok=True)
+        timestamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+        filename = f'part-{timestamp}-{uuid.uuid4().hex[:8]}.parquet'
+        pq.write_table(arrow_table, os.path.join(path, filename), compression=self.compression)
+
+    # ==============================================================================================
+    def read(
+            self, source: str, table: str, columns: Union[Sequence[str], None]=None,
+            filters: Any=None
+    ) -> pd.DataFrame:
+        """ Reads a table back into a DataFrame, with "league" and "season" columns.
+
+        Part files with different columns (e.g. from different seasons) are read with their
+        unified schema. MultiIndex columns are restored if all of the columns are read.
+
+        Parameters
+        ----------
+        source : str
+        table : str
+        columns : list of str, optional
+            Flat names of the columns to read, see flatten_columns(). Reads all columns if None.
+        filters : optional
+            pyarrow.dataset expression or DNF filters, e.g. [('season', '=', '2023-2024')]
+
+        Returns
+        -------
+        : DataFrame
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+
+        self.flush()
+        path = os.path.join(self.root, source, table)
+        partitioning = ds.partitioning(
+            pa.schema([('league', pa.string()), ('season', pa.string())]), flavor='hive'
+        )
+        files = ds.dataset(path, format='parquet', partitioning=partitioning).files
+        schemas = [pq.read_schema(f) for f in files]
+        mapping: dict = dict()
+        for schema in schemas:
+            metadata = schema.metadata or dict()
+            mapping.update(json.loads(metadata.get(COLUMNS_METADATA_KEY, '{}')))
+        schema = pa.unify_schemas(
+            [s.remove_metadata() for s in schemas]
+            + [pa.schema([('league', pa.string()), ('season', pa.string())])]
+        )
+        dataset = ds.dataset(path, format='parquet', partitioning=partitioning, schema=schema)
+        if filters is not None and not isinstance(filters, ds.Expression):
+            filters = pq.filters_to_expression(filters)
+        df = dataset.to_table(columns=columns, filter=filters).to_pandas()
+        return restore_columns(df, mapping) if columns is None else df
+
+
+# ==================================================================================================
+class SQLiteSink(Sink):
+    """ Writes scraper outputs to a local SQLite database, merging repeated scrapes instead of
+    duplicating rows.
+
+    Each (source, table) is stored in the SQL table "<source>_<table>" (e.g. "fbref_matches"), with
+    "league" and "season" columns. Rows are upserted on their natural key: the league, the season,
+    and the ID columns the scraper outputs already have, see `natural_keys`. Writing a row whose
+    key already exists updates it, so re-running a scrape is idempotent. Tables whose rows have no
+    ID of their own, e.g. the shots of a match, are listed in `replace_keys` instead: writing them
+    replaces all of the stored rows with the same key values, e.g. all of the shots of the match.
+
+    Columns that appear in later writes are added to the tables, and MultiIndex columns are
+    flattened and columns that clash with "league" and "season" are renamed like in ParquetSink.
+    The database can be queried with query() or any SQLite client.
+
+    Parameters
+    ----------
+    path : str
+        Path to the database file, created if it doesn't exist.
+    keys : dict, optional
+        {(source, table): [key columns], ...} for tables that aren't in `natural_keys`, or to
+        override it. MultiIndex columns are given by their flat names, see flatten_columns().
+        Tables must have a key to be written.
+    """
+
+    # Key columns of the tables written by the scrapers. Tables are matched with fnmatch.
+    natural_keys = {
+        ('fbref', 'matches'): ['match_id'],
+        ('fbref', 'player_*'): ['match_id', 'player_id'],
+        ('fbref', 'keeper_stats'): ['match_id', 'player_id'],
+        ('understat', 'shots'): ['id'],
+        ('understat', 'match_info'): ['id'],
+        ('understat', 'rosters'): ['id'],
+        ('sofascore', 'matches'): ['id'],
+        ('sofascore', 'player_league_stats'): ['player id', 'team id'],
+        ('transfermarkt', 'players'): ['Link'],
+    }
+    # Tables whose stored rows are replaced as a group, by these columns
+    replace_keys = {
+        ('fbref', 'shots'): ['match_id'],
+        ('transfermarkt', 'players_*'): ['Link'],
+    }
+
+    # ==============================================================================================
+    def __init__(self, path: str, keys: Union[dict, None]=None) -> None:
+        if not isinstance(path, str):
+            raise TypeError('`path` must be a string.')
+        if keys is not None and not isinstance(keys, dict):
+            raise TypeError('`keys` must be a dict.')
+        self.path = path
+        self.keys = dict() if keys is None else keys
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS _columns (sql_table TEXT, name TEXT, levels TEXT, '
+                'PRIMARY KEY (sql_table, name))'
+            )
+
+    # ==============================================================================================
+    def table_key(self, source: str, table: str) -> tuple[list, bool]:
+        """ Returns (key columns, whether rows are replaced as a group) of a table.
+
+        Raises
+        ------
+        ValueError
+            If the table doesn't have a key.
+        """
+        if (source, table) in self.keys:
+            return list(self.keys[(source, table)]), False
+        for registry, replace in [(self.natural_keys, False), (self.replace_keys, True)]:
+            for (key_source, pattern), columns in registry.items():
+                if key_source == source and fnmatch(table, pattern):
+                    return list(columns), replace
+        raise ValueError(f'No key columns for table "{table}" of "{source}". Pass them with '
+                         f'SQLiteSink(keys={{("{source}", "{table}"): [...]}}).')
+
+    # ==============================================================================================
+    def write(
+            self, df: pd.DataFrame, table: str, source: str, league: str, season: str
+    ) -> None:
+        if not isinstance(df, pd.DataFrame):
+            raise TypeError('`df` must be a DataFrame.')
+        for name, value in [('table', table), ('source', source), ('league', league),
+                            ('season', season)]:
+            if not isinstance(value, str):
+                raise TypeError(f'`{name}` must be a string.')
+        if df.shape[0] == 0:
+            return
+
+        keys, replace = self.table_key(source, table)
+        df, mapping = flatten_columns(df)
+        df, mapping = rename_partition_columns(df, mapping, source)
+        missing = [key for key in keys if key not in df.columns]
+        if len(missing) > 0:
+            raise ValueError(f'Table "{table}" of "{source}" is missing its key columns {missing}.')
+        if df[keys].isna().any(axis=None):
+            raise ValueError(f'Key columns {keys} of table "{table}" of "{source}" have missing '
+                             'values.')
+        df = df.assign(league=league, season=season)
+        if not replace:
+            df = df.drop_duplicates(subset=keys + ['league', 'season'], keep='last')
+        sql_table = f'{source}_{table}'
+        columns = list(df.columns)
+
+        with self.connection:
+            self._ensure_table(sql_table, columns, keys + ['league', 'season'], replace)
+            if len(mapping) > 0:
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO _columns VALUES (?, ?, ?)',
+                    [(sql_table, name, json.dumps(levels)) for name, levels in mapping.items()]
+                )
+            if replace:
+                groups = df[keys + ['league', 'season']].drop_duplicates()
+                self.connection.executemany(
+                    f'DELETE FROM {_quote(sql_table)} WHERE '
+                    + ' AND '.join([f'{_quote(c)} = ?' for c in groups.columns]),
+                    _sql_rows(groups)
+                )
+                statement = f'INSERT INTO {_quote(sql_table)} ({_quote_all(columns)}) ' \
+                    f'VALUES ({", ".join(["?"] * len(columns))})'
+            else:
+                updates = [c for c in columns if c not in keys + ['league', 'season']]
+                statement = f'INSERT INTO {_quote(sql_table)} ({_quote_all(columns)}) ' \
+                    f'VALUES ({", ".join(["?"] * len(columns))}) ' \
+                    f'ON CONFLICT ({_quote_all(keys + ["league", "season"])}) DO ' \
+                    + ('NOTHING' if len(updates) == 0 else 'UPDATE SET ' + ', '.join(
+                        [f'{_quote(c)} = excluded.{_quote(c)}' for c in updates]
+                    ))
+            self.connection.executemany(statement, _sql_rows(df))
+
+    # ==============================================================================================
+    def _ensure_table(self, sql_table: str, columns: list, keys: list, replace: bool) -> None:
+        """ Private, creates the table and its key index, or adds the columns it doesn't have yet.
+        """
+        existing = [
+            row[1] for row in self.connection.execute(f'PRAGMA table_info({_quote(sql_table)})')
+        ]
+        if len(existing) == 0:
+            self.connection.execute(f'CREATE TABLE {_quote(sql_table)} ({_quote_all(columns)})')
+            unique = '' if replace else 'UNIQUE '
+            self.connection.execute(
+                f'CREATE {unique}INDEX {_quote(sql_table + "_key")} '
+                f'ON {_quote(sql_table)} ({_quote_all(keys)})'
+            )
+        for column in [c for c in columns if c not in existing and len(existing) > 0]:
+            self.connection.execute(
+                f'ALTER TABLE {_quote(sql_table)} ADD COLUMN {_quote(column)}'
+            )
+
+    # ==============================================================================================
+    def query(self, sql: str, params: Sequence=()) -> pd.DataFrame:
+        """ Runs a SQL query, e.g. ``sink.query('SELECT * FROM fbref_matches WHERE season = ?',
+        ['2023-2024'])``.
+        """
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    # ==============================================================================================
+    def read(self, source: str, table: str) -> pd.DataFrame:
+        """ Reads a table back into a DataFrame, restoring MultiIndex columns.
+        """
+        sql_table = f'{source}_{table}'
+        df = self.query(f'SELECT * FROM {_quote(sql_table)}')
+        mapping = dict([
+            (name, json.loads(levels)) for name, levels in self.connection.execute(
+                'SELECT name, levels FROM _columns WHERE sql_table = ?', (sql_table,)
+            )
+        ])
+        return restore_columns(df, mapping)
+
+    # ==============================================================================================
+    def close(self) -> None:
+        self.connection.close()
+
+
+# ==================================================================================================
+def _object_columns(df: pd.DataFrame) -> list:
+    """ Private, returns the columns of `df` with the object dtype. Raises TypeError if any of them
+    hold DataFrames.
+    """
+    columns = [c for c, dtype in df.dtypes.items() if pd.api.types.is_object_dtype(dtype)]
+    for column in columns:
+        if df[column].map(lambda x: isinstance(x, (pd.DataFrame, pd.Series))).any():
+            raise TypeError(f'Column "{column}" holds DataFrames, which can\'t be stored. Use the '
+                            'tidy output of the scraper instead, e.g. scrape_match(tidy=True), or '
+                            'split_nested().')
+    return columns
+
+
+# ==================================================================================================
+def _is_missing(value: Any) -> bool:
+    """ Private, pd.isna() for single values, including lists and dicts.
+    """
+    return value is None or (isinstance(value, float) and value != value)
+
+
+# ==================================================================================================
+def _arrow_compatible(df: pd.DataFrame) -> pd.DataFrame:
+    """ Private, converts object columns with mixed types (e.g. numbers and strings in the same
+    FBref column) to strings so that they can be stored.
+    """
+    import pyarrow as pa
+
+    df = df.copy()
+    for column in _object_columns(df):
+        try:
+            pa.array(df[column], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df[column] = df[column].map(lambda x: None if _is_missing(x) else str(x))
+    return df
+
+
+# ==================================================================================================
+def _quote(identifier: str) -> str:
+    """ Private, quotes a SQL identifier, e.g. a column name with spaces.
+    """
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+# ==================================================================================================
+def _quote_all(identifiers: Sequence[str]) -> str:
+    return ', '.join([_quote(x) for x in identifiers])
+
+
+# ==================================================================================================
+def _sql_rows(df: pd.DataFrame) -> list:
+    """ Private, converts the rows of `df` to tuples of values that SQLite can store. Lists and
+    dicts are stored as JSON, timestamps as ISO strings, and numpy scalars as Python numbers.
+    """
+    object_columns = _object_columns(df)
+    df = df.astype(object).where(df.notna(), None)
+    for column in object_columns:
+        df[column] = df[column].map(
+            lambda x: json.dumps(x) if isinstance(x, (list, dict)) else x
+        )
+    return [
+        tuple([
+            x.isoformat() if isinstance(x, (pd.Timestamp, datetime))
+            else x.item() if hasattr(x, 'item') else x
+            for x in row
+        ])
+        for row in df.itertuples(index=False, name=None)
+    ]
@@ -1,8 +1,11 @@
 import pandas as pd
 from .scraperfc_exceptions import InvalidLeagueException, InvalidYearException
+from .fetching import ProxyPool, notify, send, with_retries
+from .tracing import trace_methods, traced
 from botasaurus.request import request, Request
 from botasaurus_requests import response
 import numpy as np
+import time
 from typing import Union, Sequence
 
 """ These are the status codes for Sofascore events. Found in event['status'] key.
@@ -47,10 +50,28 @@ def _botasaurus_get(request: Request, url: str) -> response.Response:
     return response
 
 
+@traced('build')
+def _player_stats_df(results: list) -> pd.DataFrame:
+    """ Private, converts the player dicts of the league statistics API to the DataFrame of
+    Sofascore.scrape_player_league_stats(). The DataFrame is empty if there aren't any player stats.
+    """
+    if len(results) == 0:
+        return pd.DataFrame()
+    df = pd.DataFrame.from_dict(results)  # type: ignore
+    df['player id'] = df['player'].apply(pd.Series)['id']
+    df['player'] = df['player'].apply(pd.Series)['name']
+    df['team id'] = df['team'].apply(pd.Series)['id']
+    df['team'] = df['team'].apply(pd.Series)['name']
+    return df
+
+
+@trace_methods
 class Sofascore:
     
     # ==============================================================================================
-    def __init__(self) -> None:
+    def __init__(self, proxy_pool: Union[ProxyPool, None]=None) -> None:
+        # Sends requests through proxies
+        self.proxy_pool = proxy_pool
         self.league_stats_fields = [
             'goals', 'yellowCards', 'redCards', 'groundDuelsWon', 'groundDuelsWonPercentage',
             'aerialDuelsWon', 'aerialDuelsWonPercentage', 'successfulDribbles',
@@ -68,6 +89,32 @@ class Sofascore:
         ]
         self.concatenated_fields = '%2C'.join(self.league_stats_fields)
 
+    # ==============================================================================================
+    def _get(self, url: str) -> response.Response:
+        """ Private, calls _get_once(), retrying 429 and 5xx responses with backoff (see
+        fetching.RetryPolicy).
+        """
+        return with_retries(url, lambda: self._get_once(url))
+
+    # ==============================================================================================
+    def _get_once(self, url: str) -> response.Response:
+        """ Private, calls _botasaurus_get(), through the proxy pool if there is one. Failed
+        requests are retried with the next proxy, up to the pool's `max_attempts` times. Requests
+        go through fetching.send(), so they can be recorded and replayed.
+        """
+        if self.proxy_pool is None:
+            return send(url, _botasaurus_get)
+        for _ in range(self.proxy_pool.max_attempts):
+            proxy = self.proxy_pool.get()
+            start = time.monotonic()
+            r = send(url, lambda u: _botasaurus_get(u, proxy=f'http://{proxy}'))
+            if r is not None and r.status_code < 500:
+                self.proxy_pool.report_success(proxy, time.monotonic() - start)
+                break
+            self.proxy_pool.report_failure(proxy)
+            notify('retry', url)
+        return r
+
     # ==============================================================================================
     def get_valid_seasons(self, league: str) -> dict:
         """ Returns the valid seasons and their IDs for the given league
@@ -87,7 +134,7 @@ class Sofascore:
         if league not in comps.keys():
             raise InvalidLeagueException(league, 'Sofascore', list(comps.keys()))
             
-        response = _botasaurus_get(f'{API_PREFIX}/unique-tournament/{comps[league]}/seasons/')
+        response = self._get(f'{API_PREFIX}/unique-tournament/{comps[league]}/seasons/')
         seasons = dict([(x['year'], x['id']) for x in response.json()['seasons']])
         return seasons
 
@@ -116,7 +163,7 @@ class Sofascore:
         matches = list()
         i = 0
         while 1:
-            response = _botasaurus_get(
+            response = self._get(
                 f'{API_PREFIX}/unique-tournament/{comps[league]}/season/{valid_seasons[year]}/' +
                 f'events/last/{i}'
             )
@@ -183,7 +230,7 @@ class Sofascore:
         if not isinstance(match, int) and not isinstance(match, str):
             raise TypeError('`match` must a string or int')
         match_id = match if isinstance(match, int) else self.get_match_id_from_url(match)
-        response = _botasaurus_get(f'{API_PREFIX}/event/{match_id}')
+        response = self._get(f'{API_PREFIX}/event/{match_id}')
         data = response.json()['event']
         return data
 
@@ -249,7 +296,7 @@ class Sofascore:
             raise TypeError('`match` must a string or int')
 
         match_id = match if isinstance(match, int) else self.get_match_id_from_url(match)
-        response = _botasaurus_get(f'{API_PREFIX}/event/{match_id}/lineups')
+        response = self._get(f'{API_PREFIX}/event/{match_id}/lineups')
         teams = ['home', 'away']
         if response.status_code == 200:
             player_ids = dict()
@@ -312,25 +359,14 @@ class Sofascore:
                 f'&accumulation={accumulation}' +\
                 f'&fields={self.concatenated_fields}' +\
                 f'&filters=position.in.{positions}'
-            response = _botasaurus_get(request_url)
+            response = self._get(request_url)
             results += response.json()['results']
             if (response.json()['page'] == response.json()['pages']) or\
                     (response.json()['pages'] == 0):
                 break
             offset += 100
 
-        # Convert the player dicts to a dataframe. Dataframe will be empty if there aren't any
-        # player stats
-        if len(results) == 0:
-            df = pd.DataFrame()
-        else:
-            df = pd.DataFrame.from_dict(results)  # type: ignore
-            df['player id'] = df['player'].apply(pd.Series)['id']
-            df['player'] = df['player'].apply(pd.Series)['name']
-            df['team id'] = df['team'].apply(pd.Series)['id']
-            df['team'] = df['team'].apply(pd.Series)['name']
-        
-        return df
+        return _player_stats_df(results)
 
     # ==============================================================================================
     def scrape_match_momentum(self, match: Union[str, int]) -> pd.DataFrame:
@@ -351,7 +387,7 @@ class Sofascore:
             raise TypeError('`match` must a string or int')
 
         match_id = match if isinstance(match, int) else self.get_match_id_from_url(match)
-        response = _botasaurus_get(f'{API_PREFIX}/event/{match_id}/graph')
+        response = self._get(f'{API_PREFIX}/event/{match_id}/graph')
         match_momentum_df = pd.DataFrame(response.json()['graphPoints']) if \
             response.status_code == 200 else pd.DataFrame()
 
@@ -374,7 +410,7 @@ class Sofascore:
             raise TypeError('`match` must a string or int')
 
         match_id = match if isinstance(match, int) else self.get_match_id_from_url(match)
-        response = _botasaurus_get(f'{API_PREFIX}/event/{match_id}/statistics')
+        response = self._get(f'{API_PREFIX}/event/{match_id}/statistics')
         if response.status_code == 200:
             df = pd.DataFrame()
             for period in response.json()['statistics']:
@@ -406,7 +442,7 @@ class Sofascore:
             raise TypeError('`match` must a string or int')
 
         match_id = match if isinstance(match, int) else self.get_match_id_from_url(match)
-        response = _botasaurus_get(f'{API_PREFIX}/event/{match_id}/lineups')
+        response = self._get(f'{API_PREFIX}/event/{match_id}/lineups')
         if response.status_code == 200:
             players = response.json()['home']['players'] + response.json()['away']['players']
             temp = pd.DataFrame(players)
@@ -443,7 +479,7 @@ class Sofascore:
 
         home_name, away_name = self.get_team_names(match)
         match_id = match if isinstance(match, int) else self.get_match_id_from_url(match)
-        response = _botasaurus_get(f'{API_PREFIX}/event/{match_id}/average-positions')
+        response = self._get(f'{API_PREFIX}/event/{match_id}/average-positions')
         if response.status_code == 200:
             df = pd.DataFrame()
             for key, name in [('home', home_name), ('away', away_name)]:
@@ -482,7 +518,7 @@ class Sofascore:
         players = self.get_player_ids(match)
         for player in players:
             player_id = players[player]
-            response = _botasaurus_get(f'{API_PREFIX}/event/{match_id}/player/{player_id}/heatmap')
+            response = self._get(f'{API_PREFIX}/event/{match_id}/player/{player_id}/heatmap')
             heatmap = [(z['x'], z['y']) for z in response.json()['heatmap']]\
                 if response.status_code == 200 else []
             players[player] = {'id': player_id, 'heatmap': heatmap}
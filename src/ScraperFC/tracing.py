@@ -0,0 +1,257 @@
+from . import fetching
+import cProfile
+from contextlib import contextmanager
+import functools
+import json
+import os
+import pandas as pd
+import threading
+import time
+from typing import Any, Callable, Iterator, TypeVar, Union
+
+# Directory to write a cProfile dump of every public scraper method call to
+PROFILE_ENV = 'SCRAPERFC_PROFILE'
+
+# Active Tracer, see trace()
+_tracer: Any = None
+# Only one call is profiled at a time, cProfile can't profile overlapping calls
+_profile_lock = threading.Lock()
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+
+# ==================================================================================================
+class Tracer():
+    """ Records nested timing spans of the scrapers while it's installed with trace().
+
+    Every public scraper method call is a "method" span. Inside it, HTTP requests are "fetch"
+    spans, rate limit sleeps are "sleep" spans, HTML and JSON parsing are "parse" spans, and
+    building DataFrames from the parsed pages are "build" spans. The time of a method span that
+    isn't in any of its child spans is its post-processing.
+
+    Export the spans with tree() (nested dicts), save() (Chrome trace format, which can be opened in
+    https://ui.perfetto.dev or chrome://tracing), or summary().
+    """
+
+    # ==============================================================================================
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+        self.spans: list = list()  # dicts of name, category, start, seconds, parent, thread, args
+
+    # ==============================================================================================
+    def _stack(self) -> list:
+        """ Private, IDs of the open spans of the current thread, innermost last.
+        """
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = list()
+        return self._local.stack
+
+    # ==============================================================================================
+    def _add(self, name: str, category: str, start: float, args: dict) -> int:
+        """ Private, adds a span that starts at perf_counter() time `start`, returns its ID.
+        """
+        stack = self._stack()
+        with self._lock:
+            self.spans.append({
+                'name': name, 'category': category, 'start': start - self._origin,
+                'seconds': None, 'parent': stack[-1] if len(stack) > 0 else None,
+                'thread': threading.get_ident(), 'args': args,
+            })
+            return len(self.spans) - 1
+
+    # ==============================================================================================
+    @contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Iterator[None]:
+        """ Records the `with` block as a span.
+        """
+        start = time.perf_counter()
+        span_id = self._add(name, category, start, args)
+        stack = self._stack()
+        stack.append(span_id)
+        try:
+            yield
+        finally:
+            stack.pop()
+            self.spans[span_id]['seconds'] = time.perf_counter() - start
+
+    # ==============================================================================================
+    def __call__(self, event: str, url: str, values: dict) -> None:
+        """ Records the requests and sleeps reported to the fetching hooks as spans that ended now.
+        """
+        if event not in ['request', 'sleep']:
+            return
+        if event == 'request':
+            name, category = f'GET {url}', 'fetch'
+            args = {'status_code': values['status_code'], 'bytes': values['n_bytes']}
+        else:
+            name, category, args = f'sleep {url}', 'sleep', dict()
+        end = time.perf_counter()
+        span_id = self._add(name, category, end - values['seconds'], args)
+        self.spans[span_id]['seconds'] = values['seconds']
+
+    # ==============================================================================================
+    def tree(self) -> list:
+        """ Returns the spans as nested dicts, {"name", "category", "start", "seconds", "args",
+        "children"}, with times in seconds since the tracer was created.
+        """
+        nodes = [
+            dict([(k, v) for k, v in span.items() if k not in ['parent', 'thread']], children=[])
+            for span in self.spans
+        ]
+        roots = list()
+        for span, node in zip(self.spans, nodes):
+            if span['parent'] is None:
+                roots.append(node)
+            else:
+                nodes[span['parent']]['children'].append(node)
+        return roots
+
+    # ==============================================================================================
+    def chrome_trace(self) -> dict:
+        """ Returns the spans in the Chrome trace event format.
+        """
+        return {'traceEvents': [
+            {'name': span['name'], 'cat': span['category'], 'ph': 'X', 'pid': os.getpid(),
+             'tid': span['thread'], 'ts': span['start'] * 1e6,
+             'dur': (span['seconds'] or 0) * 1e6, 'args': span['args']}
+            for span in self.spans
+        ]}
+
+    # ==============================================================================================
+    def save(self, path: str) -> None:
+        """ Writes the spans to a JSON file, in the Chrome trace event format.
+        """
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f, default=str)
+
+    # ==============================================================================================
+    def summary(self) -> pd.DataFrame:
+        """ Returns the number of spans, the total seconds, and the seconds not spent in child spans
+        ("self seconds") of each category. The self seconds of the "method" category are the time
+        spent post-processing.
+        """
+        self_seconds = [span['seconds'] or 0 for span in self.spans]
+        for span in self.spans:
+            if span['parent'] is not None:
+                self_seconds[span['parent']] -= span['seconds'] or 0
+        df = pd.DataFrame({
+            'category': [span['category'] for span in self.spans],
+            'seconds': [span['seconds'] or 0 for span in self.spans],
+            'self seconds': self_seconds,
+        })
+        return df.groupby('category').agg(
+            spans=('seconds', 'size'), seconds=('seconds', 'sum'),
+            self_seconds=('self seconds', 'sum'),
+        ).rename(columns={'self_seconds': 'self seconds'}).sort_values('self seconds',
+                                                                       ascending=False)
+
+
+# ==================================================================================================
+@contextmanager
+def trace(tracer: Union[Tracer, None]=None) -> Iterator[Tracer]:
+    """ Records the spans of all scrapers inside the `with` block, see Tracer.
+
+    Parameters
+    ----------
+    tracer : Tracer, optional
+        Tracer to add to. Defaults to a new Tracer.
+
+    Examples
+    --------
+    >>> with trace() as tracer:
+    ...     FBref().scrape_stats('2023-2024', 'EPL', 'standard')
+    >>> tracer.summary()
+    >>> tracer.save('scrape_stats.json')
+    """
+    global _tracer
+    tracer = Tracer() if tracer is None else tracer
+    previous, _tracer = _tracer, tracer
+    fetching.add_hook(tracer)
+    try:
+        yield tracer
+    finally:
+        fetching.remove_hook(tracer)
+        _tracer = previous
+
+
+# ==================================================================================================
+@contextmanager
+def span(name: str, category: str, **args: Any) -> Iterator[None]:
+    """ Records the `with` block as a span of the active tracer, if there is one.
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield
+    else:
+        with tracer.span(name, category, **args):
+            yield
+
+
+# ==================================================================================================
+def traced(category: str) -> Callable[[F], F]:
+    """ Decorator that records every call of a function as a span of the given category.
+    """
+    def decorator(function: F) -> F:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            tracer = _tracer
+            if tracer is None:
+                return function(*args, **kwargs)
+            with tracer.span(function.__qualname__, category):
+                return function(*args, **kwargs)
+        return wrapper  # type: ignore
+    return decorator
+
+
+# ==================================================================================================
+def _profiled(name: str, function: Callable, *args: Any, **kwargs: Any) -> Any:
+    """ Private, calls the function under cProfile and writes the stats to the directory in the
+    SCRAPERFC_PROFILE environment variable, unless another call is being profiled.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return function(*args, **kwargs)
+    try:
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(function, *args, **kwargs)
+        finally:
+            directory = os.environ[PROFILE_ENV]
+            os.makedirs(directory, exist_ok=True)
+            profile.dump_stats(os.path.join(
+                directory, f'{name}-{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}.prof'
+            ))
+    finally:
+        _profile_lock.release()
+
+
+# ==================================================================================================
+def trace_methods(cls: type) -> type:
+    """ Class decorator that records every call of the public methods of a scraper as a "method"
+    span, see trace().
+
+    If the SCRAPERFC_PROFILE environment variable is set to a directory, every outermost call is
+    also run under cProfile and its stats are written to
+    ``<directory>/<class>.<method>-<time>-<pid>.prof``, which can be read with pstats or snakeviz.
+    """
+    for attribute, method in list(vars(cls).items()):
+        if attribute.startswith('_') or not callable(method):
+            continue
+
+        def wrap(method: Callable) -> Callable:
+            name = f'{cls.__name__}.{method.__name__}'
+
+            @functools.wraps(method)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                tracer = _tracer
+                if tracer is None and PROFILE_ENV not in os.environ:
+                    return method(*args, **kwargs)
+                with span(name, 'method'):
+                    if PROFILE_ENV in os.environ:
+                        return _profiled(name, method, *args, **kwargs)
+                    return method(*args, **kwargs)
+            return wrapper
+
+        setattr(cls, attribute, wrap(method))
+    return cls
@@ -1,13 +1,31 @@
 from .scraperfc_exceptions import InvalidLeagueException, InvalidYearException
+from .shared_functions import make_soup, type_money_columns
+from .fetching import ProxyPool, fetch
+from .pipeline import parse_pages
+from .sinks import Sink, split_nested
+from .tracing import trace_methods, traced
 from tqdm import tqdm
-import requests
-from bs4 import BeautifulSoup
+from bs4 import SoupStrainer
 import pandas as pd
 import cloudscraper
-from typing import Sequence
+import hashlib
+import json
+import os
+import re
+from typing import Sequence, Union
 
 TRANSFERMARKT_ROOT = 'https://www.transfermarkt.us'
 
+PLAYER_HEADERS = {
+    'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 ' +\
+        '(KHTML, like Gecko) Chrome/55.0.2883.87 Safari/537.36'
+}
+
+# Strainers that limit parsing to the part of the page that's used. Class strainers match the raw
+# attribute, so use a regex to also match tags with more than one class.
+items_table_strainer = SoupStrainer('table', {'class': re.compile(r'(^|\s)items(\s|$)')})
+season_select_strainer = SoupStrainer('select', {'name': 'saison_id'})
+
 comps = {
     'EPL': 'https://www.transfermarkt.us/premier-league/startseite/wettbewerb/GB1',
     'EFL Championship': 'https://www.transfermarkt.us/championship/startseite/wettbewerb/GB2',
@@ -33,8 +51,205 @@ comps = {
 }
 
 
+def _load_manifest(manifest_path: str) -> dict:
+    """ Loads an incremental refresh manifest. Returns an empty manifest if the file doesn't exist.
+    """
+    if not os.path.exists(manifest_path):
+        return dict()
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest: dict, manifest_path: str) -> None:
+    """ Writes an incremental refresh manifest. Writes to a temp file first so an interrupted run
+    can't leave a truncated manifest behind.
+    """
+    tmp_path = f'{manifest_path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def _record_hash(player: pd.DataFrame) -> str:
+    """ Hashes the contents of a 1-row player dataframe, including the nested dataframes.
+    """
+    parts = list()
+    for column, value in player.iloc[0].items():
+        value_str = value.to_csv() if isinstance(value, pd.DataFrame) else repr(value)
+        parts.append(f'{column}={value_str}')
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+@traced('build')
+def _type_players(players: pd.DataFrame) -> pd.DataFrame:
+    """ Converts the money columns of player dataframes, including the nested transfer histories,
+    to Int64 amounts. Currencies are recorded in the `attrs['units']` of each dataframe.
+    """
+    players = type_money_columns(players, ['Value'])
+    if 'Transfer history' in players.columns:
+        players['Transfer history'] = players['Transfer history'].map(
+            lambda x: type_money_columns(x, ['MV', 'Fee']) if isinstance(x, pd.DataFrame) else x
+        )
+    return players
+
+
+def _parse_player(player_link: str, content: bytes) -> pd.DataFrame:
+    """ Parses the HTML of a Transfermarkt player page into a 1-row dataframe. A module level
+    function, so that it can be run in pipeline.parse_pages() workers.
+    """
+    soup = make_soup(content)
+    
+    # Name
+    name_tag = soup.find('h1', {'class': 'data-header__headline-wrapper'})
+    name = name_tag.text.split('\n')[-1].strip()  # type: ignore
+    
+    # Value
+    try:
+        value_tag = soup.find('a', {'class': 'data-header__market-value-wrapper'})
+        value = value_tag.text.split(' ')[0]  # type: ignore
+        value_last_updated_tag = soup.find('a', {'class': 'data-header__market-value-wrapper'})
+        value_last_updated = value_last_updated_tag.text.split('Last update: ')[-1]  # type: ignore
+    except AttributeError:
+        value = None
+        value_last_updated = None
+        
+    # DOB and age
+    dob_el = soup.find('span', {'itemprop': 'birthDate'})
+    if dob_el is None:
+        dob, age = None, None
+    else:
+        dob = ' '.join(dob_el.text.strip().split(' ')[:3])
+        age = int(dob_el.text.strip().split(' ')[-1].replace('(', '').replace(')', ''))
+    
+    # Height
+    height_tag = soup.find('span', {'itemprop': 'height'})
+    if height_tag is None:
+        height = None
+    else:
+        height_str = height_tag.text.strip()
+        if height_str in ["N/A", "- m"]:
+            height = None
+        else:
+            height = float(height_str.replace(' m', '').replace(',', '.'))
+   
+    # Nationality and citizenships
+    nationality_el = soup.find('span', {'itemprop': 'nationality'})
+    nationality = nationality_el.getText().replace('\n', '').strip()  # type: ignore
+
+    citizenship_els = soup.find_all(
+        'span', {'class': 'info-table__content info-table__content--bold'}
+    )
+    flag_els = [
+        flag_el for el in citizenship_els
+        for flag_el in el.find_all('img', {'class': 'flaggenrahmen'})
+    ]
+    citizenship = list(set([el['title'] for el in flag_els]))
+    
+    # Position
+    position_el = soup.find('dd', {'class': 'detail-position__position'})
+    if position_el is None:
+        position_el = [
+            el for el in soup.find_all('li', {'class': 'data-header__label'})
+            if 'position' in el.text.lower()
+        ][0].find('span')
+    position = position_el.text.strip()
+    try:
+        other_positions = [
+            el.text for el in
+            soup.find('div', {'class': 'detail-position__position'}).find_all('dd')  # type: ignore
+        ]
+    except AttributeError:
+        other_positions = None
+    other_positions = None if other_positions is None else pd.DataFrame(other_positions)  # type: ignore
+
+    # Data header fields
+    team = soup.find('span', {'class': 'data-header__club'})
+    team = None if team is None else team.text.strip()  # type: ignore
+
+    data_headers_labels = soup.find_all('span', {'class': 'data-header__label'})
+    # Last club
+    last_club = [
+        x.text.split(':')[-1].strip() for x in data_headers_labels
+        if 'last club' in x.text.lower()
+    ]
+    assert len(last_club) < 2
+    last_club = None if len(last_club) == 0 else last_club[0]  # type: ignore
+    # "Since" date
+    since_date = [
+        x.text.split(':')[-1].strip() for x in data_headers_labels
+        if 'since' in x.text.lower()
+    ]
+    assert len(since_date) < 2
+    since_date = None if len(since_date) == 0 else since_date[0]  # type: ignore
+    # "Joined" date
+    joined_date = [
+        x.text.split(':')[-1].strip() for x in data_headers_labels if 'joined' in x.text.lower()
+    ]
+    assert len(joined_date) < 2
+    joined_date = None if len(joined_date) == 0 else joined_date[0]  # type: ignore
+    # Contract expiration date
+    contract_expiration = [
+        x.text.split(':')[-1].strip() for x in data_headers_labels
+        if 'contract expires' in x.text.lower()
+    ]
+    assert len(contract_expiration) < 2
+    contract_expiration = None if len(contract_expiration) == 0 else contract_expiration[0]  # type: ignore
+    
+    # Market value history
+    try:
+        script = [
+            s for s in soup.find_all('script', {'type': 'text/javascript'})
+            if 'var chart = new Highcharts.Chart' in str(s)
+        ][0]
+        values = [int(s.split(',')[0]) for s in str(script).split('y\':')[2:-2]]
+        dates = [
+            s.split('datum_mw\':')[-1].split(',\'x')[0].replace('\\x20', ' ').replace('\'', '')
+            for s in str(script).split('y\':')[2:-2]
+        ]
+        market_value_history = pd.DataFrame({'date': dates, 'value': values})
+    except IndexError:
+        market_value_history = None
+    
+    # Transfer History
+    rows = soup.find_all('div', {'class': 'grid tm-player-transfer-history-grid'})
+    transfer_history = pd.DataFrame(
+        data=[[s.strip() for s in row.getText().split('\n\n') if s != ''] for row in rows],
+        columns=['Season', 'Date', 'Left', 'Joined', 'MV', 'Fee', '']
+    ).drop(
+        columns=['']
+    )
+    
+    player = pd.Series(dtype=object)
+    player['Name'] = name
+    player['Value'] = value
+    player['Value last updated'] = value_last_updated
+    player['DOB'] = dob
+    player['Age'] = age
+    player['Height (m)'] = height
+    player['Nationality'] = nationality
+    player['Citizenship'] = citizenship
+    player['Position'] = position
+    player['Other positions'] = other_positions
+    player['Team'] = team
+    player['Last club'] = last_club
+    player['Since'] = since_date
+    player['Joined'] = joined_date
+    player['Contract expiration'] = contract_expiration
+    player['Market value history'] = market_value_history
+    player['Transfer history'] = transfer_history
+
+    return player.to_frame().T
+
+
+@trace_methods
 class Transfermarkt():
 
+    # ==============================================================================================
+    def __init__(self, proxy_pool: Union[ProxyPool, None]=None) -> None:
+        """ proxy_pool sends all of the requests through a ProxyPool.
+        """
+        self.proxy_pool = proxy_pool
+
     # ==============================================================================================
     def get_valid_seasons(self, league: str) -> dict:
         """ Return valid seasons for the chosen league
@@ -55,7 +270,10 @@ class Transfermarkt():
             raise InvalidLeagueException(league, 'Transfermarkt', list(comps.keys()))
         
         scraper = cloudscraper.CloudScraper()
-        soup = BeautifulSoup(scraper.get(comps[league]).content, 'html.parser')
+        soup = make_soup(
+            fetch(comps[league], self.proxy_pool, scraper).content,
+            season_select_strainer
+        )
         season_tags = soup.find('select', {'name': 'saison_id'}).find_all('option')  # type: ignore
         valid_seasons = dict([(x.text, x['value']) for x in season_tags])
         scraper.close()
@@ -85,9 +303,11 @@ class Transfermarkt():
             raise InvalidYearException(year, league, list(valid_seasons.keys()))
         
         scraper = cloudscraper.CloudScraper()
-        soup = BeautifulSoup(
-            scraper.get(f'{comps[league]}/plus/?saison_id={valid_seasons[year]}').content,
-            'html.parser'
+        soup = make_soup(
+            fetch(
+                f'{comps[league]}/plus/?saison_id={valid_seasons[year]}', self.proxy_pool, scraper
+            ).content,
+            items_table_strainer
         )
         club_els = soup.find('table', {'class': 'items'})\
             .find_all('td', {'class': 'hauptlink no-border-links'})  # type: ignore
@@ -116,7 +336,10 @@ class Transfermarkt():
         scraper = cloudscraper.CloudScraper()
         club_links = self.get_club_links(year, league)
         for club_link in tqdm(club_links, desc=f'{year} {league} player links'):
-            soup = BeautifulSoup(scraper.get(club_link).content, 'html.parser')
+            soup = make_soup(
+                fetch(club_link, self.proxy_pool, scraper).content,
+                items_table_strainer
+            )
             player_table = soup.find('table', {'class': 'items'})
             if player_table is not None:
                 player_els = player_table.find_all('td', {'class': 'hauptlink'})  # type: ignore
@@ -130,7 +353,10 @@ class Transfermarkt():
         return list(set(player_links))
     
     # ==============================================================================================
-    def scrape_players(self, year: str, league: str) -> pd.DataFrame:
+    def scrape_players(
+            self, year: str, league: str, typed: bool=False, sink: Union[Sink, None]=None,
+            n_workers: int=1
+    ) -> pd.DataFrame:
         """ Gathers all player info for the chosen league season.
         
         Parameters
@@ -139,6 +365,19 @@ class Transfermarkt():
             See the :ref:`transfermarkt_year` `year` parameter docs for details.
         league : str
             League to scrape.
+        typed : bool, optional, default False
+            If True, market values and transfer fees are converted from strings like "€50.00m" to
+            Int64 amounts (e.g. 50000000), and their currency is recorded in the `attrs['units']`
+            of the dataframe.
+        sink : Sink, optional
+            If given, each player is written to the sink as soon as they're scraped, e.g. a
+            ScraperFC.ParquetSink. Players are written to the table "players" with a "Link"
+            column, and their market value and transfer histories to the tables
+            "players_market_value_history" and "players_transfer_history".
+        n_workers : int, optional, default 1
+            Number of processes that parse the player pages while the next ones are fetched, see
+            pipeline.parse_pages(). Useful when the pages don't need to be paced, e.g. when they're
+            replayed from a cassette.
         
         Returns
         -------
@@ -146,174 +385,163 @@ class Transfermarkt():
             Each row is a player and contains some of the information from their Transfermarkt
             player profile.
         """
+        if not isinstance(typed, bool):
+            raise TypeError('`typed` must be a boolean.')
+
         player_links = self.get_player_links(year, league)
+        parsed = parse_pages(
+            ((link, fetch(link, self.proxy_pool, headers=PLAYER_HEADERS).content)
+             for link in player_links),
+            _parse_player, n_workers
+        )
         df = pd.DataFrame()
-        for player_link in tqdm(player_links, desc=f'{year} {league} players'):
-            player = self.scrape_player(player_link)
+        for player_link, player in tqdm(
+                zip(player_links, parsed), desc=f'{year} {league} players', total=len(player_links)
+        ):
+            if sink is not None:
+                written = _type_players(player.copy()) if typed else player
+                sink.write_tables(
+                    split_nested(written.assign(Link=player_link), 'players', ['Link']),
+                    'transfermarkt', league, year
+                )
             df = pd.concat([df, player], axis=0, ignore_index=True)
+
+        # Convert the whole column at once instead of player by player
+        if typed and df.shape[0] > 0:
+            df = _type_players(df)
         
         return df
 
     # ==============================================================================================
-    def scrape_player(self, player_link: str) -> pd.DataFrame:
+    def refresh_players(
+            self, year: str, league: str, manifest_path: str, typed: bool=False
+    ) -> pd.DataFrame:
+        """ Incrementally scrapes the players of the chosen league season.
+
+        Keeps a local manifest of {player link: value, last update, content hash, ...} so repeated
+        runs only return players whose data changed since the previous run. Player pages are
+        requested with conditional headers so Transfermarkt can skip sending pages that haven't
+        changed, pages whose content hash matches the manifest aren't re-parsed, and players whose
+        parsed data is identical to the last run aren't returned.
+
+        Parameters
+        ----------
+        year : str
+            See the :ref:`transfermarkt_year` `year` parameter docs for details.
+        league : str
+            League to scrape.
+        manifest_path : str
+            Path to the JSON manifest file. It's created if it doesn't exist and updated in place
+            after every run.
+        typed : bool, optional, default False
+            If True, market values and transfer fees are converted from strings like "€50.00m" to
+            Int64 amounts (e.g. 50000000), and their currency is recorded in the `attrs['units']`
+            of the dataframe.
+
+        Returns
+        -------
+        : DataFrame
+            Same columns as scrape_players(), but only contains the players that are new or whose
+            data changed since the last run. Will be empty if nothing changed.
+        """
+        if not isinstance(manifest_path, str):
+            raise TypeError('`manifest_path` must be a string.')
+        if not isinstance(typed, bool):
+            raise TypeError('`typed` must be a boolean.')
+
+        player_links = self.get_player_links(year, league)
+        manifest = _load_manifest(manifest_path)
+        df = pd.DataFrame()
+        try:
+            for player_link in tqdm(player_links, desc=f'{year} {league} players'):
+                player = self.refresh_player(player_link, manifest)
+                if player is not None:
+                    df = pd.concat([df, player], axis=0, ignore_index=True)
+        finally:
+            # Save progress even if the run is interrupted partway through
+            _save_manifest(manifest, manifest_path)
+
+        if typed and df.shape[0] > 0:
+            df = _type_players(df)
+
+        return df
+
+    # ==============================================================================================
+    def refresh_player(self, player_link: str, manifest: dict) -> Union[pd.DataFrame, None]:
+        """ Scrapes a single player only if their data changed since the manifest entry was made.
+
+        Parameters
+        ----------
+        player_link : str
+            Valid player Transfermarkt URL
+        manifest : dict
+            Refresh manifest, see refresh_players(). The player's entry is added or updated in
+            place.
+
+        Returns
+        -------
+        : DataFrame or None
+            1-row dataframe with all of the player details (same as scrape_player()), or None if
+            the player's data hasn't changed.
+        """
+        if not isinstance(player_link, str):
+            raise TypeError('`player_link` must be a string.')
+        if not isinstance(manifest, dict):
+            raise TypeError('`manifest` must be a dict.')
+
+        entry = manifest.get(player_link, dict())
+
+        # Ask Transfermarkt to skip the page body if it hasn't changed
+        headers = dict(PLAYER_HEADERS)
+        if entry.get('etag'):
+            headers['if-none-match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['if-modified-since'] = entry['last_modified']
+        r = fetch(player_link, self.proxy_pool, headers=headers)
+        if r.status_code == 304:
+            return None
+
+        # Identical page, no need to parse it again
+        content_hash = hashlib.sha256(r.content).hexdigest()
+        if content_hash == entry.get('content_hash'):
+            return None
+
+        player = _parse_player(player_link, r.content)
+        record_hash = _record_hash(player)
+        changed = record_hash != entry.get('record_hash')
+
+        manifest[player_link] = {
+            'value': player.loc[0, 'Value'],
+            'value_last_updated': player.loc[0, 'Value last updated'],
+            'content_hash': content_hash,
+            'record_hash': record_hash,
+            'etag': r.headers.get('etag'),
+            'last_modified': r.headers.get('last-modified'),
+        }
+
+        return player if changed else None
+
+    # ==============================================================================================
+    def scrape_player(self, player_link: str, typed: bool=False) -> pd.DataFrame:
         """ Scrape a single player Transfermarkt link
 
         Parameters
         ----------
         player_link : str
             Valid player Transfermarkt URL
+        typed : bool, optional, default False
+            If True, market values and transfer fees are converted from strings like "€50.00m" to
+            Int64 amounts (e.g. 50000000), and their currency is recorded in the `attrs['units']`
+            of the dataframe.
 
         Returns
         -------
         : DataFrame
             1-row dataframe with all of the player details
         """
-        r = requests.get(
-            player_link,
-            headers={
-                'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 ' +\
-                    '(KHTML, like Gecko) Chrome/55.0.2883.87 Safari/537.36'
-            }
-        )
-        soup = BeautifulSoup(r.content, 'html.parser')
-        
-        # Name
-        name_tag = soup.find('h1', {'class': 'data-header__headline-wrapper'})
-        name = name_tag.text.split('\n')[-1].strip()  # type: ignore
-        
-        # Value
-        try:
-            value_tag = soup.find('a', {'class': 'data-header__market-value-wrapper'})
-            value = value_tag.text.split(' ')[0]  # type: ignore
-            value_last_updated_tag = soup.find('a', {'class': 'data-header__market-value-wrapper'})
-            value_last_updated = value_last_updated_tag.text.split('Last update: ')[-1]  # type: ignore
-        except AttributeError:
-            value = None
-            value_last_updated = None
-            
-        # DOB and age
-        dob_el = soup.find('span', {'itemprop': 'birthDate'})
-        if dob_el is None:
-            dob, age = None, None
-        else:
-            dob = ' '.join(dob_el.text.strip().split(' ')[:3])
-            age = int(dob_el.text.strip().split(' ')[-1].replace('(', '').replace(')', ''))
-        
-        # Height
-        height_tag = soup.find('span', {'itemprop': 'height'})
-        if height_tag is None:
-            height = None
-        else:
-            height_str = height_tag.text.strip()
-            if height_str in ["N/A", "- m"]:
-                height = None
-            else:
-                height = float(height_str.replace(' m', '').replace(',', '.'))
-       
-        # Nationality and citizenships
-        nationality_el = soup.find('span', {'itemprop': 'nationality'})
-        nationality = nationality_el.getText().replace('\n', '').strip()  # type: ignore
-
-        citizenship_els = soup.find_all(
-            'span', {'class': 'info-table__content info-table__content--bold'}
-        )
-        flag_els = [
-            flag_el for el in citizenship_els
-            for flag_el in el.find_all('img', {'class': 'flaggenrahmen'})
-        ]
-        citizenship = list(set([el['title'] for el in flag_els]))
-        
-        # Position
-        position_el = soup.find('dd', {'class': 'detail-position__position'})
-        if position_el is None:
-            position_el = [
-                el for el in soup.find_all('li', {'class': 'data-header__label'})
-                if 'position' in el.text.lower()
-            ][0].find('span')
-        position = position_el.text.strip()
-        try:
-            other_positions = [
-                el.text for el in
-                soup.find('div', {'class': 'detail-position__position'}).find_all('dd')  # type: ignore
-            ]
-        except AttributeError:
-            other_positions = None
-        other_positions = None if other_positions is None else pd.DataFrame(other_positions)  # type: ignore
-
-        # Data header fields
-        team = soup.find('span', {'class': 'data-header__club'})
-        team = None if team is None else team.text.strip()  # type: ignore
-
-        data_headers_labels = soup.find_all('span', {'class': 'data-header__label'})
-        # Last club
-        last_club = [
-            x.text.split(':')[-1].strip() for x in data_headers_labels
-            if 'last club' in x.text.lower()
-        ]
-        assert len(last_club) < 2
-        last_club = None if len(last_club) == 0 else last_club[0]  # type: ignore
-        # "Since" date
-        since_date = [
-            x.text.split(':')[-1].strip() for x in data_headers_labels
-            if 'since' in x.text.lower()
-        ]
-        assert len(since_date) < 2
-        since_date = None if len(since_date) == 0 else since_date[0]  # type: ignore
-        # "Joined" date
-        joined_date = [
-            x.text.split(':')[-1].strip() for x in data_headers_labels if 'joined' in x.text.lower()
-        ]
-        assert len(joined_date) < 2
-        joined_date = None if len(joined_date) == 0 else joined_date[0]  # type: ignore
-        # Contract expiration date
-        contract_expiration = [
-            x.text.split(':')[-1].strip() for x in data_headers_labels
-            if 'contract expires' in x.text.lower()
-        ]
-        assert len(contract_expiration) < 2
-        contract_expiration = None if len(contract_expiration) == 0 else contract_expiration[0]  # type: ignore
-        
-        # Market value history
-        try:
-            script = [
-                s for s in soup.find_all('script', {'type': 'text/javascript'})
-                if 'var chart = new Highcharts.Chart' in str(s)
-            ][0]
-            values = [int(s.split(',')[0]) for s in str(script).split('y\':')[2:-2]]
-            dates = [
-                s.split('datum_mw\':')[-1].split(',\'x')[0].replace('\\x20', ' ').replace('\'', '')
-                for s in str(script).split('y\':')[2:-2]
-            ]
-            market_value_history = pd.DataFrame({'date': dates, 'value': values})
-        except IndexError:
-            market_value_history = None
-        
-        # Transfer History
-        rows = soup.find_all('div', {'class': 'grid tm-player-transfer-history-grid'})
-        transfer_history = pd.DataFrame(
-            data=[[s.strip() for s in row.getText().split('\n\n') if s != ''] for row in rows],
-            columns=['Season', 'Date', 'Left', 'Joined', 'MV', 'Fee', '']
-        ).drop(
-            columns=['']
-        )
-        
-        player = pd.Series(dtype=object)
-        player['Name'] = name
-        player['Value'] = value
-        player['Value last updated'] = value_last_updated
-        player['DOB'] = dob
-        player['Age'] = age
-        player['Height (m)'] = height
-        player['Nationality'] = nationality
-        player['Citizenship'] = citizenship
-        player['Position'] = position
-        player['Other positions'] = other_positions
-        player['Team'] = team
-        player['Last club'] = last_club
-        player['Since'] = since_date
-        player['Joined'] = joined_date
-        player['Contract expiration'] = contract_expiration
-        player['Market value history'] = market_value_history
-        player['Transfer history'] = transfer_history
-
-        return player.to_frame().T
+        if not isinstance(typed, bool):
+            raise TypeError('`typed` must be a boolean.')
+
+        r = fetch(player_link, self.proxy_pool, headers=PLAYER_HEADERS)
+        player = _parse_player(player_link, r.content)
+        return _type_players(player) if typed else player
@@ -1,9 +1,15 @@
 from .scraperfc_exceptions import InvalidLeagueException, InvalidYearException
+from .caching import ParseCache, code_version
+from .fetching import ProxyPool, fetch
+from .pipeline import parse_pages
+from .shared_functions import make_soup
+from .sinks import Sink
+from .tracing import trace_methods, traced
+from functools import partial
 import json
 import pandas as pd
 from tqdm import tqdm
-import requests
-from bs4 import BeautifulSoup
+from bs4 import SoupStrainer
 import warnings
 from typing import Sequence, Union
 
@@ -17,13 +23,98 @@ comps = {
 }
 
 
+@traced('parse')
 def _json_from_script(text: str) -> dict:
     data_str = text.split('JSON.parse(\'')[1].split('\')')[0].encode('utf-8').decode('unicode_escape')
     data_dict = json.loads(data_str)
     return data_dict
 
 
+@traced('parse')
+def _parse_match(content: bytes) -> tuple:
+    """ Private, extracts the JSON data of a match page: (shots data, match info, rosters data).
+    """
+    scripts = make_soup(content, SoupStrainer('script')).find_all('script')
+    shots_data_tag = [x for x in scripts if 'shotsData' in x.text][0]
+    # 2024-06-20 Match info is actually in the shots data tag but have this line separate in case
+    # that changes in the future.
+    match_info_tag = [x for x in scripts if 'match_info' in x.text][0]
+    rosters_data_tag = [x for x in scripts if 'rostersData' in x.text][0]
+
+    shots_data = _json_from_script(shots_data_tag.text.split('match_info')[0])
+    match_info = _json_from_script(match_info_tag.text.split('match_info')[1])
+    rosters_data = _json_from_script(rosters_data_tag.text)
+    return shots_data, match_info, rosters_data
+
+
+def _cached_match(content: bytes) -> dict:
+    """ Private, _parse_match() in the format of the parse cache: {"match": 1-row DataFrame} with
+    the JSON strings of the shots data, match info, and rosters data.
+    """
+    shots_data, match_info, rosters_data = _parse_match(content)
+    return {'match': pd.DataFrame([{
+        'shots_data': json.dumps(shots_data),
+        'match_info': json.dumps(match_info),
+        'rosters_data': json.dumps(rosters_data),
+    }])}
+
+
+@traced('build')
+def _match_dfs(shots_data: dict, match_info: dict, rosters_data: dict) -> tuple:
+    """ Converts the match data dicts of Understat.scrape_match() to DataFrames. Empty dicts (404
+    pages) become empty DataFrames.
+    """
+    if len(shots_data) == 0:
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+    shots_df = pd.DataFrame.from_dict(shots_data['h'] + shots_data['a'])  # type: ignore
+    match_info_df = pd.Series(match_info).to_frame().T
+    rosters_df = pd.DataFrame.from_dict(
+        list(rosters_data['h'].values()) + list(rosters_data['a'].values())  # type: ignore
+    )
+    return shots_df, match_info_df, rosters_df
+
+
+def _match_data(
+        link: str, content: Union[bytes, None], as_df: bool=False,
+        parse_cache: Union[ParseCache, None]=None
+) -> tuple:
+    """ Private, parses the content of a match page, None for a 404 page, into the data of
+    Understat.scrape_match(). A module level function, so that it can be run in
+    pipeline.parse_pages() workers.
+    """
+    if content is None:
+        if as_df:
+            return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+        return dict(), dict(), dict()
+
+    if parse_cache is None:
+        shots_data, match_info, rosters_data = _parse_match(content)
+    else:
+        match = parse_cache.get_or_parse(
+            'understat_match', code_version(_cached_match, _parse_match, _json_from_script),
+            link, content, lambda: _cached_match(content)
+        )['match']
+        shots_data, match_info, rosters_data = [
+            json.loads(match.loc[0, x]) for x in ['shots_data', 'match_info', 'rosters_data']
+        ]
+    if as_df:
+        return _match_dfs(shots_data, match_info, rosters_data)
+    return shots_data, match_info, rosters_data
+
+
+@trace_methods
 class Understat:
+
+    # ==============================================================================================
+    def __init__(
+            self, proxy_pool: Union[ProxyPool, None]=None,
+            parse_cache: Union[ParseCache, None]=None
+    ) -> None:
+        """ proxy_pool sends all of the requests through a ProxyPool, and parse_cache skips
+        re-parsing match pages that haven't changed.
+        """
+        self.proxy_pool = proxy_pool
+        self.parse_cache = parse_cache
         
     # ==============================================================================================
     def get_season_link(self, year: str, league: str) -> str:
@@ -70,7 +161,10 @@ class Understat:
         if league not in comps.keys():
             raise InvalidLeagueException(league, 'Understat', list(comps.keys()))
         
-        soup = BeautifulSoup(requests.get(comps[league]).content, 'html.parser')
+        soup = make_soup(
+            fetch(comps[league], self.proxy_pool).content,
+            SoupStrainer('select', {'name': 'season'})
+        )
         valid_season_tags = soup.find('select', {'name': 'season'}).find_all('option')  # type: ignore
         valid_seasons = [x.text for x in valid_season_tags]
         return valid_seasons
@@ -133,7 +227,7 @@ class Understat:
             matches_data, teams_data, players_data
         """
         season_link = self.get_season_link(year, league)
-        soup = BeautifulSoup(requests.get(season_link).content, 'html.parser')
+        soup = make_soup(fetch(season_link, self.proxy_pool).content, SoupStrainer('script'))
 
         scripts = soup.find_all('script')
         dates_data_tag = [x for x in scripts if 'datesData' in x.text][0]
@@ -246,39 +340,25 @@ class Understat:
         if not isinstance(as_df, bool):
             raise TypeError('`as_df` must be a boolean.')
         
-        r = requests.get(link)
+        _, content = self._match_page(link)
+        return _match_data(link, content, as_df, self.parse_cache)
+
+    # ==============================================================================================
+    def _match_page(self, link: str) -> tuple:
+        """ Private, fetches a match page. Returns (link, content), with None content if the page
+        wasn't found.
+        """
+        r = fetch(link, self.proxy_pool)
         if r.status_code == 404:
             warnings.warn(f"404 error for {link}. Returning empty dicts/DataFrames.")
-            if as_df:
-                shots_data, match_info, rosters_data = pd.DataFrame(), pd.DataFrame(), \
-                    pd.DataFrame()  # type: ignore
-            else:
-                shots_data, match_info, rosters_data = dict(), dict(), dict()   # type: ignore
-        else:
-            soup = BeautifulSoup(r.content, 'html.parser')
-
-            scripts = soup.find_all('script')
-            shots_data_tag = [x for x in scripts if 'shotsData' in x.text][0]
-            # 2024-06-20 Match info is actually in the shots data tag but have this line separate
-            # in case that changes in the future.
-            match_info_tag = [x for x in scripts if 'match_info' in x.text][0]
-            rosters_data_tag = [x for x in scripts if 'rostersData' in x.text][0]
-
-            shots_data = _json_from_script(shots_data_tag.text.split('match_info')[0])  # type: ignore
-            match_info = _json_from_script(match_info_tag.text.split('match_info')[1])  # type: ignore
-            rosters_data = _json_from_script(rosters_data_tag.text)  # type: ignore
-
-            if as_df:
-                shots_data = pd.DataFrame.from_dict(shots_data['h'] + shots_data['a'])   # type: ignore
-                match_info = pd.Series(match_info).to_frame().T     # type: ignore
-                rosters_data = pd.DataFrame.from_dict(
-                    list(rosters_data['h'].values()) + list(rosters_data['a'].values())    # type: ignore
-                )   # type: ignore
-        
-        return shots_data, match_info, rosters_data
+            return link, None
+        return link, r.content
 
     # ==============================================================================================
-    def scrape_matches(self, year: str, league: str, as_df: bool = False) -> dict:
+    def scrape_matches(
+            self, year: str, league: str, as_df: bool = False, sink: Union[Sink, None] = None,
+            n_workers: int = 1
+    ) -> dict:
         """ Scrapes all of the matches from the chosen league season.
         
         Gathers all match links from the chosen league season and then calls scrape_match() on each
@@ -293,6 +373,14 @@ class Understat:
         as_df : bool, optional, default False
             If True, the data for each match will be returned as DataFrames. If False, invdividual
             match data will be dicts.
+        sink : Sink, optional
+            If given, the data of each match is written to the tables "shots", "match_info", and
+            "rosters" of the sink as soon as it's scraped, with a "match_link" column, e.g. a
+            ScraperFC.ParquetSink.
+        n_workers : int, optional, default 1
+            Number of processes that parse the match pages while the next ones are fetched, see
+            pipeline.parse_pages(). Useful when the pages don't need to be paced, e.g. when they're
+            replayed from a cassette.
 
         Returns
         -------
@@ -301,9 +389,20 @@ class Understat:
         """
         links = self.get_match_links(year, league)
         
+        parsed = parse_pages(
+            (self._match_page(link) for link in links),
+            partial(_match_data, as_df=as_df, parse_cache=self.parse_cache), n_workers
+        )
         matches = dict()
-        for link in tqdm(links, desc=f'{year} {league} matches'):
-            shots, info, rosters = self.scrape_match(link, as_df)
+        for link, (shots, info, rosters) in tqdm(
+                zip(links, parsed), desc=f'{year} {league} matches', total=len(links)
+        ):
+            if sink is not None:
+                dfs = (shots, info, rosters) if as_df else _match_dfs(shots, info, rosters)  # type: ignore
+                sink.write_tables(dict([
+                    (name, df.assign(match_link=link))
+                    for name, df in zip(['shots', 'match_info', 'rosters'], dfs)
+                ]), 'understat', league, year)
             matches[link] = {'shots_data': shots, 'match_info': info, 'rosters_data': rosters}
         
         return matches
@@ -331,7 +430,8 @@ class Understat:
         if not isinstance(as_df, bool):
             raise TypeError('`as_df` must be a boolean.')
 
-        scripts = BeautifulSoup(requests.get(team_link).content, 'html.parser').find_all('script')
+        scripts = make_soup(fetch(team_link, self.proxy_pool).content, SoupStrainer('script'))\
+            .find_all('script')
 
         dates_data_tag = [x for x in scripts if 'datesData' in x.text][0]
         stats_data_tag = [x for x in scripts if 'statisticsData' in x.text][0]
@@ -0,0 +1,21 @@
+""" Set SCRAPERFC_CASSETTES to "record" to record the responses of the tests that hit the live sites
+to test/cassettes/, and to "replay" to run them offline from the recordings. See ScraperFC.replay.
+"""
+import sys
+sys.path.append('./src/')
+from ScraperFC.replay import use_cassette
+
+import os
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def cassette(request):
+    mode = os.environ.get('SCRAPERFC_CASSETTES')
+    if mode is None:
+        yield None
+        return
+    path = os.path.join(os.path.dirname(__file__), 'cassettes', request.module.__name__,
+                        f'{request.node.name}.json.gz')
+    with use_cassette(path, mode) as c:
+        yield c
@@ -0,0 +1,58 @@
+import sys
+sys.path.append('./src/')
+from ScraperFC.caching import ParseCache, code_version
+
+import os
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+
+# ==================================================================================================
+def parse_v1(content: bytes) -> dict:
+    return {'rows': pd.DataFrame({'text': content.decode().split()}), 'missing': None}
+
+
+# ==================================================================================================
+def parse_v2(content: bytes) -> dict:
+    return {'rows': pd.DataFrame({'text': content.decode().upper().split()})}
+
+
+class TestParseCache:
+
+    # ==============================================================================================
+    def test_get_or_parse(self, tmp_path):
+        cache = ParseCache(str(tmp_path))
+        version = code_version(parse_v1)
+        calls = list()
+
+        def parse(content):
+            calls.append(content)
+            return parse_v1(content)
+
+        for _ in range(2):
+            tables = cache.get_or_parse('test', version, 'https://a', b'a b',
+                                        lambda: parse(b'a b'))
+            assert tables['rows']['text'].tolist() == ['a', 'b']
+            assert tables['missing'] is None
+        assert len(calls) == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        # A different URL or page content is a different entry
+        assert cache.get('test', version, 'https://b', b'a b') is None
+        assert cache.get('test', version, 'https://a', b'a b c') is None
+
+    # ==============================================================================================
+    def test_versions(self, tmp_path):
+        assert code_version(parse_v1) == code_version(parse_v1)
+        assert code_version(parse_v1) != code_version(parse_v2)
+
+        cache = ParseCache(str(tmp_path))
+        for parse in [parse_v1, parse_v2]:
+            cache.put('test', code_version(parse), 'https://a', b'a b', parse(b'a b'))
+        tables = cache.get('test', code_version(parse_v2), 'https://a', b'a b')
+        assert tables['rows']['text'].tolist() == ['A', 'B']
+
+        cache.prune('test', code_version(parse_v2))
+        assert os.listdir(tmp_path / 'test') == [code_version(parse_v2)]
@@ -1,7 +1,8 @@
 import sys
 sys.path.append('./src/')
 from ScraperFC import Capology
-from ScraperFC.capology import comps
+from ScraperFC.capology import comps, _js_value, _salary_dfs_from_records, \
+    _salary_records_from_html, _split_top_level
 from ScraperFC.scraperfc_exceptions import InvalidYearException, InvalidLeagueException
 
 import pytest
@@ -9,6 +10,23 @@ from contextlib import nullcontext as does_not_raise
 import random
 import pandas as pd
 
+# Season page with the salary dataset embedded in a script, like Capology's. The strings have
+# separators, brackets and escaped quotes in them, and the money fields are suffixed by currency.
+salary_page = '''<html><body><script>var x = 1;</script><script>
+  var data = [
+    {'name': '<a href="/player/bukayo-saka/">Bukayo Saka</a>', "club": "Arsenal",
+     'note': "a, b; [c] {d}", 'age': 22, 'active': true, 'release_clause_eur': null,
+     'annual_gross_eur': accounting.formatMoney("11000000.0", "\\u20ac ", 0),
+     'annual_gross_gbp': accounting.formatMoney("9360000.0", "£ ", 0),
+     'annual_gross_usd': "12100000"},
+    {'name': "Ma\\'Neil", "club": "Wolves", 'note': `x:y`, 'age': 30, 'active': false,
+     'release_clause_eur': 50000000, 'annual_gross_eur': 1000, 'annual_gross_gbp': 900,
+     'annual_gross_usd': 1100},
+  ];
+  var teams = [1, 2];
+</script></body></html>'''
+
+
 class TestCapology:
 
     # ==============================================================================================
@@ -42,4 +60,86 @@ class TestCapology:
         result = capology.scrape_salaries(year, league, 'gbp')
         assert type(result) is pd.DataFrame
         assert result.shape[0] > 0
-        assert result.shape[1] > 0
\ No newline at end of file
+        assert result.shape[1] > 0
+
+    # ==============================================================================================
+    def test_scrape_salaries_many(self):
+        capology = Capology()
+        leagues = random.sample(list(comps.keys()), 2)
+        common_years = set(capology.get_valid_seasons(leagues[0]))\
+            .intersection(capology.get_valid_seasons(leagues[1]))
+        years = random.sample(sorted(common_years), 1)
+        currencies = ['eur', 'gbp', 'usd']
+
+        result = capology.scrape_salaries_many(years, leagues, currencies)
+        assert type(result) is dict
+        assert len(result) == len(years) * len(leagues) * len(currencies)
+        for df in result.values():
+            assert type(df) is pd.DataFrame
+            assert df.shape[0] > 0
+
+    # ==============================================================================================
+    def test_scrape_salaries_http(self):
+        capology = Capology()
+        league = random.sample(list(comps.keys()), 1)[0]
+        year = random.sample(capology.get_valid_seasons(league), 1)[0]
+
+        result = capology.scrape_salaries_http(year, league)
+        assert type(result) is dict
+        assert set(result.keys()) == {'eur', 'gbp', 'usd'}
+        for df in result.values():
+            assert type(df) is pd.DataFrame
+            assert df.shape[0] > 0
+            assert 'Player' in df.columns
+
+    # ==============================================================================================
+    def test_scrape_payrolls(self):
+        capology = Capology()
+        league = random.sample(list(comps.keys()), 1)[0]
+        year = random.sample(capology.get_valid_seasons(league), 1)[0]
+
+        salaries = capology.scrape_salaries(year, league, 'eur')
+        payrolls = capology.scrape_payrolls(year, league, 'eur')
+        assert type(payrolls) is pd.DataFrame
+        assert payrolls.shape[0] == salaries['Club'].nunique()
+        assert payrolls['Annual Gross'].dtype == 'Int64'
+        assert payrolls.attrs['units']['Annual Gross'] == 'EUR'
+
+    # ==============================================================================================
+    def test_split_top_level(self):
+        assert _split_top_level('a, "b, c", [d, e], {f: g}, (h, i)', ',') == \
+            ['a', '"b, c"', '[d, e]', '{f: g}', '(h, i)']
+        assert _split_top_level("'it\\'s, ok', x", ',') == ["'it\\'s, ok'", 'x']
+
+    # ==============================================================================================
+    def test_js_value(self):
+        assert _js_value('accounting.formatMoney("1250000.0", "£ ", 0)') == 1250000
+        assert _js_value("'<a href=\"/p/\">Name</a>'") == 'Name'
+        assert _js_value('null') is None
+        assert _js_value('true') is True
+        assert _js_value('"12"') == '12'  # quoted strings stay strings
+        assert _js_value("'NaN'") == 'NaN'
+        assert _js_value('12') == 12
+
+    # ==============================================================================================
+    def test_salary_records_from_html(self):
+        records = _salary_records_from_html(salary_page)
+        assert len(records) == 2
+        assert records[0]['name'] == 'Bukayo Saka'
+        assert records[0]['note'] == 'a, b; [c] {d}'
+        assert records[0]['annual_gross_gbp'] == 9360000
+        assert records[0]['annual_gross_usd'] == '12100000'
+        assert records[0]['release_clause_eur'] is None
+        assert records[1]['name'] == "Ma'Neil"
+        assert records[1]['note'] == 'x:y'
+        assert _salary_records_from_html('<script>var data = 1;</script>') == []
+
+        dfs = _salary_dfs_from_records(records, ['eur', 'usd'], typed=True)
+        assert set(dfs.keys()) == {'eur', 'usd'}
+        assert dfs['eur']['Annual Gross'].tolist() == [11000000, 1000]
+        assert dfs['usd']['Annual Gross'].tolist() == [12100000, 1100]
+        assert dfs['eur']['Release Clause'].isna().tolist() == [True, False]
+        assert 'Release Clause' not in dfs['usd'].columns
+        assert dfs['eur'].attrs['units']['Annual Gross'] == 'EUR'
+        formatted = _salary_dfs_from_records(records, ['gbp'], typed=False)['gbp']
+        assert formatted['Annual Gross'].tolist() == ['£ 9,360,000', '£ 900']
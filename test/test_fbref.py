@@ -1,10 +1,13 @@
 import sys
 sys.path.append('./src/')
-from ScraperFC import FBref
-from ScraperFC.fbref import comps, stats_categories
+from ScraperFC import FBref, fetching
+from ScraperFC.fbref import comps, stats_categories, table_to_df, _type_column
+from ScraperFC.shared_functions import make_soup
 from ScraperFC.scraperfc_exceptions import NoMatchLinksException, InvalidLeagueException,\
     InvalidYearException
 
+from io import StringIO
+from types import SimpleNamespace
 import random
 import numpy as np
 import pandas as pd
@@ -117,6 +120,20 @@ class TestFBref:
         assert type(lg_table) is list, 'league tables should be a list'
         assert np.all([type(x) is pd.DataFrame for x in lg_table]), 'all tables should be dataframes'
 
+    # ==============================================================================================
+    def test_scrape_league_table_fetch(self, monkeypatch):
+        fbref = FBref()
+        html = '<table><tr><th>Rk</th><th>Squad</th></tr><tr><td>1</td><td>Arsenal</td></tr>' + \
+            '</table><table><tr><th>Squad</th></tr><tr><td>Arsenal</td></tr></table>'
+        requested: list = list()
+        monkeypatch.setattr(fbref, 'get_season_link', lambda year, league: 'season link')
+        monkeypatch.setattr(
+            fbref, '_get', lambda url: requested.append(url) or SimpleNamespace(text=html)
+        )
+        lg_table = fbref.scrape_league_table('2023-2024', 'EPL')
+        assert requested == ['season link']  # paced and retried like the other requests
+        assert len(lg_table) == 1 and lg_table[0]['Squad'].tolist() == ['Arsenal']
+
     # ==============================================================================================
     @pytest.mark.parametrize(
         "link",
@@ -131,6 +148,23 @@ class TestFBref:
         fbref = FBref()
         _ = fbref.scrape_match(link)
 
+    # ==============================================================================================
+    def test_scrape_match_tidy(self):
+        fbref = FBref()
+        link = "https://fbref.com/en/matches/2bc716a2/Columbus-Crew-LA-Galaxy-May-17-1998-Major-League-Soccer"  # noqa: E501
+        tables = fbref.scrape_match(link, tidy=True)
+        assert tables['matches'].shape[0] == 1
+        assert tables['matches'].loc[0, 'match_id'] == '2bc716a2'
+        assert 'player_summary' in tables
+        for name, df in tables.items():
+            assert (df['match_id'] == '2bc716a2').all()
+            if name.startswith('player_') or name == 'keeper_stats':
+                assert df['player_id'].notna().all()
+                assert set(df['team_id']) <= {
+                    tables['matches'].loc[0, 'home_team_id'],
+                    tables['matches'].loc[0, 'away_team_id']
+                }
+
     # ==============================================================================================
     def test_scrape_matches(self):
         fbref = FBref()
@@ -172,3 +206,50 @@ class TestFBref:
             assert type(value[0]) is pd.DataFrame or value[0] is None
             assert type(value[1]) is pd.DataFrame or value[1] is None
             assert type(value[2]) is pd.DataFrame or value[2] is None
+
+    # ==============================================================================================
+    def test_table_to_df(self):
+        html = (
+            '<table id="stats_standard"><thead>'
+            '<tr class="over_header"><th colspan="2"></th><th colspan="2">Playing Time</th></tr>'
+            '<tr><th data-stat="ranker">Rk</th><th data-stat="player">Player</th>'
+            '<th data-stat="minutes">Min</th><th data-stat="xg">xG</th></tr></thead><tbody>'
+            '<tr><th data-stat="ranker">1</th><td data-stat="player">'
+            '<a href="/en/players/e342ad68/Bukayo-Saka">Bukayo Saka</a></td>'
+            '<td data-stat="minutes">2,937</td><td data-stat="xg">14.3</td></tr>'
+            '<tr class="thead"><th data-stat="ranker">Rk</th><th data-stat="player">Player</th>'
+            '<th data-stat="minutes">Min</th><th data-stat="xg">xG</th></tr>'
+            '<tr><th data-stat="ranker">2</th><td data-stat="player">Unlinked Player</td>'
+            '<td data-stat="minutes">12</td><td data-stat="xg"></td></tr>'
+            '</tbody></table>'
+        )
+        table_tag = make_soup(html).find('table')
+        df, links = table_to_df(table_tag)
+        expected = pd.read_html(StringIO(html))[0]
+        assert df.columns.tolist() == expected.columns.tolist()
+        assert df.shape == (2, 4)
+        assert df[('Playing Time', 'Min')].tolist() == [2937, 12]
+        assert df[('Playing Time', 'xG')].isna().tolist() == [False, True]
+        assert links['player'] == ['/en/players/e342ad68/Bukayo-Saka', None]
+
+        df, _ = table_to_df(table_tag, column_keys='data-stat')
+        assert df.columns.tolist() == ['ranker', 'player', 'minutes', 'xg']
+
+    # ==============================================================================================
+    def test_type_column(self):
+        assert _type_column(['2,937', '', '12']).tolist()[::2] == [2937, 12]
+        assert _type_column(['Arsenal', '1']).tolist() == ['Arsenal', '1']
+        assert _type_column(['', '']).isna().all()  # no .str on an all-blank float column
+
+    # ==============================================================================================
+    def test_wait_time(self, monkeypatch):
+        limiter = fetching.rate_limiters['fbref']
+        FBref(wait_time=0)
+        assert limiter.max_rate == 10 / 60  # never above FBref's limit, for any instance
+
+        sleeps: list = list()
+        monkeypatch.setattr(fetching.time, 'sleep', sleeps.append)
+        fbref = FBref(wait_time=20)
+        fbref._space('https://fbref.com/en/comps')
+        fbref._space('https://fbref.com/en/comps')
+        assert len(sleeps) == 1 and 19 < sleeps[0] <= 20
@@ -0,0 +1,172 @@
+import sys
+sys.path.append('./src/')
+from ScraperFC import fetching
+from ScraperFC.fetching import ProxyPool, RateLimiter, RetryPolicy, fetch
+from ScraperFC.scraperfc_exceptions import CircuitOpenException, NoWorkingProxiesException
+
+import pytest
+import requests
+
+
+class FakeResponse:
+    ok = True
+    status_code = 200
+
+
+class TestProxyPool:
+
+    # ==============================================================================================
+    @pytest.fixture(autouse=True)
+    def no_pacing(self, monkeypatch):
+        """ The responses are fake, so the requests don't need pacing.
+        """
+        for source in ['example']:
+            monkeypatch.setitem(fetching.rate_limiters, source, None)
+
+    # ==============================================================================================
+    @pytest.fixture
+    def fake_get(self, monkeypatch):
+        """ requests.get() that fails for proxies starting with "dead".
+        """
+        calls = list()
+
+        def get(url, proxies=None, **kwargs):
+            calls.append(proxies)
+            if proxies is not None and proxies['https'].startswith('http://dead'):
+                raise requests.ConnectionError()
+            return FakeResponse()
+
+        monkeypatch.setattr(fetching.requests, 'get', get)
+        return calls
+
+    # ==============================================================================================
+    def test_load_drops_dead_proxies(self, fake_get):
+        pool = ProxyPool(['1.1.1.1:80', 'dead:80', '2.2.2.2:8080'])
+        pool.load()
+        assert len(pool) == 2
+        assert set(pool.stats().index) == {'1.1.1.1:80', '2.2.2.2:8080'}
+
+    # ==============================================================================================
+    def test_no_working_proxies(self, fake_get):
+        with pytest.raises(NoWorkingProxiesException):
+            ProxyPool(['dead:80']).load()
+
+    # ==============================================================================================
+    def test_rotation_and_eviction(self, fake_get):
+        pool = ProxyPool(['1.1.1.1:80', '2.2.2.2:80'], max_failures=2)
+        assert {pool.get() for _ in range(4)} == {'1.1.1.1:80', '2.2.2.2:80'}
+        pool.report_failure('1.1.1.1:80')
+        assert pool.stats().index[0] == '2.2.2.2:80'  # lower success rate, worse score
+        pool.report_failure('1.1.1.1:80')
+        assert len(pool) == 1
+        assert pool.get() == '2.2.2.2:80'
+
+    # ==============================================================================================
+    def test_fetch_retries_with_next_proxy(self, fake_get):
+        pool = ProxyPool(['1.1.1.1:80'], max_failures=1, rotation_size=1)
+        pool.load()
+        pool._stats['dead:80'] = dict(pool._stats['1.1.1.1:80'], latency=0)  # went down since
+        response = fetch('https://example.com', pool)
+        assert response.ok
+        assert [proxies['https'] for proxies in fake_get[-2:]] == \
+            ['http://dead:80', 'http://1.1.1.1:80']
+        assert 'dead:80' not in pool.stats().index
+
+
+class TestRetries:
+
+    # ==============================================================================================
+    @pytest.fixture(autouse=True)
+    def no_pacing(self, monkeypatch):
+        """ The responses are fake, so the requests don't need pacing.
+        """
+        for source in ['example']:
+            monkeypatch.setitem(fetching.rate_limiters, source, None)
+
+    # ==============================================================================================
+    @pytest.fixture
+    def fake_get(self, monkeypatch):
+        """ requests.get() that returns the queued statuses, then 200s, and records the sleeps.
+        """
+        statuses: list = list()
+        sleeps: list = list()
+
+        def get(url, **kwargs):
+            response = requests.Response()
+            response.status_code = statuses.pop(0) if len(statuses) > 0 else 200
+            if response.status_code == 429:
+                response.headers['Retry-After'] = '3'
+            return response
+
+        monkeypatch.setattr(fetching.requests, 'get', get)
+        monkeypatch.setattr(fetching.time, 'sleep', sleeps.append)
+        return statuses, sleeps
+
+    # ==============================================================================================
+    def test_backoff_and_retry_after(self, fake_get, monkeypatch):
+        statuses, sleeps = fake_get
+        monkeypatch.setitem(fetching.retry_policies, 'example',
+                            RetryPolicy(max_attempts=3, backoff=2))
+        statuses.extend([503, 429])
+        assert fetch('https://example.com').status_code == 200
+        assert 0 <= sleeps[0] <= 2  # jittered backoff
+        assert sleeps[1] == 3  # Retry-After
+
+        statuses.extend([429, 429, 429])
+        assert fetch('https://example.com').status_code == 429  # out of attempts
+        assert len(statuses) == 0
+
+    # ==============================================================================================
+    def test_circuit_breaker(self, fake_get, monkeypatch):
+        statuses, sleeps = fake_get
+        monkeypatch.setitem(fetching.retry_policies, 'example',
+                            RetryPolicy(max_attempts=2, breaker_threshold=3, breaker_cooldown=60))
+        statuses.extend([500] * 4)
+        fetch('https://example.com')
+        fetch('https://example.com')
+        with pytest.raises(CircuitOpenException):
+            fetch('https://example.com')
+
+        fetching.retry_policies['example']._open_until -= 61  # cooled down
+        assert fetch('https://example.com').status_code == 200  # half-open, then closed
+        assert fetching.retry_policies['example']._failures == 0
+
+
+class TestRateLimiter:
+
+    # ==============================================================================================
+    def test_aimd(self, monkeypatch):
+        sleeps: list = list()
+        monkeypatch.setattr(fetching.time, 'sleep', sleeps.append)
+        limiter = RateLimiter(rate=2, max_rate=2.5, increase=0.25, decrease=0.5)
+        for _ in range(3):
+            limiter.wait('https://example.com')
+            limiter.update(200, 0.1)
+        assert limiter.rate == 2.5  # capped at the ceiling
+        assert len(sleeps) == 2 and 0.3 < sleeps[0] <= 0.5  # spaced by 1 / rate
+
+        limiter.update(429, 0.1)
+        assert limiter.rate == 1.25
+        limiter.update(200, 1)  # latency spike
+        assert limiter.rate == 0.625
+        limiter.update(200, 0.1)
+        assert limiter.rate == 0.875
+
+    # ==============================================================================================
+    def test_latency_step(self):
+        limiter = RateLimiter(rate=1, increase=0.1, decrease=0.5)
+        limiter.update(200, 0.1)
+        for _ in range(12):
+            limiter.update(200, 0.5)  # the latency rises for good
+        assert limiter._latency > 0.4  # becomes the new baseline
+        assert limiter.rate > 1  # only the first slow response backed off
+
+    # ==============================================================================================
+    def test_fetch_is_paced(self, monkeypatch):
+        sleeps: list = list()
+        monkeypatch.setattr(fetching.time, 'sleep', sleeps.append)
+        monkeypatch.setattr(fetching.requests, 'get', lambda url, **kwargs: FakeResponse())
+        monkeypatch.setitem(fetching.rate_limiters, 'example', RateLimiter(rate=0.5))
+        fetch('https://example.com')
+        fetch('https://example.com')
+        assert len(sleeps) == 1 and 1.5 < sleeps[0] <= 2
@@ -0,0 +1,90 @@
+import sys
+sys.path.append('./src/')
+from ScraperFC import fetching
+from ScraperFC.fetching import ProxyPool, RetryPolicy, fetch, sleep
+from ScraperFC.metrics import Metrics, collect_metrics, request_labels
+
+import pytest
+import requests
+
+
+class FakeResponse:
+    ok = True
+
+    def __init__(self, status_code: int=200) -> None:
+        self.status_code = status_code
+        self.content = b'x' * 10
+
+
+class TestMetrics:
+
+    # ==============================================================================================
+    @pytest.fixture(autouse=True)
+    def no_pacing(self, monkeypatch):
+        """ The responses are fake, so the requests don't need pacing.
+        """
+        for source in ['fbref', 'understat']:
+            monkeypatch.setitem(fetching.rate_limiters, source, None)
+
+    # ==============================================================================================
+    @pytest.fixture
+    def fake_get(self, monkeypatch):
+        """ requests.get() that fails for proxies starting with "dead" and returns a 429 for
+        URLs ending with "limited".
+        """
+        def get(url, proxies=None, **kwargs):
+            if proxies is not None and proxies['https'].startswith('http://dead'):
+                raise requests.ConnectionError()
+            return FakeResponse(429 if url.endswith('limited') else 200)
+
+        monkeypatch.setattr(fetching.requests, 'get', get)
+
+    # ==============================================================================================
+    def test_request_labels(self):
+        assert request_labels('https://fbref.com/en/matches/3a6836b4/Arsenal-Chelsea-August-21') \
+            == ('fbref', '/en/matches/{id}/{id}')
+        assert request_labels('https://api.sofascore.com/api/v1/event/123/average-positions',
+                              Metrics.static_segments) \
+            == ('sofascore', '/api/v1/event/{id}/average-positions')
+        assert request_labels('https://understat.com/league/EPL/2023') == \
+            ('understat', '/league/{id}/{id}')
+
+    # ==============================================================================================
+    def test_collect(self, fake_get, monkeypatch):
+        monkeypatch.setattr(fetching.time, 'sleep', lambda seconds: None)
+        monkeypatch.setitem(fetching.retry_policies, 'fbref', RetryPolicy(max_attempts=1))
+        with collect_metrics() as metrics:
+            fetch('https://understat.com/match/1')
+            fetch('https://understat.com/match/2')
+            fetch('https://fbref.com/en/limited')
+            sleep(7, 'https://fbref.com/en/limited')
+        fetch('https://understat.com/match/3')  # not collected anymore
+
+        snapshot = metrics.snapshot()
+        assert snapshot['requests_total'] == [
+            {'source': 'fbref', 'endpoint': '/en/limited', 'status': '429', 'value': 1},
+            {'source': 'understat', 'endpoint': '/match/{id}', 'status': '200', 'value': 2},
+        ]
+        assert snapshot['rate_limited_total'][0]['value'] == 1
+        assert snapshot['sleep_seconds_total'][0]['value'] == 7
+        assert snapshot['request_seconds'][1]['count'] == 2
+
+        summary = metrics.summary()
+        assert summary.loc[('understat', '/match/{id}'), 'bytes'] == 20
+        assert summary.loc[('fbref', '/en/limited'), 'sleep seconds'] == 7
+
+    # ==============================================================================================
+    def test_retries_and_prometheus(self, fake_get):
+        pool = ProxyPool(['1.1.1.1:80'], max_failures=1, rotation_size=1)
+        pool.load()
+        pool._stats['dead:80'] = dict(pool._stats['1.1.1.1:80'], latency=0)
+        with collect_metrics() as metrics:
+            fetch('https://understat.com/match/1', pool)
+
+        text = metrics.to_prometheus()
+        assert 'scraperfc_retries_total{source="understat",endpoint="/match/{id}"} 1\n' in text
+        assert 'scraperfc_requests_total{source="understat",endpoint="/match/{id}",' \
+            'status="error"} 1' in text
+        assert '# TYPE scraperfc_request_seconds histogram' in text
+        assert 'scraperfc_request_seconds_bucket{source="understat",endpoint="/match/{id}",' \
+            'le="+Inf"} 2' in text
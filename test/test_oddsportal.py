@@ -0,0 +1,218 @@
+import sys
+sys.path.append('./src/')
+from ScraperFC.oddsportal import Oddsportal, OddsSnapshotStore, _decode_feed, \
+    _feed_odds_records, _wide_odds_from_records, compact_odds, long_odds, odds_deltas
+
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+# Odds feed of a match, with 1X2 odds as a list and as a dict, O/U odds that one bookmaker has
+# deactivated, and first half odds (scope 3) that are skipped
+feed = {'d': {'oddsdata': {'back': {
+    'E-1-2-0-0-0': {
+        'odds': {'16': ['2.10', '3.40', '3.60'], '18': {'0': 2.0, '1': 3.5, '2': 3.8}},
+        'act': {'16': True, '18': True},
+    },
+    'E-2-2-0-2.5-0': {
+        'odds': {'16': [1.9, 1.95], '18': [1.85, 2.0]},
+        'act': {'16': True, '18': False},
+    },
+    'E-1-3-0-0-0': {'odds': {'16': [3, 2, 4]}},
+}}}}
+bookmakers = {'16': 'bet365', '18': 'Pinnacle'}
+
+
+class FakeWorker:
+    """ Stands in for an Oddsportal worker, scrape_match() raises the exception named in the
+    link the first time each link is scraped. Every worker records one timing.
+    """
+    created = 0
+    attempts: dict = dict()
+
+    def __init__(self) -> None:
+        FakeWorker.created += 1
+        self.timings: list = [{'url': f'worker {FakeWorker.created}'}]
+
+    def scrape_match(self, link, as_long):
+        FakeWorker.attempts[link] = FakeWorker.attempts.get(link, 0) + 1
+        errors = {'timeout': TimeoutException, 'crash': WebDriverException, 'bad': ValueError}
+        if FakeWorker.attempts[link] == 1 and link in errors:
+            raise errors[link]()
+        return link
+
+    def close(self):
+        pass
+
+
+class TestOddsportal:
+
+    # ==============================================================================================
+    @pytest.fixture
+    def odds(self):
+        """ Long odds table of the feed.
+        """
+        records = _feed_odds_records(feed, bookmakers)
+        return long_odds(_wide_odds_from_records(records, '1X2'),
+                         _wide_odds_from_records(records, 'O/U'), 'AbCdEfGh')
+
+    # ==============================================================================================
+    def test_decode_feed(self):
+        assert _decode_feed('callback(' + json.dumps(feed) + ');') == feed
+        assert _decode_feed(json.dumps(feed)) == feed
+        assert _decode_feed('U2FsdGVkX1+encrypted') is None
+        assert _decode_feed('{not json}') is None
+        assert _decode_feed('"text"') is None
+
+    # ==============================================================================================
+    def test_feed_odds_records(self):
+        records = _feed_odds_records(feed, bookmakers)
+        assert len(records) == 8
+        assert records[0] == {'market': '1X2', 'line': None, 'bookmaker': 'bet365',
+                              'outcome': '1', 'odds': 2.1}
+        assert [r['odds'] for r in records if r['bookmaker'] == 'Pinnacle'] == [2.0, 3.5, 3.8]
+        ou = [r for r in records if r['market'] == 'O/U']
+        assert [(r['line'], r['bookmaker'], r['outcome']) for r in ou] == \
+            [(2.5, 'bet365', 'over'), (2.5, 'bet365', 'under')]
+        assert _feed_odds_records({'d': {}}, bookmakers) == []
+
+    # ==============================================================================================
+    def test_wide_odds_from_records(self):
+        records = _feed_odds_records(feed, bookmakers)
+        ml = _wide_odds_from_records(records, '1X2')
+        assert ml.shape == (1, 16)
+        assert ml.loc[0, ('bet365', '1')] == 2.1
+        assert ml.loc[0, ('Average', 'X')] == 3.45
+        assert ml.loc[0, ('Highest', '2')] == 3.8
+        assert ml.loc[0, ('Pinnacle', 'po %')] == 95.3
+
+        ou = _wide_odds_from_records(records, 'O/U')
+        assert ou.loc[0, ('+2.5', 'bet365', 'under')] == 1.95
+        assert _wide_odds_from_records([], '1X2').shape == (0, 0)
+
+    # ==============================================================================================
+    def test_long_odds(self, odds):
+        assert odds.columns.tolist() == ['match_id', 'market', 'line', 'bookmaker', 'outcome',
+                                         'odds', 'payout', 'implied_prob', 'overround']
+        assert odds['bookmaker'].dtype == 'category'
+        assert odds['odds'].dtype == 'float32'
+
+        bet365 = odds.loc[(odds['market'] == '1X2') & (odds['bookmaker'] == 'bet365')]
+        assert bet365['outcome'].tolist() == ['1', 'X', '2']
+        assert bet365['payout'].iloc[0] == pytest.approx(95.4)
+        assert bet365['overround'].iloc[0] == pytest.approx(1 / 2.1 + 1 / 3.4 + 1 / 3.6 - 1)
+        assert odds.loc[odds['market'] == 'O/U', 'line'].unique().tolist() == [2.5]
+        assert sorted(odds['bookmaker'].unique()) == ['Pinnacle', 'bet365']  # no aggregates
+        assert odds.shape[0] == 8
+        assert np.isnan(bet365['line']).all()
+
+        empty = long_odds(pd.DataFrame(), pd.DataFrame(), 'AbCdEfGh')
+        assert empty.shape == (0, 9)
+
+    # ==============================================================================================
+    def test_compact_odds(self, odds):
+        concatenated = pd.concat([odds, odds.assign(match_id='IjKlMnOp')])
+        assert concatenated['match_id'].dtype != 'category'
+        compacted = compact_odds(concatenated)
+        assert compacted['match_id'].dtype == 'category'
+        assert compacted.index.tolist() == list(range(concatenated.shape[0]))
+
+    # ==============================================================================================
+    def test_odds_deltas(self, odds):
+        current = odds.copy()
+        current['odds'] = current['odds'].where(
+            ~((current['bookmaker'] == 'bet365') & (current['outcome'] == '1')), 2.25)
+        current = current.loc[~((current['market'] == 'O/U') & (current['outcome'] == 'under'))
+                              | (current['bookmaker'] != 'bet365')]
+        deltas = odds_deltas(odds, current, '2024-01-01T00:00:00')
+
+        changed = deltas.loc[deltas['outcome'] == '1'].iloc[0]
+        assert (changed['bookmaker'], changed['previous_odds'], changed['odds']) == \
+            ('bet365', 2.1, 2.25)
+        assert changed['change'] == pytest.approx(0.15)
+        gone = deltas.loc[deltas['outcome'] == 'under'].iloc[0]
+        assert gone['bookmaker'] == 'bet365' and np.isnan(gone['odds'])
+        assert (deltas['scraped_at'] == '2024-01-01T00:00:00').all()
+
+        assert odds_deltas(odds, odds, '2024-01-01T00:00:00').shape[0] == 0
+
+    # ==============================================================================================
+    def test_snapshot_store(self, odds, tmp_path):
+        store = OddsSnapshotStore(str(tmp_path / 'odds.sqlite'))
+        try:
+            first = store.update('AbCdEfGh', odds, '2024-01-01T00:00:00')
+            assert first.shape[0] == odds.shape[0]  # everything is new
+            assert first['previous_odds'].isna().all()
+            assert store.update('AbCdEfGh', odds, '2024-01-01T00:05:00').shape[0] == 0
+
+            changed = odds.assign(odds=odds['odds'] + 0.5)
+            assert store.update('AbCdEfGh', changed, '2024-01-01T00:10:00').shape[0] == \
+                odds.shape[0]
+            latest = store.latest('AbCdEfGh')
+            assert latest.shape[0] == odds.shape[0]
+            assert (latest['scraped_at'] == '2024-01-01T00:10:00').all()
+            assert store.history('AbCdEfGh').shape[0] == 2 * odds.shape[0]
+            assert store.latest('IjKlMnOp').shape[0] == 0
+
+            assert store.content_hash('AbCdEfGh') is None
+            store.set_content_hash('AbCdEfGh', 'abc123', '2024-01-01T00:10:00')
+            assert store.content_hash('AbCdEfGh') == 'abc123'
+        finally:
+            store.close()
+
+    # ==============================================================================================
+    @pytest.fixture
+    def scraper(self, monkeypatch):
+        """ Oddsportal without a browser, whose workers are FakeWorkers.
+        """
+        monkeypatch.setattr(FakeWorker, 'created', 0)
+        monkeypatch.setattr(FakeWorker, 'attempts', dict())
+        scraper = object.__new__(Oddsportal)
+        scraper.timings = list()
+        scraper._new_worker = FakeWorker
+        return scraper
+
+    # ==============================================================================================
+    def test_scrape_matches_parallel(self, scraper):
+        links = ['ok', 'timeout', 'crash', 'bad']
+        with pytest.warns(UserWarning, match='bad'):
+            results = scraper._scrape_matches_parallel(links, 2, max_retries=1)
+        assert results == ['ok', 'timeout', 'crash', None]
+        assert FakeWorker.attempts == {'ok': 1, 'timeout': 2, 'crash': 2, 'bad': 1}
+        # A browser per thread that got a match, plus one that replaced the crashed browser
+        assert FakeWorker.created in [2, 3]
+        assert len(scraper.timings) == FakeWorker.created  # the timings of every worker, once
+
+    # ==============================================================================================
+    def test_worker_cant_be_replaced(self, scraper):
+        def new_worker():
+            if FakeWorker.created > 0:
+                raise WebDriverException('Chrome failed to start')
+            return FakeWorker()
+        scraper._new_worker = new_worker
+        with pytest.warns(UserWarning, match='Unable to start a browser'):
+            results = scraper._scrape_matches_parallel(['crash', 'ok'], 1, max_retries=1)
+        assert results == [None, None]  # skipped instead of aborting the run
+        assert len(scraper.timings) == 1
+
+    # ==============================================================================================
+    def test_scrape_season_odds_serially(self, scraper):
+        scraper.get_match_links = lambda year, league: ['ok', 'timeout', 'bad']
+        attempts: list = list()
+
+        def scrape_match(link, as_long):
+            attempts.append(link)
+            if link == 'bad':
+                raise ValueError('layout changed')
+            if link == 'timeout' and attempts.count(link) == 1:
+                raise TimeoutException()
+            return pd.DataFrame({'link': [link]})
+        scraper.scrape_match = scrape_match
+
+        with pytest.warns(UserWarning, match='bad'):
+            df = scraper.scrape_season_odds(2024, 'EPL', max_retries=1)
+        assert df['link'].tolist() == ['ok', 'timeout']
+        assert attempts == ['ok', 'timeout', 'timeout', 'bad']
+        assert FakeWorker.created == 0  # timeouts don't replace the browser
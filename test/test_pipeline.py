@@ -0,0 +1,42 @@
+import sys
+sys.path.append('./src/')
+from ScraperFC.pipeline import parse_pages
+from ScraperFC.shared_functions import get_parser, make_soup, set_parser
+
+import pytest
+import time
+
+
+# ==================================================================================================
+def parse(url: str, content: bytes) -> tuple:
+    """ Parses a page that says how long to take, module level so workers can unpickle it.
+    """
+    soup = make_soup(content)
+    time.sleep(float(soup.find('p').text))  # type: ignore
+    return url, get_parser()
+
+
+class TestPipeline:
+
+    # ==============================================================================================
+    def test_results_in_order(self):
+        pages = [(f'https://example.com/{i}', f'<p>{0.05 * (i % 3)}</p>'.encode('utf-8'))
+                 for i in range(8)]
+        for n_workers in [1, 3]:
+            results = list(parse_pages(iter(pages), parse, n_workers))
+            assert [url for url, _ in results] == [url for url, _ in pages]
+
+    # ==============================================================================================
+    def test_workers_use_the_parser(self):
+        previous = get_parser()
+        set_parser('html.parser')
+        try:
+            results = list(parse_pages([('https://example.com', b'<p>0</p>')], parse, 2))
+        finally:
+            set_parser(previous)
+        assert results == [('https://example.com', 'html.parser')]
+
+    # ==============================================================================================
+    def test_n_workers(self):
+        with pytest.raises(TypeError):
+            list(parse_pages([], parse, 0))
@@ -0,0 +1,101 @@
+import sys
+sys.path.append('./src/')
+from ScraperFC import fetching
+from ScraperFC.fetching import RetryPolicy, fetch
+from ScraperFC.replay import Cassette, StandInServer, use_cassette
+from ScraperFC.scraperfc_exceptions import UnrecordedRequestException
+
+import pytest
+import requests
+import time
+
+
+class FakeResponse:
+    status_code = 200
+    encoding = 'utf-8'
+    headers = {'Content-Type': 'text/html', 'Content-Encoding': 'gzip'}
+
+    def __init__(self, url):
+        self.content = f'<p>{url}</p>'.encode('utf-8')
+
+
+# ==================================================================================================
+def record_pages(path, urls, monkeypatch):
+    """ Records fake responses of the URLs to a cassette.
+    """
+    with monkeypatch.context() as m:
+        m.setattr(requests, 'get', lambda url, **kwargs: FakeResponse(url))
+        with use_cassette(path, 'record'):
+            for url in urls:
+                fetch(url)
+
+
+class TestReplay:
+
+    # ==============================================================================================
+    @pytest.fixture(autouse=True)
+    def no_pacing(self, monkeypatch):
+        """ The responses are fake, so the requests don't need pacing.
+        """
+        for source in ['fbref', 'understat']:
+            monkeypatch.setitem(fetching.rate_limiters, source, None)
+
+    # ==============================================================================================
+    def test_record_replay(self, tmp_path, monkeypatch):
+        path = str(tmp_path / 'cassette.json.gz')
+        record_pages(path, ['https://fbref.com/en/comps/9/'], monkeypatch)
+
+        def offline(url, **kwargs):
+            raise requests.ConnectionError()
+        monkeypatch.setattr(requests, 'get', offline)
+        monkeypatch.setitem(fetching.retry_policies, 'fbref', RetryPolicy(max_attempts=1))
+
+        with use_cassette(path, 'replay'):
+            r = fetch('https://fbref.com/en/comps/9/')
+            assert r.status_code == 200
+            assert r.text == '<p>https://fbref.com/en/comps/9/</p>'
+            assert 'Content-Encoding' not in r.headers
+            with pytest.raises(UnrecordedRequestException):
+                fetch('https://fbref.com/en/comps/12/')
+        with pytest.raises(requests.ConnectionError):
+            fetch('https://fbref.com/en/comps/9/')
+
+    # ==============================================================================================
+    def test_retried_responses_are_not_recorded(self, tmp_path, monkeypatch):
+        responses = iter([429, 200])
+
+        def get(url, **kwargs):
+            response = FakeResponse(url)
+            response.status_code = next(responses)
+            return response
+        monkeypatch.setattr(requests, 'get', get)
+        monkeypatch.setattr(fetching.time, 'sleep', lambda seconds: None)
+
+        path = str(tmp_path / 'cassette.json')
+        with use_cassette(path, 'once') as cassette:
+            assert fetch('https://understat.com/league/EPL').status_code == 200
+            assert cassette.responses['https://understat.com/league/EPL']['status_code'] == 200
+
+    # ==============================================================================================
+    def test_stand_in_server(self, tmp_path, monkeypatch):
+        path = str(tmp_path / 'cassette.json')
+        urls = [f'https://understat.com/match/{i}?a=b' for i in range(6)]
+        record_pages(path, urls, monkeypatch)
+        monkeypatch.setitem(fetching.retry_policies, 'understat', RetryPolicy(max_attempts=1))
+
+        with StandInServer(path, latency=0.01, throttle_every=3) as server:
+            with server.intercept():
+                responses = [fetch(url) for url in urls]
+                assert fetch('https://understat.com/match/99').status_code == 404
+        assert [r.status_code for r in responses] == [200, 200, 429, 200, 200, 429]
+        assert responses[0].text == f'<p>{urls[0]}</p>'
+        assert responses[2].headers['Retry-After'] == '1'
+        assert (server.requests, server.throttled) == (7, 2)
+
+        cassette = Cassette(path, 'replay')
+        with StandInServer(cassette, max_rps=2) as server:
+            with server.intercept():
+                statuses = [fetch(urls[0]).status_code for _ in range(3)]
+                time.sleep(0.6)
+                statuses.append(fetch(urls[0]).status_code)
+        assert statuses == [200, 200, 429, 200]
@@ -0,0 +1,63 @@
+import sys
+sys.path.append('./src/')
+from ScraperFC.shared_functions import parse_money, money_currency, type_money_columns, \
+    xpath_soup, xpaths_soup, make_soup, get_parser, set_parser
+
+import bs4
+import pandas as pd
+import pytest
+
+
+class TestSharedFunctions:
+
+    # ==============================================================================================
+    @pytest.mark.parametrize(
+        'value, expected',
+        [('€50.00m', 50_000_000), ('£ 1,250,000', 1_250_000), ('$1.2bn', 1_200_000_000),
+         ('€500k', 500_000), ('€350Th.', 350_000), ('Loan fee:€1.50m', 1_500_000),
+         ('-', pd.NA), ('free transfer', pd.NA), (None, pd.NA)]
+    )
+    def test_parse_money(self, value, expected):
+        result = parse_money(pd.Series([value], dtype=object))
+        assert result.dtype == 'Int64'
+        if expected is pd.NA:
+            assert result.isna().all()
+        else:
+            assert result.iloc[0] == expected
+
+    # ==============================================================================================
+    def test_type_money_columns(self):
+        df = pd.DataFrame({'Player': ['A', 'B'], 'Value': ['€1.00m', '€250k']})
+        typed = type_money_columns(df, ['Value', 'Not a column'])
+        assert typed['Value'].tolist() == [1_000_000, 250_000]
+        assert typed.attrs['units'] == {'Value': 'EUR'}
+        assert df['Value'].tolist() == ['€1.00m', '€250k']  # input isn't modified
+        assert money_currency(pd.Series(['-', None])) is None
+
+    # ==============================================================================================
+    def test_xpaths_soup(self):
+        html = (
+            '<html><head><title>title</title></head>'
+            '<body><p>p <i>1</i></p><p>p <i>2</i><b>b</b><i>3</i></p><div>d</div></body></html>'
+        )
+        soup = bs4.BeautifulSoup(html, 'html.parser')
+        expected = ['/html/body/p[1]/i', '/html/body/p[2]/i[1]', '/html/body/p[2]/i[2]']
+        assert xpaths_soup(soup.find_all('i')) == expected
+        assert [xpath_soup(i) for i in soup.find_all('i')] == expected
+        assert xpath_soup(soup.find('div').string) == '/html/body/div'
+        assert xpath_soup(soup.find('b')) == '/html/body/p[2]/b'
+
+    # ==============================================================================================
+    def test_make_soup(self):
+        html = '<html><body><table id="t"><tr><td>1</td></tr></table><script>x</script></body></html>'
+        assert get_parser() == 'lxml'
+        soup = make_soup(html, bs4.SoupStrainer('table'))
+        assert soup.find('table', {'id': 't'}).text == '1'
+        assert soup.find('script') is None
+        try:
+            set_parser('html.parser')
+            assert make_soup(html).find('script').text == 'x'
+        finally:
+            set_parser('lxml')
+        with pytest.raises(ValueError):
+            set_parser('not a parser')
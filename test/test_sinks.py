@@ -0,0 +1,139 @@
+import sys
+sys.path.append('./src/')
+from ScraperFC.sinks import ParquetSink, SQLiteSink, flatten_columns, split_nested
+
+import os
+import pandas as pd
+import pytest
+
+
+# ==================================================================================================
+def stats_df(n: int) -> pd.DataFrame:
+    """ DataFrame with MultiIndex columns like the FBref stats tables.
+    """
+    return pd.DataFrame(
+        [[f'Player {i}', 'Arsenal', 90 * i, i % 3] for i in range(n)],
+        columns=pd.MultiIndex.from_tuples([
+            ('Unnamed: 0_level_0', 'Player'), ('Unnamed: 1_level_0', 'Squad'),
+            ('Playing Time', 'Min'), ('Performance', 'Gls')
+        ])
+    )
+
+
+class TestParquetSink:
+
+    # ==============================================================================================
+    @pytest.fixture(autouse=True)
+    def pyarrow(self):
+        pytest.importorskip('pyarrow')
+
+    # ==============================================================================================
+    def test_flatten_columns(self):
+        df, mapping = flatten_columns(stats_df(1))
+        assert list(df.columns) == ['Player', 'Squad', 'Playing Time / Min', 'Performance / Gls']
+        assert mapping['Performance / Gls'] == ['Performance', 'Gls']
+
+    # ==============================================================================================
+    def test_round_trip(self, tmp_path):
+        with ParquetSink(str(tmp_path), batch_rows=10) as sink:
+            sink.write(stats_df(6), 'player_standard', 'fbref', 'EPL', '2023/2024')
+            assert len(os.listdir(tmp_path)) == 0  # still buffered
+            sink.write(stats_df(6), 'player_standard', 'fbref', 'EPL', '2023/2024')
+            sink.write(stats_df(3), 'player_standard', 'fbref', 'La Liga', '2023/2024')
+
+        sink = ParquetSink(str(tmp_path))
+        df = sink.read('fbref', 'player_standard')
+        assert df.shape == (15, 6)
+        assert ('Performance', 'Gls') in df.columns
+        assert set(df[('season', '')]) == {'2023/2024'}
+
+        df = sink.read('fbref', 'player_standard', columns=['Player', 'Performance / Gls'],
+                       filters=[('league', '=', 'La Liga')])
+        assert list(df.columns) == ['Player', 'Performance / Gls']
+        assert df.shape[0] == 3
+
+    # ==============================================================================================
+    def test_schema_evolution(self, tmp_path):
+        with ParquetSink(str(tmp_path)) as sink:
+            sink.write(pd.DataFrame({'a': [1, 2]}), 'matches', 'understat', 'EPL', '2022/2023')
+            sink.flush()
+            sink.write(pd.DataFrame({'a': [3], 'b': ['x']}), 'matches', 'understat', 'EPL',
+                       '2023/2024')
+        df = ParquetSink(str(tmp_path)).read('understat', 'matches').sort_values('a')
+        assert df['a'].tolist() == [1, 2, 3]
+        assert df['b'].isna().sum() == 2
+
+    # ==============================================================================================
+    def test_mixed_and_nested_columns(self, tmp_path):
+        players = pd.DataFrame({
+            'Name': ['A', 'B'],
+            'Value': ['€1.00m', 5],
+            'Transfer history': [pd.DataFrame({'Fee': ['free']}), pd.DataFrame({'Fee': ['?']})],
+        })
+        sink = ParquetSink(str(tmp_path))
+        sink.write(players, 'players', 'transfermarkt', 'EPL', '2023/2024')
+        with pytest.raises(TypeError):
+            sink.flush()
+
+        tables = split_nested(players, 'players', ['Name'])
+        assert tables['players_transfer_history']['Name'].tolist() == ['A', 'B']
+        sink.write_tables(tables, 'transfermarkt', 'EPL', '2023/2024')
+        sink.close()
+        assert sink.read('transfermarkt', 'players')['Value'].tolist() == ['€1.00m', '5']
+
+    # ==============================================================================================
+    def test_partition_column_clash(self, tmp_path):
+        shots = pd.DataFrame({'id': ['1', '2'], 'season': ['2023', '2023'], 'league': ['EPL'] * 2})
+        with ParquetSink(str(tmp_path)) as sink:
+            sink.write(shots, 'shots', 'understat', 'EPL', '2023/2024')
+        df = ParquetSink(str(tmp_path)).read('understat', 'shots')
+        assert df['understat_season'].tolist() == ['2023', '2023']
+        assert df['understat_league'].tolist() == ['EPL', 'EPL']
+        assert set(df['season']) == {'2023/2024'}
+
+
+class TestSQLiteSink:
+
+    # ==============================================================================================
+    def test_upsert(self, tmp_path):
+        path = str(tmp_path / 'scraperfc.db')
+        matches = pd.DataFrame({'match_id': ['a', 'b'], 'home_goals': [1, 2]})
+        shots = pd.DataFrame({'match_id': ['a', 'a', 'b'], 'minute': [10, 20, 30]})
+        for _ in range(2):
+            with SQLiteSink(path) as sink:
+                sink.write(matches, 'matches', 'fbref', 'EPL', '2023-2024')
+                sink.write(shots, 'shots', 'fbref', 'EPL', '2023-2024')
+
+        with SQLiteSink(path) as sink:
+            assert sink.read('fbref', 'matches').shape[0] == 2
+            assert sink.read('fbref', 'shots').shape[0] == 3
+
+            # Updated rows and new columns are merged, replaced groups lose their old rows
+            sink.write(pd.DataFrame({'match_id': ['b'], 'home_goals': [3], 'xg': [1.5]}),
+                       'matches', 'fbref', 'EPL', '2023-2024')
+            sink.write(shots.iloc[[0]], 'shots', 'fbref', 'EPL', '2023-2024')
+            df = sink.query('SELECT * FROM fbref_matches ORDER BY match_id')
+            assert df['home_goals'].tolist() == [1, 3]
+            assert df['xg'].isna().tolist() == [True, False]
+            assert sink.read('fbref', 'shots')['minute'].tolist() == [30, 10]
+
+    # ==============================================================================================
+    def test_keys(self, tmp_path):
+        with SQLiteSink(str(tmp_path / 'scraperfc.db'), keys={('fbref', 'stats'): ['Player']}) \
+                as sink:
+            with pytest.raises(ValueError):
+                sink.write(stats_df(2), 'unknown', 'fbref', 'EPL', '2023-2024')
+            sink.write(stats_df(4), 'stats', 'fbref', 'EPL', '2023-2024')
+            sink.write(stats_df(2), 'stats', 'fbref', 'EPL', '2023-2024')
+            df = sink.read('fbref', 'stats')
+        assert df.shape[0] == 4
+        assert ('Performance', 'Gls') in df.columns
+
+    # ==============================================================================================
+    def test_partition_column_clash(self, tmp_path):
+        shots = pd.DataFrame({'id': ['1', '2'], 'season': ['2023', '2023'], 'league': ['EPL'] * 2})
+        with SQLiteSink(str(tmp_path / 'scraperfc.db')) as sink:
+            sink.write(shots, 'shots', 'understat', 'EPL', '2023/2024')
+            df = sink.read('understat', 'shots')
+        assert df['understat_season'].tolist() == ['2023', '2023']
+        assert df['season'].tolist() == ['2023/2024', '2023/2024']
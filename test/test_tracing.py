@@ -0,0 +1,58 @@
+import sys
+sys.path.append('./src/')
+from ScraperFC import fetching
+from ScraperFC.tracing import trace, trace_methods, traced
+
+import json
+import os
+
+
+@traced('parse')
+def parse(text: str) -> list:
+    return text.split(',')
+
+
+@trace_methods
+class Scraper:
+
+    def scrape(self, text: str) -> list:
+        fetching.notify('request', 'https://fbref.com/en/comps', status_code=200, seconds=0.5,
+                        n_bytes=10)
+        fetching.notify('sleep', 'https://fbref.com/en/comps', seconds=1)
+        return self.scrape_part(text)
+
+    def scrape_part(self, text: str) -> list:
+        return parse(text)
+
+
+class TestTracing:
+
+    # ==============================================================================================
+    def test_nested_spans(self, tmp_path):
+        assert Scraper().scrape('a,b') == ['a', 'b']  # not traced
+        with trace() as tracer:
+            assert Scraper().scrape('a,b') == ['a', 'b']
+
+        tree = tracer.tree()
+        assert len(tree) == 1
+        assert tree[0]['name'] == 'Scraper.scrape'
+        assert [x['category'] for x in tree[0]['children']] == ['fetch', 'sleep', 'method']
+        assert tree[0]['children'][2]['children'][0]['name'] == 'parse'
+
+        summary = tracer.summary()
+        assert summary.loc['sleep', 'seconds'] == 1
+        assert summary.loc['method', 'spans'] == 2
+
+        tracer.save(str(tmp_path / 'trace.json'))
+        with open(tmp_path / 'trace.json') as f:
+            events = json.load(f)['traceEvents']
+        assert events[1] == dict(events[1], name='GET https://fbref.com/en/comps', ph='X',
+                                 dur=0.5e6)
+
+    # ==============================================================================================
+    def test_profile(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('SCRAPERFC_PROFILE', str(tmp_path))
+        assert Scraper().scrape('a') == ['a']
+        files = os.listdir(tmp_path)
+        assert len(files) == 1  # only the outermost call is profiled
+        assert files[0].startswith('Scraper.scrape-')
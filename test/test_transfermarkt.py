@@ -1,12 +1,43 @@
 import sys
 sys.path.append('./src/')
 from ScraperFC import Transfermarkt
+from ScraperFC import transfermarkt
 from ScraperFC.transfermarkt import comps
 from ScraperFC.scraperfc_exceptions import InvalidLeagueException, InvalidYearException
+import json
 import random
 import pandas as pd
 import pytest
 from contextlib import nullcontext as does_not_raise
+from types import SimpleNamespace
+
+player_link = 'https://www.transfermarkt.us/bukayo-saka/profil/spieler/433177'
+
+
+def player_page(value: str, comment: str='') -> bytes:
+    """ Minimal Transfermarkt player page with the given market value. The comment changes the
+    page without changing the parsed player.
+    """
+    return f'''<html><body><!--{comment}-->
+      <h1 class="data-header__headline-wrapper">#7\nBukayo Saka</h1>
+      <a class="data-header__market-value-wrapper">{value} Last update: Jun 1, 2024</a>
+      <span itemprop="nationality">England</span>
+      <dd class="detail-position__position">Right Winger</dd>
+    </body></html>'''.encode('utf-8')
+
+
+class FakeTransfermarkt:
+    """ Stands in for transfermarkt.fetch(), serves the queued (status code, body, headers)
+    responses in order and records the request headers.
+    """
+    def __init__(self, responses: list) -> None:
+        self.responses = list(responses)
+        self.requests: list = list()
+
+    def __call__(self, url, proxy_pool=None, headers=None):
+        self.requests.append(headers)
+        status_code, content, headers = self.responses.pop(0)
+        return SimpleNamespace(status_code=status_code, content=content, headers=headers)
 
 class TestTransfermarkt:
 
@@ -49,4 +80,91 @@ class TestTransfermarkt:
         players = tm.scrape_players(year, league)
         assert type(players) is pd.DataFrame
         assert players.shape[0] > 0
-        assert players.shape[1] > 0
\ No newline at end of file
+        assert players.shape[1] > 0
+
+    #===============================================================================================
+    def test_refresh_players(self, tmp_path):
+        tm = Transfermarkt()
+        league = random.sample(list(comps.keys()), 1)[0]
+        valid_years = tm.get_valid_seasons(league)
+        year = random.sample(list(valid_years.keys()), 1)[0]
+        manifest_path = str(tmp_path / 'manifest.json')
+        first = tm.refresh_players(year, league, manifest_path)
+        assert type(first) is pd.DataFrame
+        assert first.shape[0] > 0
+        # Nothing has changed between the two runs so no players should be re-emitted
+        second = tm.refresh_players(year, league, manifest_path)
+        assert second.shape[0] == 0
+
+    #===============================================================================================
+    def test_refresh_player(self, monkeypatch):
+        etag = {'etag': '"v1"', 'last-modified': 'Sat, 01 Jun 2024 00:00:00 GMT'}
+        fake = FakeTransfermarkt([
+            (200, player_page('€120.00m'), etag),
+            (304, b'', dict()),
+            (200, player_page('€120.00m'), etag),  # same body
+            (200, player_page('€120.00m', 'new ad'), dict()),  # same player, different page
+            (200, player_page('€130.00m'), dict()),
+        ])
+        monkeypatch.setattr(transfermarkt, 'fetch', fake)
+        tm = Transfermarkt()
+        manifest: dict = dict()
+
+        # New player
+        player = tm.refresh_player(player_link, manifest)
+        assert player is not None and player.shape[0] == 1
+        assert player.loc[0, 'Name'] == 'Bukayo Saka'
+        assert player.loc[0, 'Value'] == '€120.00m'
+        entry = dict(manifest[player_link])
+        assert entry['value'] == '€120.00m'
+        assert entry['value_last_updated'] == 'Jun 1, 2024'
+        assert (entry['etag'], entry['last_modified']) == ('"v1"', etag['last-modified'])
+        assert 'if-none-match' not in fake.requests[0]
+
+        # Not modified, the validators are sent and the manifest is unchanged
+        assert tm.refresh_player(player_link, manifest) is None
+        assert fake.requests[1]['if-none-match'] == '"v1"'
+        assert fake.requests[1]['if-modified-since'] == etag['last-modified']
+        assert manifest[player_link] == entry
+
+        # Same body, not parsed again
+        assert tm.refresh_player(player_link, manifest) is None
+        assert manifest[player_link] == entry
+
+        # Different page but the same player, only the content hash changes
+        assert tm.refresh_player(player_link, manifest) is None
+        assert manifest[player_link]['content_hash'] != entry['content_hash']
+        assert manifest[player_link]['record_hash'] == entry['record_hash']
+
+        # Changed market value
+        player = tm.refresh_player(player_link, manifest)
+        assert player is not None and player.loc[0, 'Value'] == '€130.00m'
+        assert manifest[player_link]['value'] == '€130.00m'
+        assert manifest[player_link]['record_hash'] != entry['record_hash']
+
+    #===============================================================================================
+    def test_refresh_players_manifest(self, monkeypatch, tmp_path):
+        fake = FakeTransfermarkt([
+            (200, player_page('€120.00m'), dict()),
+            (200, player_page('€120.00m'), dict()),
+            (200, player_page('€130.00m'), dict()),
+        ])
+        monkeypatch.setattr(transfermarkt, 'fetch', fake)
+        tm = Transfermarkt()
+        monkeypatch.setattr(tm, 'get_player_links', lambda year, league: [player_link])
+        manifest_path = tmp_path / 'manifest.json'
+
+        first = tm.refresh_players('23/24', 'EPL', str(manifest_path), typed=True)
+        assert first['Name'].tolist() == ['Bukayo Saka']
+        assert first['Value'].tolist() == [120000000]
+        manifest = json.loads(manifest_path.read_text())
+        assert list(manifest.keys()) == [player_link]
+        assert manifest[player_link]['value'] == '€120.00m'
+        assert not (tmp_path / 'manifest.json.tmp').exists()  # saved through a temp file
+
+        assert tm.refresh_players('23/24', 'EPL', str(manifest_path)).shape[0] == 0
+        assert json.loads(manifest_path.read_text()) == manifest
+
+        third = tm.refresh_players('23/24', 'EPL', str(manifest_path))
+        assert third['Value'].tolist() == ['€130.00m']
+        assert json.loads(manifest_path.read_text())[player_link]['value'] == '€130.00m'